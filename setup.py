@@ -30,12 +30,15 @@ setup(
         'dateparser>=0.7',
         'feedparser>=5.2',
         'requests>=2.20',
-        'tldextract>=2.2',
+        'tldextract>=3.1',
         'networkx>=2.4',
         'NwalaTextUtils==0.0.4',
         'spacy>=3.1.0',
 	'urllib3<2.0'
     ],
+    extras_require={
+        'sparse': ['numpy', 'scipy']
+    },
     scripts=[
         'bin/sgs'
     ]
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from sgsuite.util import fetchURI
+from sgsuite.util import getCustomHeaderDict
+from sgsuite.util import getDomain
+
+logger = logging.getLogger('sgsuite.sgsuite')
+class AsyncFetcher(object):
+
+    def __init__(self, max_concurrency=10, max_domain_concurrency=2, timeout=10, sizeRestrict=4000000, headers=None, html_cache=None):
+
+        '''
+            asyncio fetch engine: at most max_concurrency requests in flight,
+            at most max_domain_concurrency of which are for the same domain
+            requests are issued on a shared requests.Session, so connections are pooled per host and kept alive
+            timeout and sizeRestrict (bytes, -1: no limit) have the same semantics as in derefURI()
+
+            fetch results are formatted as in fetchURI()
+            html_cache: sgsuite.cache.HTMLCache consulted before, and updated after, fetching (status: 'cached' for hits)
+        '''
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_domain_concurrency = max(1, max_domain_concurrency)
+        self.timeout = timeout
+        self.sizeRestrict = sizeRestrict
+        self.headers = getCustomHeaderDict() if headers is None else headers
+        self.html_cache = html_cache
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=100, pool_maxsize=self.max_domain_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def fetch_sync(self, uri):
+
+        if( self.html_cache is not None ):
+            html = self.html_cache.get(uri)
+            if( html is not None ):
+                return {'uri': uri.strip(), 'text': html, 'status': 'cached', 'status_code': 200, 'response_header': {}}
+
+        fetch_res = fetchURI(uri, timeout=self.timeout, sizeRestrict=self.sizeRestrict, headers=self.headers, session=self.session)
+        if( self.html_cache is not None and fetch_res['status'] == 'ok' ):
+            self.html_cache.put(uri, fetch_res['text'])
+
+        return fetch_res
+
+    async def fetch(self, uri, domain_sems):
+
+        domain = getDomain(uri) or urlparse(uri).netloc
+        if( domain not in domain_sems ):
+            domain_sems[domain] = asyncio.Semaphore(self.max_domain_concurrency)
+
+        async with domain_sems[domain]:
+            return await asyncio.get_running_loop().run_in_executor( self.executor, self.fetch_sync, uri )
+
+    async def fetch_all(self, uris, on_fetched=None):
+
+        '''
+            returns fetch results in uris order
+            on_fetched(index of uri, fetch result), if set, is called (in a worker thread, so it may block) as each uri completes, 
+            the results are then not kept and None is returned in their place
+            uris are fetched by max_concurrency worker coroutines, a worker takes its next uri only after on_fetched returns, 
+            so a blocking on_fetched (e.g., a full queue) pauses fetching
+        '''
+        loop = asyncio.get_running_loop()
+        domain_sems = {}
+        results = [None] * len(uris)
+        indices = iter( range(len(uris)) )
+
+        async def fetch_worker():
+
+            #workers share indices, the event loop is single-threaded
+            for i in indices:
+                fetch_res = await self.fetch(uris[i], domain_sems)
+                if( on_fetched is None ):
+                    results[i] = fetch_res
+                else:
+                    await loop.run_in_executor( self.executor, on_fetched, i, fetch_res )
+
+        await asyncio.gather( *[fetch_worker() for _ in range(min(self.max_concurrency, len(uris)))] )
+        return results
+
+    def fetch_uris(self, uris, on_fetched=None):
+        return asyncio.run( self.fetch_all(uris, on_fetched=on_fetched) )
@@ -1,13 +1,18 @@
 import itertools
 import logging
-import networkx as nx
 
+from bisect import bisect_right
 from datetime import datetime
 from re import split
 
+from sgsuite.CompactStoryGraph import CompactStoryGraph
+from sgsuite.JsonStreamWriter import JsonSpool
+from sgsuite.JsonStreamWriter import JsonStreamWriter
 from sgsuite.util import genericErrorInfo
 from sgsuite.util import getDomain
+from sgsuite.util import getDomains
 from sgsuite.util import get_entities_frm_links
+from sgsuite.util import stream_entities_frm_links
 
 
 logger = logging.getLogger('sgsuite.sgsuite')
@@ -38,6 +43,11 @@ class ClusterNews(object):
         '''
         kwargs.setdefault('annotate_min_avg_deg', 3)
         kwargs.setdefault('annotate_min_uniq_src_count', 3)
+        #"inverted-index" or "brute-force" (all pairs, kept for verification)
+        kwargs.setdefault('candidate_generation', 'inverted-index')
+        #"python" or "sparse" (numpy/scipy sparse matrix products, sparse_block_size rows at a time)
+        kwargs.setdefault('sim_backend', 'python')
+        kwargs.setdefault('sparse_block_size', 1000)
         
         self.min_sim = min_sim
         self.jaccard_weight = jaccard_weight
@@ -49,77 +59,452 @@ class ClusterNews(object):
         self.entity_extraction_key = 'entity'
         self.entity_container_key = 'entities'
     
-    def gen_storygraph(self, links):
+    def gen_storygraph(self, links, base_ref_date=None):
 
-        sg = get_entities_frm_links(links, thread_count=self.kwargs.get('thread_count', 5))
+        '''
+            base_ref_date: reference time for relative DATE entities (e.g., "yesterday") of all links, 
+            default: base_ref_date passed to the constructor, else the time gen_storygraph() is called
+        '''
+        sg = get_entities_frm_links(links, **self.get_ner_kwargs(base_ref_date))
+        #entity dicts are stored once in the compact graph's vocabularies, the nodes' lists are released until the graph is converted to JSON
+        sg = self.get_compact_graph(sg, release_entities=True)
 
         #run news clustering algorithm
         #min_sim, similarity threshold: 1 means 100% match
         #sim_metric, #"weighted-jaccard-overlap", "jaccard", and "overlap"
-        sg = self.cluster_news(sg)
+        sg = self.cluster_compact_graph(sg)
 
         #annotate sg_nodes so it can be visualized at: http://storygraph.cs.odu.edu/graphs/polar-media-consensus-graph/
         sg = ClusterNews.annotate(sg, min_avg_deg=self.kwargs['annotate_min_avg_deg'], min_uniq_src_count=self.kwargs['annotate_min_uniq_src_count'], graph_name=self.graph_name, graph_description=self.graph_description)
 
-        return sg
+        return self.get_graph_json(sg)
+
+    def gen_storygraph_to_file(self, links, outfilename, base_ref_date=None, node_details=None, **kwargs):
+
+        '''
+            gen_storygraph() written to outfilename by write_storygraph(), so memory does not grow with the count of links
+            kwargs: write_storygraph() options
+        '''
+        node_stream = stream_entities_frm_links(links, **self.get_ner_kwargs(base_ref_date))
+        return self.write_storygraph(node_stream, outfilename, node_details=node_details, node_count=len(links), **kwargs)
+
+    def write_storygraph(self, node_stream, outfilename, node_details=None, node_count=None, indentFlag=False, json_backend='auto', compress=None, spool_dir=None):
+
+        '''
+            node_stream: (index, node) in any order, e.g., stream_entities_frm_links()
+            node_count: count of indices node_stream should yield (e.g., count of links), default: highest index + 1,
+                indices node_stream did not yield are logged and left out of the graph
+            node_details: optional list of dicts, node_details[index] is merged into the node written (e.g., input link details),
+                only if there are node_count details
+            indentFlag, json_backend, compress: see JsonStreamWriter
+
+            As each node arrives, it is spooled to a temporary file (in spool_dir) and only its link, title and entities are 
+            kept in a CompactStoryGraph for clustering and annotation. The links, then the nodes (read back from the spool, with 
+            their annotation), are written one at a time, so output has the same content as gen_storygraph(), 
+            and the same bytes as json.dump() of it with the json backend (orjson's separators have no spaces)
+            returns the CompactStoryGraph
+        '''
+        graph_fields = [self.entity_container_key, 'link', 'title']
+        graph = CompactStoryGraph(entity_container_key=self.entity_container_key, entity_extraction_key=self.entity_extraction_key, release_entities=True)
+        spool = JsonSpool(json_backend=json_backend, spool_dir=spool_dir)
+
+        try:
+            for i, node in node_stream:
+                spool.put(i, node)
+                graph.set_node( i, {key: node[key] for key in graph_fields if key in node} )
+
+            node_count = len(graph) if node_count is None else node_count
+            spool_indices = graph.remove_unset_nodes()
+            if( len(spool_indices) != node_count ):
+                logger.warning( '\twrite_storygraph(), nodes missing from node_stream (left out), indices: ' + str(sorted( set(range(node_count)) - set(spool_indices) )) )
+
+            if( node_details is not None and len(node_details) != node_count ):
+                logger.warning( '\twrite_storygraph(), node_details not merged, ' + str(len(node_details)) + ' details for ' + str(node_count) + ' nodes' )
+                node_details = None
+
+            graph = self.cluster_compact_graph(graph)
+            graph = ClusterNews.annotate(graph, min_avg_deg=self.kwargs['annotate_min_avg_deg'], min_uniq_src_count=self.kwargs['annotate_min_uniq_src_count'], graph_name=self.graph_name, graph_description=self.graph_description)
+
+            with JsonStreamWriter(outfilename, indentFlag=indentFlag, json_backend=json_backend, compress=compress) as writer:
+                
+                writer.begin_object()
+                
+                writer.begin_list('links')
+                for lnk_dct in graph.iter_json_links():
+                    writer.write_item(lnk_dct)
+                writer.end_list()
+
+                writer.begin_list('nodes')
+                for i, spool_i in enumerate(spool_indices):
+                    
+                    node = spool.get(spool_i)
+                    for key, val in graph.nodes[i].node.items():
+                        if( key not in graph_fields ):
+                            node[key] = val
+
+                    if( node_details is not None ):
+                        node.update( node_details[spool_i] )
+
+                    writer.write_item(node)
+                writer.end_list()
+
+                writer.write_item(graph.connected_comps, key='connected-comps')
+                writer.write_item(datetime.utcnow().isoformat() + 'Z', key='timestamp')
+                writer.write_item({'description': self.graph_description, 'name': self.graph_name}, key='custom')
+                writer.end_object()
+        finally:
+            spool.close()
+
+        return graph
+
+    def get_ner_kwargs(self, base_ref_date=None):
+
+        ner_kwargs = dict(self.kwargs)
+        if( base_ref_date is not None or ner_kwargs.get('base_ref_date') is None ):
+            ner_kwargs['base_ref_date'] = datetime.now() if base_ref_date is None else base_ref_date
+
+        return ner_kwargs
+
+    def get_compact_graph(self, nodes_lst, release_entities=False):
+
+        '''
+            nodes_lst: list of storygraph nodes or CompactStoryGraph (returned as is)
+            release_entities: see CompactStoryGraph
+        '''
+        if( isinstance(nodes_lst, CompactStoryGraph) ):
+            return nodes_lst
+
+        return CompactStoryGraph.from_nodes(nodes_lst, entity_container_key=self.entity_container_key, entity_extraction_key=self.entity_extraction_key, release_entities=release_entities)
+
+    def get_graph_json(self, graph):
+        return graph.to_json( datetime.utcnow().isoformat() + 'Z', {'description': self.graph_description, 'name': self.graph_name} )
 
     def cluster_news(self, nodes_lst):
+
+        '''
+            nodes_lst: list of storygraph nodes or CompactStoryGraph
+            returns storygraph JSON whose nodes are the dicts of nodes_lst, see cluster_compact_graph()
+        '''
+        return self.get_graph_json( self.cluster_compact_graph(nodes_lst) )
+
+    def cluster_compact_graph(self, nodes_lst):
         
         logger.info('\ncluster_news():')
         '''
             get all pair keys
             calculate similarity of pair keys
             link pairs within minimum similarity 
+            returns CompactStoryGraph with links ranked by sim (prior links are replaced)
         '''
         logger.info('\tsimilarity-metric: ' + self.sim_metric)
         logger.info('\tmin_sim: ' + str(self.min_sim))
 
-        indices = list( range( len(nodes_lst) ) )      
-        pairs = list( itertools.combinations(indices, 2) )
+        logger.info('\tcandidate_generation: ' + self.kwargs['candidate_generation'])
 
-        links = []
+        graph = self.get_compact_graph(nodes_lst)
+        graph.reset_links()
+        pairs_count = 0
 
-        for pair in pairs:
-            
-            first_story = pair[0]
-            second_story = pair[1]
-            
-            sim = self.calc_ent_sim(nodes_lst, first_story, second_story)
+        for first_story, second_story, sim in self.get_pair_sims(graph):
             
+            pairs_count += 1
             if( sim >= self.min_sim ):
                 
-                lnk_dct = {}
-                lnk_dct['source'] = first_story
-                lnk_dct['target'] = second_story
-                lnk_dct['sim'] = sim
-                lnk_dct['rank'] = -1
-                links.append(lnk_dct)
+                graph.add_link(first_story, second_story, sim)
                 
                 logger.info('\tpairs: ' + str(first_story) + ' vs ' + str(second_story))
                 logger.info('\t\tsim: ' + str(sim))
 
-                if( 'title' in nodes_lst[first_story] and 'title' in nodes_lst[second_story] ):
-                    logger.info('\t\t' + nodes_lst[first_story]['title'][:50] )
-                    logger.info('\t\t' + nodes_lst[second_story]['title'][:50] )
+                first_node = graph.nodes[first_story].node
+                second_node = graph.nodes[second_story].node
+                if( 'title' in first_node and 'title' in second_node ):
+                    logger.info('\t\t' + first_node['title'][:50] )
+                    logger.info('\t\t' + second_node['title'][:50] )
                 
                 logger.info('')
 
-        #add ranks to links - start
-        links = sorted( links, key=lambda lnk_dct: lnk_dct['sim'], reverse=True )
-        for i in range(0, len(links)):
-            links[i]['rank'] = i+1
-        #add ranks to links - end
+        #add ranks to links
+        graph.sort_links()
+        logger.info( 'pairs count: ' + str(pairs_count) )
+
+        return graph
+
+    def update_storygraph(self, prev_graph, added_nodes=None, removed=None):
+
+        '''
+            Incremental cluster_news() and annotate() for rolling snapshots:
+            prev_graph: storygraph JSON (e.g., from gen_storygraph() or update_storygraph()) or CompactStoryGraph (updated in place), 
+                clustered with the same min_sim, sim_metric, jaccard_weight and sim_backend
+            added_nodes: nodes (e.g., from get_entities_frm_links()) placed after the nodes of prev_graph
+            removed: indices of prev_graph nodes to remove, the remaining nodes keep their order
+
+            Only pairs that involve an added node are scored, the sims of links between kept nodes are reused. 
+            Links are re-ranked and the graph is re-annotated (see reset_annotation()), so the result equals 
+            gen_storygraph()'s clustering and annotation of the kept and added nodes
+            returns storygraph JSON, or prev_graph if it is a CompactStoryGraph
+        '''
+        added_nodes = [] if added_nodes is None else added_nodes
+        removed = set() if removed is None else set(removed)
+
+        if( isinstance(prev_graph, CompactStoryGraph) ):
+            graph = prev_graph
+            prev_links = list( graph.iter_links() )
+            kept = [ i for i in range(len(graph)) if i not in removed ]
+            graph.nodes = [ graph.nodes[i] for i in kept ]
+        else:
+            prev_links = ( (lnk_dct['source'], lnk_dct['target'], lnk_dct['sim']) for lnk_dct in prev_graph['links'] )
+            kept = [ i for i in range(len(prev_graph['nodes'])) if i not in removed ]
+            #copies, so re-annotation does not change prev_graph
+            graph = self.get_compact_graph( [dict(prev_graph['nodes'][i]) for i in kept] )
+
+        new_indices = { old: new for new, old in enumerate(kept) }
+        links = [ (new_indices[source], new_indices[target], sim) for source, target, sim in prev_links if source in new_indices and target in new_indices and sim >= self.min_sim ]
+        
+        for story_node in graph.nodes:
+            ClusterNews.reset_annotation(story_node.node)
+        
+        added_start = len(graph)
+        for node in added_nodes:
+            graph.add_node(node)
+
+        pairs_count = 0
+        for first_story, second_story, sim in self.get_pair_sims_involving( graph, range(added_start, len(graph)) ):
+            pairs_count += 1
+            if( sim >= self.min_sim ):
+                links.append( (first_story, second_story, sim) )
+
+        logger.info( '\tupdate_storygraph(), kept: ' + str(added_start) + ', removed: ' + str(len(removed)) + ', added: ' + str(len(added_nodes)) + ', pairs count: ' + str(pairs_count) )
+
+        #same ranks as cluster_news(): descending sim, ties in itertools.combinations() order
+        graph.reset_links()
+        for first_story, second_story, sim in sorted( links, key=lambda lnk: (-lnk[2], lnk[0], lnk[1]) ):
+            graph.add_link(first_story, second_story, sim)
+
+        graph = ClusterNews.annotate(graph, min_avg_deg=self.kwargs['annotate_min_avg_deg'], min_uniq_src_count=self.kwargs['annotate_min_uniq_src_count'], graph_name=self.graph_name, graph_description=self.graph_description)
+        
+        return graph if isinstance(prev_graph, CompactStoryGraph) else self.get_graph_json(graph)
+
+    def get_pair_sims(self, nodes_lst):
+
+        '''
+            nodes_lst: list of storygraph nodes or CompactStoryGraph
+            yields (first_story, second_story, sim) in itertools.combinations() order
+            inverted-index skips pairs without a shared entity token, their sim is 0, 
+            so brute-force is used whenever a sim of 0 could satisfy min_sim
+        '''
+        nodes_lst = self.get_compact_graph(nodes_lst)
+        candidate_generation = self.kwargs['candidate_generation']
+        if( candidate_generation not in ['inverted-index', 'brute-force'] ):
+            logger.warning('\tClusterNews.get_pair_sims(), no candidate generation: ' + str(candidate_generation) + ' found, using "brute-force", try: "inverted-index" or "brute-force"')
+            candidate_generation = 'brute-force'
+
+        if( candidate_generation == 'brute-force' or self.min_sim <= 0 or self.sim_metric not in ['weighted-jaccard-overlap', 'jaccard', 'overlap'] ):
+            return self.get_brute_force_pair_sims(nodes_lst)
+
+        if( self.kwargs['sim_backend'] == 'sparse' ):
+            try:
+                import numpy
+                import scipy.sparse
+                return self.get_sparse_pair_sims(nodes_lst)
+            except ImportError:
+                logger.warning('\tClusterNews.get_pair_sims(), sim_backend "sparse" requires numpy and scipy, using "python"')
+
+        return self.get_inverted_index_pair_sims(nodes_lst)
+
+    def get_brute_force_pair_sims(self, nodes_lst):
+
+        ent_set_cache = self.get_ent_set_cache(nodes_lst)
+        indices = list( range( len(nodes_lst) ) )
+        
+        for first_story, second_story in itertools.combinations(indices, 2):
+            yield first_story, second_story, self.calc_cached_ent_sim(ent_set_cache, first_story, second_story)
+
+    def get_inverted_index_pair_sims(self, nodes_lst):
+
+        '''
+            posting lists: entity token id -> ascending story indices
+            only pairs sharing at least one token are scored, 
+            the shared-token count is the intersection size, so sets are not intersected per pair
+        '''
+        ent_sets = [ story_node.tok_ids for story_node in nodes_lst.nodes ]
+        sizes = [ 0 if tok_ids is None else len(tok_ids) for tok_ids in ent_sets ]
+
+        postings = {}
+        for i in range( len(ent_sets) ):
+            if( ent_sets[i] is None ):
+                continue
+            for tok in ent_sets[i]:
+                postings.setdefault(tok, []).append(i)
+
+        for first_story in range( len(ent_sets) ):
+            
+            if( ent_sets[first_story] is None ):
+                continue
+            
+            intersections = {}
+            for tok in ent_sets[first_story]:
+                posting = postings[tok]
+                for j in range( bisect_right(posting, first_story), len(posting) ):
+                    second_story = posting[j]
+                    intersections[second_story] = intersections.get(second_story, 0) + 1
+
+            for second_story in sorted(intersections):
+                yield first_story, second_story, self.calc_sim_frm_counts( intersections[second_story], sizes[first_story], sizes[second_story] )
+
+    def get_sparse_pair_sims(self, nodes_lst):
+
+        '''
+            entity sets are rows of a sparse binary (story x token id) matrix, 
+            so the intersection counts of a block of stories against all stories is: block @ matrix.T
+            only sparse_block_size rows are multiplied at a time to bound memory
+            only pairs with sim >= min_sim are yielded
+        '''
+        import numpy as np
+        from scipy import sparse
+
+        block_size = max( 1, int(self.kwargs['sparse_block_size']) )
+        story_count = len(nodes_lst)
+
+        rows = []
+        cols = []
+        sizes = []
+        for i in range(story_count):
+            
+            tok_ids = nodes_lst.nodes[i].tok_ids
+            if( tok_ids is None ):
+                sizes.append( 0 )
+                continue
+
+            sizes.append( len(tok_ids) )
+            rows += [i] * len(tok_ids)
+            cols += tok_ids
+
+        ent_mat = sparse.csr_matrix( (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(story_count, max(1, len(nodes_lst.tok_vocab))) )
+        ent_mat_t = ent_mat.T.tocsc()
+        sizes = np.array(sizes, dtype=np.int64)
+
+        for start in range(0, story_count, block_size):
+
+            intersections = ( ent_mat[start:start + block_size] @ ent_mat_t ).tocoo()
+            first_stories = intersections.row.astype(np.int64) + start
+            second_stories = intersections.col.astype(np.int64)
+            
+            upper = second_stories > first_stories
+            first_stories = first_stories[upper]
+            second_stories = second_stories[upper]
+            counts = intersections.data[upper].astype(np.int64)
+
+            sims = ClusterNews.sim_frm_count_arrays( self.sim_metric, counts, sizes[first_stories], sizes[second_stories], jaccard_weight=self.jaccard_weight )
+            for k in np.lexsort( (second_stories, first_stories) ):
+                if( sims[k] >= self.min_sim ):
+                    yield int(first_stories[k]), int(second_stories[k]), float(sims[k])
 
-        logger.info( 'pairs count: ' + str(len(pairs)) )
+    def get_pair_sims_involving(self, graph, story_indices):
+
+        '''
+            yields (first_story, second_story, sim), first_story < second_story, in no particular order, 
+            for the pairs of graph (CompactStoryGraph) that include a story in story_indices
+            candidates are generated as in get_pair_sims(), with posting lists for inverted-index
+        '''
+        stories = set(story_indices)
+        sizes = [ 0 if story_node.tok_ids is None else len(story_node.tok_ids) for story_node in graph.nodes ]
+        
+        if( self.kwargs['candidate_generation'] != 'inverted-index' or self.min_sim <= 0 or self.sim_metric not in ['weighted-jaccard-overlap', 'jaccard', 'overlap'] ):
+            
+            for story in sorted(stories):
+                for other in range( len(graph) ):
+                    
+                    #pairs of two stories in story_indices are yielded once
+                    if( other == story or (other in stories and other < story) ):
+                        continue
+
+                    first_story, second_story = min(story, other), max(story, other)
+                    if( graph.nodes[story].tok_ids is None or graph.nodes[other].tok_ids is None ):
+                        yield first_story, second_story, 0
+                    else:
+                        intersection = len( frozenset(graph.nodes[story].tok_ids) & frozenset(graph.nodes[other].tok_ids) )
+                        yield first_story, second_story, self.calc_sim_frm_counts( intersection, sizes[first_story], sizes[second_story] )
+            return
+
+        postings = {}
+        for i in range( len(graph) ):
+            if( graph.nodes[i].tok_ids is None ):
+                continue
+            for tok in graph.nodes[i].tok_ids:
+                postings.setdefault(tok, []).append(i)
+
+        for story in sorted(stories):
+            
+            if( graph.nodes[story].tok_ids is None ):
+                continue
+
+            intersections = {}
+            for tok in graph.nodes[story].tok_ids:
+                for other in postings[tok]:
+                    if( other == story or (other in stories and other < story) ):
+                        continue
+                    intersections[other] = intersections.get(other, 0) + 1
+
+            for other, intersection in intersections.items():
+                first_story, second_story = min(story, other), max(story, other)
+                yield first_story, second_story, self.calc_sim_frm_counts( intersection, sizes[first_story], sizes[second_story] )
+
+    def get_ent_set_cache(self, nodes_lst):
+
+        '''
+            nodes_lst: list of storygraph nodes or CompactStoryGraph
+            each node's entity tokens (CompactStoryGraph tok_ids) as sets of integer ids from a vocabulary shared by all nodes
+            ent_set_cache format:
+            {
+                'vocab': {token: token_id},
+                'sets': [frozenset of token_id or None if node has no entity container],
+                'sizes': [len of set or 0 if node has no entity container]
+            }
+        '''
+        graph = self.get_compact_graph(nodes_lst)
+        ent_sets = []
+        sizes = []
+
+        for story_node in graph.nodes:
+
+            if( story_node.tok_ids is None ):
+                ent_sets.append( None )
+                sizes.append( 0 )
+                continue
+
+            ent_sets.append( frozenset(story_node.tok_ids) )
+            sizes.append( len(story_node.tok_ids) )
 
         return {
-            'links': links, 
-            'nodes': nodes_lst,
-            'connected-comps': [],
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
-            'custom': {'description': self.graph_description, 'name': self.graph_name}
+            'vocab': graph.tok_vocab,
+            'sets': ent_sets,
+            'sizes': sizes
         }
 
+    def calc_cached_ent_sim(self, ent_set_cache, first_story, second_story):
+
+        first_set = ent_set_cache['sets'][first_story]
+        second_set = ent_set_cache['sets'][second_story]
+
+        if( first_set is None or second_set is None ):
+            return 0
+
+        return self.calc_sim_frm_counts( len(first_set & second_set), ent_set_cache['sizes'][first_story], ent_set_cache['sizes'][second_story] )
+
+    def calc_sim_frm_counts(self, intersection, first_size, second_size):
+
+        if( self.sim_metric == 'overlap' ):
+            return ClusterNews.overlap_frm_counts(intersection, first_size, second_size)
+
+        elif( self.sim_metric == 'jaccard' ):
+            return ClusterNews.jaccard_frm_counts(intersection, first_size, second_size)
+
+        elif( self.sim_metric == 'weighted-jaccard-overlap' ):
+            return ClusterNews.weighted_jaccard_overlap_frm_counts( intersection, first_size, second_size, jaccard_weight=self.jaccard_weight )
+        
+        logger.warning('\tClusterNews.calc_sim_frm_counts(), no similarity metric: ' + self.sim_metric + ' found, similarity set to minimum (0), try: "weighted-jaccard-overlap", "jaccard", or "overlap"')
+        return 0
+
     def calc_ent_sim(self, nodes_lst, first_story, second_story):
 
         if( self.entity_container_key not in nodes_lst[first_story] or self.entity_container_key not in nodes_lst[second_story] ):
@@ -147,29 +532,27 @@ class ClusterNews(object):
         return sim
 
     @staticmethod
-    def jaccard_set_pair(first_set, second_set):
+    def jaccard_frm_counts(intersection, first_size, second_size):
 
-        intersection = float(len(first_set & second_set))
-        union = len(first_set | second_set)
+        union = first_size + second_size - intersection
 
         if( union != 0 ):
-            return intersection/union
+            return float(intersection)/union
         else:
             return 0
 
     @staticmethod
-    def overlap_set_pair(first_set, second_set):
+    def overlap_frm_counts(intersection, first_size, second_size):
 
-        intersection = float(len(first_set & second_set))
-        minimum = min(len(first_set), len(second_set))
+        minimum = min(first_size, second_size)
 
         if( minimum != 0 ):
-            return intersection/minimum
+            return float(intersection)/minimum
         else:
             return 0
 
     @staticmethod
-    def weighted_jaccard_overlap_sim(first_set, second_set, jaccard_weight):
+    def weighted_jaccard_overlap_frm_counts(intersection, first_size, second_size, jaccard_weight):
 
         if( jaccard_weight > 1 ):
             jaccard_weight = 1
@@ -178,44 +561,66 @@ class ClusterNews(object):
 
         overlap_weight = 1 - jaccard_weight
 
-        jaccard_weight = jaccard_weight * ClusterNews.jaccard_set_pair(first_set, second_set)
-        overlap_weight = overlap_weight * ClusterNews.overlap_set_pair(first_set, second_set)
+        jaccard_weight = jaccard_weight * ClusterNews.jaccard_frm_counts(intersection, first_size, second_size)
+        overlap_weight = overlap_weight * ClusterNews.overlap_frm_counts(intersection, first_size, second_size)
 
         return jaccard_weight + overlap_weight
 
     @staticmethod
-    def unused_word_tokenizer(txt, split_pattern="[^a-zA-Z0-9.'’]"):
-        txt = txt.replace('\n', ' ')
-        return split(split_pattern, txt)
+    def sim_frm_count_arrays(sim_metric, intersections, first_sizes, second_sizes, jaccard_weight=0.3):
+
+        '''
+            numpy counterpart of the *_frm_counts() functions over arrays of pairs
+        '''
+        import numpy as np
+
+        intersections = intersections.astype(np.float64)
+        
+        unions = first_sizes + second_sizes - intersections
+        jaccard = np.divide( intersections, unions, out=np.zeros(len(intersections)), where=unions != 0 )
+        if( sim_metric == 'jaccard' ):
+            return jaccard
+
+        minimums = np.minimum(first_sizes, second_sizes)
+        overlap = np.divide( intersections, minimums, out=np.zeros(len(intersections)), where=minimums != 0 )
+        if( sim_metric == 'overlap' ):
+            return overlap
+
+        if( jaccard_weight > 1 ):
+            jaccard_weight = 1
+        elif( jaccard_weight < 0 ):
+            jaccard_weight = 0
+
+        return jaccard_weight * jaccard + (1 - jaccard_weight) * overlap
 
     @staticmethod
-    def get_set_frm_cluster(cluster, extraction_key):
+    def jaccard_set_pair(first_set, second_set):
+        return ClusterNews.jaccard_frm_counts( len(first_set & second_set), len(first_set), len(second_set) )
 
-        ent_set = set()
+    @staticmethod
+    def overlap_set_pair(first_set, second_set):
+        return ClusterNews.overlap_frm_counts( len(first_set & second_set), len(first_set), len(second_set) )
 
-        for set_member in cluster:
-            
-            if( 'class' not in set_member or extraction_key not in set_member ):
-                continue
+    @staticmethod
+    def weighted_jaccard_overlap_sim(first_set, second_set, jaccard_weight):
+        return ClusterNews.weighted_jaccard_overlap_frm_counts( len(first_set & second_set), len(first_set), len(second_set), jaccard_weight=jaccard_weight )
 
-            if( set_member['class'].upper() in ['DATE', 'PERCENT', 'MONEY'] ):
-                #don't tokenize datetimes and percent and money
-                ent_set.add( set_member[extraction_key].lower() )
-            else:
-                ent_toks = set_member[extraction_key].lower().split(' ')
-                for sing_tok in ent_toks:
-                    
-                    sing_tok = sing_tok.strip()
-                    if( sing_tok != '' ):
-                        ent_set.add( sing_tok )
+    @staticmethod
+    def unused_word_tokenizer(txt, split_pattern="[^a-zA-Z0-9.'’]"):
+        txt = txt.replace('\n', ' ')
+        return split(split_pattern, txt)
 
-        return ent_set
+    @staticmethod
+    def get_set_frm_cluster(cluster, extraction_key):
+        return CompactStoryGraph.get_ent_tokens(cluster, extraction_key)
 
     #annotate news graph - start
 
     @staticmethod
     def connected_component_subgraphs(G):
         
+        import networkx as nx
+        
         all_cc = []
         for c in nx.connected_components(G):
             all_cc.append( G.subgraph(c) )
@@ -234,42 +639,73 @@ class ClusterNews(object):
         return s/float(nnodes)
 
     @staticmethod
-    def news_event_annotate(annotation_name, story_graph, min_avg_deg, min_uniq_src_count, **kwargs):
+    def reset_annotation(node, annotation_name='event-cluster'):
 
-        if( 'links' not in story_graph or 'nodes' not in story_graph ):
-            return story_graph
+        '''
+            removes what news_event_annotate() added to node (in place), so the node is annotated as a new node:
+            its id, connected-comp-type, and annotation and color unless the node-details came with another annotation (e.g., polarity)
+            node-details is replaced with a copy, so a node shared with another graph is not changed
+        '''
+        node_details = node.get('node-details')
+        if( isinstance(node_details, dict) ):
+            
+            node_details = dict(node_details)
+            if( node_details.get('annotation') == annotation_name ):
+                node_details.pop('annotation')
+                node_details.pop('color', None)
+            node_details.pop('connected-comp-type', None)
+
+            if( len(node_details) == 0 ):
+                node.pop('node-details')
+            else:
+                node['node-details'] = node_details
+
+        if( 'id' in node and 'link' in node and str(node['id']).startswith(getDomain(node['link']) + '-') ):
+            node.pop('id')
+
+    @staticmethod
+    def news_event_annotate(annotation_name, story_graph, min_avg_deg, min_uniq_src_count, **kwargs):
 
         '''
+            story_graph: storygraph JSON or CompactStoryGraph (annotated in place)
             precondition for unique src count:
             "link" in story_graph['nodes']
         '''
+        if( isinstance(story_graph, CompactStoryGraph) ):
+            story_nodes = [ story_node.node for story_node in story_graph.nodes ]
+            edges = zip(story_graph.sources, story_graph.targets)
+            edge_count = len(story_graph.sims)
+        elif( 'links' not in story_graph or 'nodes' not in story_graph ):
+            return story_graph
+        else:
+            story_nodes = story_graph['nodes']
+            edges = ( (edge['source'], edge['target']) for edge in story_graph['links'] )
+            edge_count = len(story_graph['links'])
         
         #reset state - start
         domain_count = {}
-        for i in range(0, len(story_graph['nodes'])):
-
-            node = story_graph['nodes'][i]
-            if( 'link' not in node or 'id' in node ):
-                continue
+        id_nodes = [ node for node in story_nodes if 'link' in node and 'id' not in node ]
+        for node, domain in zip( id_nodes, getDomains([node['link'] for node in id_nodes]) ):
             
             node.setdefault('node-details', {})
             node['node-details'].setdefault('annotation', annotation_name)
             node['node-details']['connected-comp-type'] = ''
 
-            domain = getDomain( node['link'] )
             domain_count.setdefault( domain, -1 )
             domain_count[domain] += 1
             node['id'] = domain + '-' + str(domain_count[domain])
         #reset state - end  
 
-        if( len(story_graph['links']) == 0 ):
+        if( edge_count == 0 ):
             return story_graph
 
+        import networkx as nx
+
         G = nx.Graph()
-        for edge in story_graph['links']:
-            G.add_edge(edge['source'], edge['target'])
+        for source, target in edges:
+            G.add_edge(source, target)
         
-        story_graph['connected-comps'] = []
+        connected_comps = []
         subgraphs = ClusterNews.connected_component_subgraphs(G)
 
         for subgraph in subgraphs:
@@ -279,9 +715,9 @@ class ClusterNews(object):
             unique_src_count = {}
 
             for story_idx in nodes:
-                if( 'id' not in story_graph['nodes'][story_idx] ):
+                if( 'id' not in story_nodes[story_idx] ):
                     continue
-                source = story_graph['nodes'][story_idx]['id'].split('-')[0]
+                source = story_nodes[story_idx]['id'].split('-')[0]
                 unique_src_count[source] = True
 
             conn_comp_type = {}
@@ -301,11 +737,16 @@ class ClusterNews(object):
             conn_comp_dets['unique-source-count'] = len(unique_src_count)
 
             for story_idx in nodes:
-                if( 'color' not in story_graph['nodes'][story_idx]['node-details'] ):
-                    story_graph['nodes'][story_idx]['node-details']['color'] = conn_comp_type['color']
-                story_graph['nodes'][story_idx]['node-details']['connected-comp-type'] = conn_comp_type['connected-comp-type']
+                if( 'color' not in story_nodes[story_idx]['node-details'] ):
+                    story_nodes[story_idx]['node-details']['color'] = conn_comp_type['color']
+                story_nodes[story_idx]['node-details']['connected-comp-type'] = conn_comp_type['connected-comp-type']
 
-            story_graph['connected-comps'].append(conn_comp_dets)
+            connected_comps.append(conn_comp_dets)
+
+        if( isinstance(story_graph, CompactStoryGraph) ):
+            story_graph.connected_comps = connected_comps
+        else:
+            story_graph['connected-comps'] = connected_comps
 
         return story_graph
 
@@ -0,0 +1,236 @@
+import logging
+
+from array import array
+
+logger = logging.getLogger('sgsuite.sgsuite')
+
+class StoryNode(object):
+
+    '''
+        node: the storygraph node dict added (not a copy), with release_entities (see CompactStoryGraph) a shallow copy, 
+            while its entities are released, the entity container holds a None placeholder, so the key keeps its position
+        ent_ids, class_ids: released entity strings and entity classes as vocabulary ids (None if the entities are not released, then the list stays in node)
+        tok_ids: ascending entity token ids (None if the node has no entity container)
+    '''
+    __slots__ = ('node', 'ent_ids', 'class_ids', 'tok_ids')
+
+    def __init__(self, node, ent_ids=None, class_ids=None, tok_ids=None):
+        self.node = node
+        self.ent_ids = ent_ids
+        self.class_ids = class_ids
+        self.tok_ids = tok_ids
+
+class CompactStoryGraph(object):
+
+    def __init__(self, entity_container_key='entities', entity_extraction_key='entity', release_entities=False):
+
+        '''
+            Internal representation of a storygraph used by ClusterNews.cluster_news() and annotate():
+                nodes: StoryNode records of the node dicts added (annotate() updates the dicts), entity tokens are stored once in a vocabulary and referenced by id
+                links: parallel arrays of source, target and sim (links are ranked by their position once sort_links() is called), 
+                    int_sims flags the sims added as int (e.g., 0), so they are output unchanged
+            release_entities: entity lists (NER output) of the nodes added are replaced by vocabulary ids of entity strings and classes (e.g., 'PERSON'), 
+                the graph then keeps shallow copies of the node dicts (the caller's dicts are neither released nor annotated), 
+                for node dicts the caller does not keep (e.g., gen_storygraph()), the lists are restored by get_node_json()
+            to_json() and the iter_json_*() functions convert to the storygraph JSON schema, the nodes are the dicts added
+        '''
+        self.entity_container_key = entity_container_key
+        self.entity_extraction_key = entity_extraction_key
+        self.release_entities = release_entities
+
+        self.ent_vocab = {}
+        self.ent_strs = []
+        self.class_vocab = {}
+        self.class_strs = []
+        self.tok_vocab = {}
+
+        self.nodes = []
+        self.sources = array('i')
+        self.targets = array('i')
+        self.sims = array('d')
+        self.int_sims = array('b')
+        self.connected_comps = []
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @staticmethod
+    def from_nodes(nodes_lst, entity_container_key='entities', entity_extraction_key='entity', release_entities=False):
+
+        graph = CompactStoryGraph(entity_container_key=entity_container_key, entity_extraction_key=entity_extraction_key, release_entities=release_entities)
+        for node in nodes_lst:
+            graph.add_node(node)
+
+        return graph
+
+    @staticmethod
+    def get_vocab_id(vocab, strs, val):
+
+        val_id = vocab.get(val)
+        if( val_id is None ):
+            val_id = len(strs)
+            vocab[val] = val_id
+            strs.append(val)
+
+        return val_id
+
+    def add_node(self, node):
+
+        '''
+            adds node (storygraph node dict) and returns its index
+        '''
+        self.nodes.append( self.get_story_node(node) )
+        return len(self.nodes) - 1
+
+    def set_node(self, i, node):
+
+        '''
+            sets node i, for nodes that arrive out of order (e.g., from stream_entities_frm_links()), 
+            nodes before i not set yet are None until they are set
+        '''
+        if( i >= len(self.nodes) ):
+            self.nodes += [None] * (i + 1 - len(self.nodes))
+
+        self.nodes[i] = self.get_story_node(node)
+
+    def remove_unset_nodes(self):
+
+        '''
+            removes the nodes not set (None, see set_node()) before links are added, returns the former indices of the nodes kept
+        '''
+        kept = [ i for i in range(len(self.nodes)) if self.nodes[i] is not None ]
+        if( len(kept) != len(self.nodes) ):
+            self.nodes = [ self.nodes[i] for i in kept ]
+
+        return kept
+
+    def get_story_node(self, node):
+
+        story_node = StoryNode( dict(node) if self.release_entities else node )
+        node = story_node.node
+        if( self.entity_container_key in node ):
+
+            entities = node[self.entity_container_key]
+            ent_set = CompactStoryGraph.get_ent_tokens(entities, self.entity_extraction_key)
+            story_node.tok_ids = array( 'i', sorted([ self.tok_vocab.setdefault(tok, len(self.tok_vocab)) for tok in ent_set ]) )
+
+            if( self.release_entities and self.is_compactable(entities) ):
+                story_node.ent_ids = array( 'i', [ CompactStoryGraph.get_vocab_id(self.ent_vocab, self.ent_strs, e[self.entity_extraction_key]) for e in entities ] )
+                story_node.class_ids = array( 'i', [ CompactStoryGraph.get_vocab_id(self.class_vocab, self.class_strs, e['class']) for e in entities ] )
+                node[self.entity_container_key] = None
+
+        return story_node
+
+    @staticmethod
+    def get_ent_tokens(entities, extraction_key):
+
+        '''
+            set of lowercase entity tokens: DATE, PERCENT and MONEY entities are single tokens, others are split by space
+        '''
+        ent_set = set()
+
+        for set_member in entities:
+            
+            if( 'class' not in set_member or extraction_key not in set_member ):
+                continue
+
+            if( set_member['class'].upper() in ['DATE', 'PERCENT', 'MONEY'] ):
+                #don't tokenize datetimes and percent and money
+                ent_set.add( set_member[extraction_key].lower() )
+            else:
+                ent_toks = set_member[extraction_key].lower().split(' ')
+                for sing_tok in ent_toks:
+                    
+                    sing_tok = sing_tok.strip()
+                    if( sing_tok != '' ):
+                        ent_set.add( sing_tok )
+
+        return ent_set
+
+    def is_compactable(self, entities):
+
+        '''
+            entities are stored as ids only if they are [{entity_extraction_key: str, 'class': str}] (NER output), so to_json() returns them unchanged
+        '''
+        if( isinstance(entities, list) is False ):
+            return False
+
+        keys = [self.entity_extraction_key, 'class']
+        for e in entities:
+            if( isinstance(e, dict) is False or list(e.keys()) != keys or isinstance(e[keys[0]], str) is False or isinstance(e['class'], str) is False ):
+                return False
+
+        return True
+
+    def get_entities(self, i):
+
+        story_node = self.nodes[i]
+        if( story_node.ent_ids is None ):
+            return story_node.node.get(self.entity_container_key)
+
+        return [ {self.entity_extraction_key: self.ent_strs[e], 'class': self.class_strs[c]} for e, c in zip(story_node.ent_ids, story_node.class_ids) ]
+
+    def add_link(self, source, target, sim):
+
+        self.sources.append(source)
+        self.targets.append(target)
+        self.sims.append(sim)
+        self.int_sims.append( 1 if isinstance(sim, int) else 0 )
+
+    def reset_links(self):
+
+        self.sources = array('i')
+        self.targets = array('i')
+        self.sims = array('d')
+        self.int_sims = array('b')
+        self.connected_comps = []
+
+    def get_sim(self, i):
+        return int(self.sims[i]) if self.int_sims[i] else self.sims[i]
+
+    def iter_links(self):
+        for i in range( len(self.sims) ):
+            yield self.sources[i], self.targets[i], self.get_sim(i)
+
+    def sort_links(self):
+
+        '''
+            orders links by descending sim, links with the same sim keep their order (stable sort), the rank of a link is its position + 1
+        '''
+        order = sorted( range(len(self.sims)), key=self.sims.__getitem__, reverse=True )
+
+        self.sources = array( 'i', [self.sources[i] for i in order] )
+        self.targets = array( 'i', [self.targets[i] for i in order] )
+        self.sims = array( 'd', [self.sims[i] for i in order] )
+        self.int_sims = array( 'b', [self.int_sims[i] for i in order] )
+
+    def get_node_json(self, i):
+
+        '''
+            returns the node dict added, with its released entities restored
+        '''
+        story_node = self.nodes[i]
+        if( story_node.ent_ids is not None ):
+            story_node.node[self.entity_container_key] = self.get_entities(i)
+            story_node.ent_ids = None
+            story_node.class_ids = None
+
+        return story_node.node
+
+    def iter_json_nodes(self):
+        for i in range( len(self.nodes) ):
+            yield self.get_node_json(i)
+
+    def iter_json_links(self):
+        for i in range( len(self.sims) ):
+            yield {'source': self.sources[i], 'target': self.targets[i], 'sim': self.get_sim(i), 'rank': i + 1}
+
+    def to_json(self, timestamp, custom):
+
+        return {
+            'links': list( self.iter_json_links() ),
+            'nodes': list( self.iter_json_nodes() ),
+            'connected-comps': self.connected_comps,
+            'timestamp': timestamp,
+            'custom': custom
+        }
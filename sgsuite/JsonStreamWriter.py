@@ -0,0 +1,193 @@
+import gzip
+import json
+import logging
+import tempfile
+
+logger = logging.getLogger('sgsuite.sgsuite')
+
+def get_json_backend(json_backend='auto'):
+
+    '''
+        json_backend: "auto" (orjson if installed, else json), "orjson", or "json"
+        returns the name of the backend in use
+    '''
+    if( json_backend not in ['auto', 'orjson', 'json'] ):
+        logger.warning('\tget_json_backend(), no json backend: ' + str(json_backend) + ' found, using "auto", try: "auto", "orjson", or "json"')
+        json_backend = 'auto'
+
+    if( json_backend == 'json' ):
+        return 'json'
+
+    try:
+        import orjson
+        return 'orjson'
+    except ImportError:
+        if( json_backend == 'orjson' ):
+            logger.warning('\tget_json_backend(), orjson is not installed, using "json", try: pip install orjson')
+
+    return 'json'
+
+class JsonStreamWriter(object):
+
+    def __init__(self, outfilename, indentFlag=False, json_backend='auto', compress=None):
+
+        '''
+            Writes JSON incrementally, so a document (e.g., a storygraph) is never held in memory as a whole:
+                JSON lines: write_line()
+                JSON document: begin_object()/begin_list() ... write_item() ... end_object()/end_list()
+            the output is identical to json.dump(ensure_ascii=False) of the same document (indent=4 if indentFlag),
+            except with the orjson backend (indentFlag=False only) whose separators have no spaces
+            compress: gzip output, default: outfilename ends with ".gz"
+        '''
+        self.outfilename = outfilename
+        self.indentFlag = indentFlag
+        self.json_backend = 'json' if indentFlag else get_json_backend(json_backend)
+        self.compress = outfilename.endswith('.gz') if compress is None else compress
+
+        self.item_separator, self.key_separator = (',', ':') if self.json_backend == 'orjson' else (', ', ': ')
+        if( indentFlag ):
+            self.item_separator = ','
+
+        #count of items written in each open container
+        self.item_counts = []
+        self.outfile = gzip.open(outfilename, 'wt', encoding='utf-8') if self.compress else open(outfilename, 'w', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.outfile.close()
+
+    def dumps(self, obj):
+
+        if( self.json_backend == 'orjson' ):
+            import orjson
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+            except TypeError:
+                #orjson.JSONEncodeError, e.g., integers beyond 64 bits
+                pass
+
+        if( self.indentFlag ):
+            return json.dumps(obj, ensure_ascii=False, indent=4).replace( '\n', '\n' + ' ' * 4 * len(self.item_counts) )
+
+        return json.dumps(obj, ensure_ascii=False)
+
+    def write_line(self, obj):
+        self.outfile.write( self.dumps(obj) + '\n' )
+
+    def get_prefix(self, key):
+
+        '''
+            separator, indentation and key that precede the next item of the open container
+        '''
+        prefix = ''
+        if( len(self.item_counts) != 0 ):
+
+            if( self.item_counts[-1] != 0 ):
+                prefix += self.item_separator
+
+            if( self.indentFlag ):
+                prefix += '\n' + ' ' * 4 * len(self.item_counts)
+
+        if( key is not None ):
+            prefix += self.dumps(key) + self.key_separator
+
+        return prefix
+
+    def write(self, text, key=None):
+
+        '''
+            text is serialized before anything is written and written with its prefix at once (text files encode a write as a whole), 
+            so an item that fails to encode (e.g., lone surrogates) raises without leaving partial JSON
+        '''
+        self.outfile.write( self.get_prefix(key) + text )
+        if( len(self.item_counts) != 0 ):
+            self.item_counts[-1] += 1
+
+    def write_item(self, obj, key=None):
+
+        '''
+            writes obj as the next item of the open list, or the value of key in the open object
+        '''
+        self.write( self.dumps(obj), key=key )
+
+    def begin_container(self, opening, key):
+
+        self.write(opening, key=key)
+        self.item_counts.append(0)
+
+    def end_container(self, closing):
+
+        if( self.item_counts.pop() != 0 and self.indentFlag ):
+            self.outfile.write( '\n' + ' ' * 4 * len(self.item_counts) )
+
+        self.outfile.write(closing)
+
+    def begin_object(self, key=None):
+        self.begin_container('{', key)
+
+    def end_object(self):
+        self.end_container('}')
+
+    def begin_list(self, key=None):
+        self.begin_container('[', key)
+
+    def end_list(self):
+        self.end_container(']')
+
+class JsonSpool(object):
+
+    def __init__(self, json_backend='auto', spool_dir=None):
+
+        '''
+            Temporary file of JSON records put in any order and read back by key, e.g., storygraph nodes that 
+            finish NER out of order but are written after the links, only the file offsets are kept in memory
+        '''
+        self.json_backend = get_json_backend(json_backend)
+        self.spool = tempfile.TemporaryFile(dir=spool_dir)
+        self.offsets = {}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def close(self):
+        self.spool.close()
+
+    def put(self, key, obj):
+
+        record = None
+        if( self.json_backend == 'orjson' ):
+            import orjson
+            try:
+                record = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass
+
+        if( record is None ):
+            #ensure_ascii escapes surrogates, which utf-8 cannot encode
+            record = json.dumps(obj).encode('utf-8')
+
+        self.spool.seek(0, 2)
+        self.offsets[key] = self.spool.tell()
+        self.spool.write(record + b'\n')
+
+    def get(self, key):
+
+        self.spool.seek( self.offsets[key] )
+        record = self.spool.readline()
+
+        if( self.json_backend == 'orjson' ):
+            import orjson
+            try:
+                return orjson.loads(record)
+            except ValueError:
+                pass
+
+        return json.loads(record)
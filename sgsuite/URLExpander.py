@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urljoin
+from urllib.parse import urlparse
+
+from sgsuite.version import __appversion__
+
+logger = logging.getLogger('sgsuite.sgsuite')
+class URLExpander(object):
+
+    redirect_codes = [301, 302, 303, 307, 308]
+
+    def __init__(self, max_hops=20, timeout=10, max_concurrency=10, headers=None, url_cache=None):
+
+        '''
+            Resolves redirect chains (e.g., of shortened links) in-process on a shared requests.Session (pooled keep-alive connections)
+            each hop is a HEAD request, retried as GET (body not downloaded) if HEAD fails or is rejected (403, 405, 501)
+            relative Location headers are resolved against the URL of the hop, at most max_hops redirects are followed
+            cookies set along a chain are sent on its later hops, but are not kept across expand() calls
+
+            headers: default is a non-browser User-Agent (as curl's), since some shorteners answer browsers with HTML instead of a redirect
+            max_concurrency: threads for expand_urls() and expand_urls_async()
+            url_cache: sgsuite.cache.URLCache consulted before, and updated after, expanding
+        '''
+        self.max_hops = max_hops
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.headers = {'User-Agent': 'sgsuite/' + __appversion__, 'Accept': '*/*'} if headers is None else headers
+        self.url_cache = url_cache
+
+        self.session = requests.Session()
+        #cookies are kept per expand() call, see get_hop()
+        self.session.cookies.set_policy( DefaultCookiePolicy(allowed_domains=[]) )
+        adapter = requests.adapters.HTTPAdapter(pool_connections=100, pool_maxsize=self.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def get_hop(self, url, cookies, timeout):
+
+        '''
+            returns the response of url (HEAD, else GET), None on error
+        '''
+        for method in ['HEAD', 'GET']:
+
+            try:
+                response = self.session.request(method, url, headers=self.headers, cookies=cookies, timeout=timeout, allow_redirects=False, stream=True)
+            except:
+                logger.debug('\tURLExpander.get_hop(), ' + method + ' error url: ' + url)
+                continue
+
+            if( method == 'HEAD' and response.status_code in [403, 405, 501] ):
+                response.close()
+                continue
+
+            requests.cookies.extract_cookies_to_jar(cookies, response.request, response.raw)
+            response.close()
+            return response
+
+        return None
+
+    def expand(self, url, timeout=None, url_cache=None):
+
+        '''
+            returns the URL at the end of url's redirect chain,
+            or the last URL reached if a hop fails or max_hops redirects were followed
+            url_cache: sgsuite.cache.URLCache to use instead of self.url_cache
+        '''
+        url = url.strip()
+        if( len(url) == 0 ):
+            return ''
+
+        url_cache = self.url_cache if url_cache is None else url_cache
+        if( url_cache is not None ):
+            long_url = url_cache.get(url)
+            if( long_url is not None ):
+                return long_url
+
+        long_url, ok = self.resolve(url, timeout=timeout)
+        if( url_cache is not None ):
+            url_cache.put(url, long_url, ok=ok)
+
+        return long_url
+
+    def resolve(self, url, timeout=None):
+
+        '''
+            returns (URL at the end of url's redirect chain, False if a hop failed, max_hops ran out or a Location is not http(s): 
+            the chain is unfinished, so URLCache keeps the result for negative_ttl only)
+        '''
+        timeout = self.timeout if timeout is None else timeout
+        cookies = requests.cookies.RequestsCookieJar()
+
+        for hop in range(self.max_hops + 1):
+
+            response = self.get_hop(url, cookies, timeout)
+            if( response is None ):
+                return url, False
+
+            location = response.headers.get('Location', '').strip()
+            if( response.status_code not in URLExpander.redirect_codes or location == '' ):
+                return url, True
+
+            next_url = urljoin(url, location)
+            if( urlparse(next_url).scheme not in ['http', 'https'] or hop == self.max_hops ):
+                break
+
+            url = next_url
+
+        logger.info('\tURLExpander.resolve(), stopped at: ' + url + ', next: ' + next_url)
+        return url, False
+
+    def expand_urls(self, urls, timeout=None, url_cache=None):
+
+        '''
+            returns expand() of each URL in urls order, max_concurrency at a time
+        '''
+        return list( self.executor.map(lambda url: self.expand(url, timeout=timeout, url_cache=url_cache), urls) )
+
+    async def expand_async(self, url, timeout=None, url_cache=None):
+        return await asyncio.get_running_loop().run_in_executor( self.executor, self.expand, url, timeout, url_cache )
+
+    async def expand_urls_async(self, urls, timeout=None, url_cache=None):
+        return await asyncio.gather( *[self.expand_async(url, timeout=timeout, url_cache=url_cache) for url in urls] )
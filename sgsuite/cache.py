@@ -0,0 +1,444 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from urllib.parse import urlparse
+
+from sgsuite.util import genericErrorInfo
+from sgsuite.version import __appversion__
+
+logger = logging.getLogger('sgsuite.sgsuite')
+
+class SQLiteIndex(object):
+
+    def __init__(self, db_path, schema):
+
+        '''
+            sqlite database shared by threads (one connection guarded by a lock) and processes (WAL journal)
+        '''
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+
+        with self.lock:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(schema)
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class HTMLCache(object):
+
+    def __init__(self, cache_dir, ttl=None, max_size=500000000, evict_interval=1000):
+
+        '''
+            On-disk cache of dereferenced HTML keyed by get_key() (full normalized URI, query string kept)
+            cache_dir/index.sqlite indexes gzipped pages stored as cache_dir/xx/sha256-of-key.html.gz
+            ttl: seconds after which an entry expires (None: never)
+            max_size: bytes (compressed) kept, least recently used entries are evicted first
+            evict_interval: puts between full sweeps (expired entries, size recount for puts by other processes),
+                in between a running total of the size triggers eviction
+        '''
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self.evict_interval = evict_interval
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = SQLiteIndex( os.path.join(cache_dir, 'index.sqlite'), 'CREATE TABLE IF NOT EXISTS html (key TEXT PRIMARY KEY, filename TEXT, size INTEGER, created REAL, last_access REAL)' )
+        self.total_size = self.get_total_size()
+
+    @staticmethod
+    def get_key(uri):
+
+        '''
+            scheme, fragment, default port, trailing slash and utm_* tracking parameters are ignored,
+            other query parameters are kept (?id=1 and ?id=2 are different pages)
+        '''
+        uri = uri.strip()
+        if( len(uri) == 0 ):
+            return ''
+
+        try:
+            scheme, netloc, path, params, query, fragment = urlparse(uri)
+        except:
+            genericErrorInfo('\tHTMLCache.get_key() uri: ' + uri)
+            return ''
+
+        netloc = netloc.strip().lower()
+        if( netloc.endswith(':80') or netloc.endswith(':443') ):
+            netloc = netloc.rsplit(':', 1)[0]
+
+        path = path.strip()
+        if( path == '' or path[-1] != '/' ):
+            path = path + '/'
+
+        if( params != '' ):
+            path = path + ';' + params
+
+        query = [ q for q in query.split('&') if q != '' and q.lower().startswith('utm_') is False ]
+        if( len(query) != 0 ):
+            path = path + '?' + '&'.join(query)
+
+        return netloc + path
+
+    @staticmethod
+    def get_filename(key):
+
+        key_hash = hashlib.sha256( key.encode('utf-8') ).hexdigest()
+        return os.path.join( key_hash[:2], key_hash + '.html.gz' )
+
+    def is_expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def count(self, counter):
+
+        #fetch threads share this cache, the index lock is held only briefly by execute()
+        with self.index.lock:
+            setattr( self, counter, getattr(self, counter) + 1 )
+
+    def get_total_size(self):
+        return self.index.execute('SELECT COALESCE(SUM(size), 0) FROM html')[0][0]
+
+    def get(self, uri):
+
+        key = HTMLCache.get_key(uri)
+        rows = self.index.execute('SELECT filename, created FROM html WHERE key = ?', (key,)) if key != '' else []
+
+        if( len(rows) != 0 ):
+            filename, created = rows[0]
+            if( self.is_expired(created) ):
+                self.remove(key, filename)
+            else:
+                try:
+                    with gzip.open( os.path.join(self.cache_dir, filename), 'rb' ) as infile:
+                        html = infile.read().decode('utf-8')
+
+                    self.index.execute('UPDATE html SET last_access = ? WHERE key = ?', (time.time(), key))
+                    self.count('hits')
+                    return html
+                except FileNotFoundError:
+                    self.remove(key, filename)
+                except:
+                    genericErrorInfo('\n\tHTMLCache.get(), error uri: ' + uri)
+
+        self.count('misses')
+        return None
+
+    def put(self, uri, html):
+
+        key = HTMLCache.get_key(uri)
+        if( key == '' or html == '' ):
+            return
+
+        filename = HTMLCache.get_filename(key)
+        path = os.path.join(self.cache_dir, filename)
+
+        try:
+            os.makedirs( os.path.dirname(path), exist_ok=True )
+            tmp_path = path + '.' + str(os.getpid()) + '.' + str(threading.get_ident()) + '.tmp'
+            with gzip.open(tmp_path, 'wb') as outfile:
+                outfile.write( html.encode('utf-8') )
+            os.replace(tmp_path, path)
+
+            now = time.time()
+            size = os.path.getsize(path)
+            old_size = self.index.execute('SELECT size FROM html WHERE key = ?', (key,))
+            self.index.execute('INSERT OR REPLACE INTO html (key, filename, size, created, last_access) VALUES (?, ?, ?, ?, ?)', (key, filename, size, now, now))
+        except:
+            genericErrorInfo('\n\tHTMLCache.put(), error uri: ' + uri)
+            return
+
+        with self.index.lock:
+            self.total_size += size - (old_size[0][0] if len(old_size) != 0 else 0)
+            self.puts += 1
+            full_sweep = self.puts % self.evict_interval == 0
+
+        if( full_sweep or self.total_size > self.max_size ):
+            self.evict(full_sweep=full_sweep)
+
+    def remove(self, key, filename):
+
+        rows = self.index.execute('SELECT size FROM html WHERE key = ?', (key,))
+        self.index.execute('DELETE FROM html WHERE key = ?', (key,))
+        with self.index.lock:
+            self.total_size -= sum( r[0] for r in rows )
+
+        try:
+            os.remove( os.path.join(self.cache_dir, filename) )
+        except FileNotFoundError:
+            pass
+
+    def evict(self, full_sweep=True):
+
+        if( full_sweep ):
+            if( self.ttl is not None ):
+                for key, filename in self.index.execute('SELECT key, filename FROM html WHERE created < ?', (time.time() - self.ttl,)):
+                    self.remove(key, filename)
+
+            total_size = self.get_total_size()
+            with self.index.lock:
+                self.total_size = total_size
+
+        if( self.total_size <= self.max_size ):
+            return
+
+        for key, filename in self.index.execute('SELECT key, filename FROM html ORDER BY last_access ASC'):
+            self.remove(key, filename)
+            if( self.total_size <= self.max_size ):
+                break
+
+    def stats(self):
+
+        entries, size = self.index.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM html')[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'size': size
+        }
+
+class DerivedCache(object):
+
+    #increment when boilerplate removal, title/favicon extraction or NER output changes for the same input
+    pipeline_version = 2
+
+    def __init__(self, cache_dir, ttl=None, max_entries=200000):
+
+        '''
+            Cache of artifacts derived from page content (boilerplate-removed text, title, favicon, raw NER)
+            keys are content hashes combined with the pipeline version and the parameters that produced the artifact (see get_key())
+            values are JSON-serializable, ttl: seconds (None: never expire), 
+            the least recently used entries are evicted beyond max_entries
+        '''
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = SQLiteIndex( os.path.join(cache_dir, 'derived.sqlite'), 'CREATE TABLE IF NOT EXISTS derived (key TEXT PRIMARY KEY, value TEXT, created REAL, last_access REAL)' )
+
+    @staticmethod
+    def get_key(kind, params):
+        
+        '''
+            kind: artifact type, e.g., 'extract' or 'ner'
+            params: JSON-serializable list of every input (content & parameters) the artifact depends on
+        '''
+        params = json.dumps( [__appversion__, DerivedCache.pipeline_version, params] )
+        return kind + ':' + hashlib.sha256( params.encode('utf-8') ).hexdigest()
+
+    def count(self, counter):
+
+        #clean worker threads share this cache, returns the new count
+        with self.index.lock:
+            setattr( self, counter, getattr(self, counter) + 1 )
+            return getattr(self, counter)
+
+    def get(self, key):
+
+        rows = self.index.execute('SELECT value, created FROM derived WHERE key = ?', (key,))
+        if( len(rows) != 0 ):
+            
+            value, created = rows[0]
+            if( self.ttl is not None and time.time() - created > self.ttl ):
+                self.index.execute('DELETE FROM derived WHERE key = ?', (key,))
+            else:
+                self.index.execute('UPDATE derived SET last_access = ? WHERE key = ?', (time.time(), key))
+                self.count('hits')
+                return json.loads(value)
+
+        self.count('misses')
+        return None
+
+    def put(self, key, value):
+
+        try:
+            now = time.time()
+            self.index.execute('INSERT OR REPLACE INTO derived (key, value, created, last_access) VALUES (?, ?, ?, ?)', (key, json.dumps(value, ensure_ascii=False), now, now))
+        except:
+            genericErrorInfo('\n\tDerivedCache.put(), error key: ' + key)
+            return
+
+        if( self.count('puts') % 1000 == 0 ):
+            self.evict()
+
+    def evict(self):
+
+        if( self.ttl is not None ):
+            self.index.execute('DELETE FROM derived WHERE created < ?', (time.time() - self.ttl,))
+
+        self.index.execute('DELETE FROM derived WHERE key IN (SELECT key FROM derived ORDER BY last_access DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def stats(self):
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': self.index.execute('SELECT COUNT(*) FROM derived')[0][0]
+        }
+
+class FeedStateStore(object):
+
+    def __init__(self, state_dir, max_entry_ids=1000):
+
+        '''
+            Per-feed polling state for conditional GET (see rss_parser.get_lnks_frm_feeds()), stored in state_dir/feeds.sqlite:
+            ETag and Last-Modified of the last response and the ids of the entries seen (newest first, at most max_entry_ids per feed)
+            stage() holds a poll's state in memory until commit(), so entries are only marked as seen once delivered
+        '''
+        self.state_dir = state_dir
+        self.max_entry_ids = max_entry_ids
+        self.pending = {}
+
+        os.makedirs(state_dir, exist_ok=True)
+        self.index = SQLiteIndex( os.path.join(state_dir, 'feeds.sqlite'), 'CREATE TABLE IF NOT EXISTS feeds (uri TEXT PRIMARY KEY, etag TEXT, modified TEXT, entry_ids TEXT, last_poll REAL)' )
+
+    def get(self, uri):
+
+        rows = self.index.execute('SELECT etag, modified, entry_ids, last_poll FROM feeds WHERE uri = ?', (uri,))
+        if( len(rows) == 0 ):
+            return {'etag': None, 'modified': None, 'entry_ids': [], 'last_poll': None}
+
+        etag, modified, entry_ids, last_poll = rows[0]
+        return {
+            'etag': etag,
+            'modified': modified,
+            'entry_ids': json.loads(entry_ids),
+            'last_poll': last_poll
+        }
+
+    def put(self, uri, etag=None, modified=None, entry_ids=None):
+
+        entry_ids = [] if entry_ids is None else list(entry_ids)[:self.max_entry_ids]
+        try:
+            self.index.execute('INSERT OR REPLACE INTO feeds (uri, etag, modified, entry_ids, last_poll) VALUES (?, ?, ?, ?, ?)', (uri, etag, modified, json.dumps(entry_ids, ensure_ascii=False), time.time()))
+        except:
+            genericErrorInfo('\n\tFeedStateStore.put(), error uri: ' + uri)
+
+    def stage(self, uri, etag=None, modified=None, entry_ids=None):
+
+        with self.index.lock:
+            self.pending[uri] = {'etag': etag, 'modified': modified, 'entry_ids': entry_ids}
+
+    def commit(self, uri=None):
+
+        '''
+            persist the state staged for uri (None: all feeds)
+        '''
+        with self.index.lock:
+            uris = list(self.pending.keys()) if uri is None else [uri]
+            states = [ (u, self.pending.pop(u)) for u in uris if u in self.pending ]
+
+        for u, state in states:
+            self.put(u, **state)
+
+class URLCache(object):
+
+    def __init__(self, cache_dir, ttl=None, negative_ttl=3600, max_entries=500000):
+
+        '''
+            Persistent cache of expandUrl() results (short URL -> long URL) in cache_dir/urls.sqlite, shared by threads and processes
+            ttl: seconds after which an expansion expires (None: never)
+            negative_ttl: seconds failed expansions (a hop could not be dereferenced) are cached, so they are retried later
+            the least recently used entries are evicted beyond max_entries
+        '''
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.puts = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = SQLiteIndex( os.path.join(cache_dir, 'urls.sqlite'), 'CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, long_url TEXT, ok INTEGER, created REAL, last_access REAL)' )
+
+    def get_ttl(self, ok):
+        return self.ttl if ok else self.negative_ttl
+
+    def count(self, counter):
+
+        #expansion threads share this cache, returns the new count
+        with self.index.lock:
+            setattr( self, counter, getattr(self, counter) + 1 )
+            return getattr(self, counter)
+
+    def get(self, url):
+
+        '''
+            returns the cached long URL of url, None if url is not cached or expired
+        '''
+        rows = self.index.execute('SELECT long_url, ok, created FROM urls WHERE url = ?', (url,))
+        if( len(rows) != 0 ):
+            
+            long_url, ok, created = rows[0]
+            ttl = self.get_ttl(ok)
+            if( ttl is not None and time.time() - created > ttl ):
+                self.index.execute('DELETE FROM urls WHERE url = ?', (url,))
+            else:
+                self.index.execute('UPDATE urls SET last_access = ? WHERE url = ?', (time.time(), url))
+                self.count('hits' if ok else 'negative_hits')
+                return long_url
+
+        self.count('misses')
+        return None
+
+    def put(self, url, long_url, ok=True):
+
+        '''
+            ok: False for failed expansions (long_url is the last URL reached), kept for negative_ttl
+        '''
+        if( url == '' or (ok is False and self.negative_ttl is not None and self.negative_ttl <= 0) ):
+            return
+
+        try:
+            now = time.time()
+            self.index.execute('INSERT OR REPLACE INTO urls (url, long_url, ok, created, last_access) VALUES (?, ?, ?, ?, ?)', (url, long_url, 1 if ok else 0, now, now))
+        except:
+            genericErrorInfo('\n\tURLCache.put(), error url: ' + url)
+            return
+
+        if( self.count('puts') % 1000 == 0 ):
+            self.evict()
+
+    def evict(self):
+
+        if( self.ttl is not None ):
+            self.index.execute('DELETE FROM urls WHERE ok = 1 AND created < ?', (time.time() - self.ttl,))
+        if( self.negative_ttl is not None ):
+            self.index.execute('DELETE FROM urls WHERE ok = 0 AND created < ?', (time.time() - self.negative_ttl,))
+
+        self.index.execute('DELETE FROM urls WHERE url IN (SELECT url FROM urls ORDER BY last_access DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def stats(self):
+
+        with self.index.lock:
+            hits, negative_hits, misses = self.hits, self.negative_hits, self.misses
+
+        lookups = hits + negative_hits + misses
+        return {
+            'hits': hits,
+            'negative-hits': negative_hits,
+            'misses': misses,
+            'hit-rate': 0 if lookups == 0 else (hits + negative_hits) / lookups,
+            'entries': self.index.execute('SELECT COUNT(*) FROM urls')[0][0]
+        }
@@ -1,9 +1,11 @@
 import logging
 import os
 import ssl
+import threading
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-from datetime import datetime
 from feedparser import parse as parse_rss_feeds
 from time import sleep
 
@@ -16,14 +18,58 @@ from sgsuite.util import getDomain
 logger = logging.getLogger('sgsuite.sgsuite')
 if hasattr(ssl, '_create_unverified_context'): ssl._create_default_https_context = ssl._create_unverified_context
 
-def get_memento_rss_feed(uri):
+class TokenBucket(object):
 
+    def __init__(self, rate=1, capacity=1):
+
+        '''
+            Thread-safe rate limiter: tokens are added at rate per second up to capacity (burst), 
+            acquire() takes a token, waiting until one is available (rate <= 0: no limit)
+            waiting callers reserve tokens in the order they call acquire()
+        '''
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+
+        '''
+            returns seconds waited
+        '''
+        if( self.rate <= 0 ):
+            return 0
+
+        with self.lock:
+            
+            now = time.monotonic()
+            self.tokens = min( self.capacity, self.tokens + (now - self.last) * self.rate )
+            self.last = now
+
+            wait = 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            self.tokens -= 1
+
+        if( wait > 0 ):
+            logger.info('\tTokenBucket.acquire(): throttle, sleep: ' + str(round(wait, 3)))
+            sleep(wait)
+
+        return wait
+
+def get_memento_rss_feed(uri, archive_bucket=None):
+
+    '''
+        archive_bucket: TokenBucket that rate-limits Internet Archive saves
+    '''
     uri = uri.strip()
     if( uri == '' ):
         return '', {}
 
     rss_feed = {}
     id_rss_memento = ''
+    if( archive_bucket is not None ):
+        archive_bucket.acquire()
+
     rss_memento = archiveNowProxy(uri)
     
     indx = rss_memento.rfind('/http')
@@ -38,13 +84,34 @@ def get_memento_rss_feed(uri):
 
     return id_rss_memento, rss_feed
 
-def get_lnks_frm_feeds(uri, link_count=1, archive_rss_flag=True, rss_fields=['title', 'published', 'published_parsed'], expand_url=False):
+def expand_entry_link(link, url_cache=None):
+
+    try:
+        return expandUrl(link, urlCache=url_cache)
+    except:
+        genericErrorInfo('\n\texpand_entry_link(), error link: ' + str(link))
+
+    return None
+
+def get_entry_id(entry):
+    return entry.get('id', entry.get('link', entry.get('title', '')))
+
+def get_lnks_frm_feeds(uri, link_count=1, archive_rss_flag=True, rss_fields=['title', 'published', 'published_parsed'], expand_url=False, **kwargs):
 
     '''
         For news sources with rss links, get link_count links from uri
 
         param uri: rss link for source to dereference
         param link_count: the number of news links to extract for uri
+        kwargs:
+            archive_bucket: TokenBucket that rate-limits Internet Archive saves (archive_rss_flag)
+            expand_executor: concurrent.futures executor that expands entry links, 
+            else expand_thread_count (default 1) threads are used
+            feed_state: sgsuite.cache.FeedStateStore, the live feed is requested with the ETag/Last-Modified of the previous poll 
+            (no entries on 304 Not Modified), and of the first link_count entries only those not seen in previous polls are returned
+            the new state is persisted once the links are returned (commit_feed_state, default True), 
+            with commit_feed_state=False it is only staged, call feed_state.commit() after the links are processed
+            url_cache: sgsuite.cache.URLCache of expandUrl() results, e.g., feedproxy links seen in previous polls
 
         links format:
         [
@@ -57,7 +124,7 @@ def get_lnks_frm_feeds(uri, link_count=1, archive_rss_flag=True, rss_fields=['ti
     '''
 
     if( expand_url is True ):
-        uri = expandUrl(uri)
+        uri = expandUrl(uri, urlCache=kwargs.get('url_cache'))
         uri = uri.strip()
 
     if( uri == '' ):
@@ -70,7 +137,7 @@ def get_lnks_frm_feeds(uri, link_count=1, archive_rss_flag=True, rss_fields=['ti
 
     #attempt to process memento of rss - start
     if( archive_rss_flag is True ):
-        id_rss_memento, rss_feed = get_memento_rss_feed(uri)
+        id_rss_memento, rss_feed = get_memento_rss_feed(uri, archive_bucket=kwargs.get('archive_bucket'))
     else:
         logger.info('\tarchive_rss_flag False')
         id_rss_memento = ''
@@ -78,27 +145,60 @@ def get_lnks_frm_feeds(uri, link_count=1, archive_rss_flag=True, rss_fields=['ti
     #attempt to process memento of rss - end
 
 
-    if( len(rss_feed) == 0 ):
+    feed_state = kwargs.get('feed_state')
+    state = None if feed_state is None else feed_state.get(uri)
+    live_feed = len(rss_feed) == 0
+
+    if( live_feed ):
         logger.info('\trss: use uri-r')
         #here means that for some reason it was not possible to process rss memento, so use live version
         try:
-            rss_feed = parse_rss_feeds(uri)
+            if( state is None ):
+                rss_feed = parse_rss_feeds(uri)
+            else:
+                rss_feed = parse_rss_feeds(uri, etag=state['etag'], modified=state['modified'])
         except:
             genericErrorInfo()
     else:
         logger.info('\trss: use uri-m: ' + id_rss_memento)
 
+    if( state is not None and rss_feed.get('status') == 304 ):
+        logger.info('\trss: not modified since last poll')
+        return [], rss_feed
+
+    #the first link_count entries, entries without link count towards link_count
+    entries = rss_feed.get('entries', [])
+    if( link_count > 0 ):
+        entries = entries[:link_count]
+    entries = [ entry for entry in entries if 'link' in entry ]
+
+    if( state is not None ):
+        
+        seen_ids = set( state['entry_ids'] )
+        entries = [ entry for entry in entries if get_entry_id(entry) not in seen_ids ]
+        logger.info('\trss: new entries: ' + str(len(entries)))
+
+    #expand entry links concurrently, results are in entries order
+    entry_links = [ entry.link for entry in entries ]
+    url_caches = [ kwargs.get('url_cache') ] * len(entry_links)
+    if( kwargs.get('expand_executor') is not None ):
+        expanded_links = list( kwargs['expand_executor'].map(expand_entry_link, entry_links, url_caches) )
+    elif( kwargs.get('expand_thread_count', 1) > 1 and len(entry_links) > 1 ):
+        with ThreadPoolExecutor(max_workers=kwargs['expand_thread_count']) as expand_executor:
+            expanded_links = list( expand_executor.map(expand_entry_link, entry_links, url_caches) )
+    else:
+        expanded_links = [ expand_entry_link(link, url_cache) for link, url_cache in zip(entry_links, url_caches) ]
 
-    for i in range(len(rss_feed.entries)):
+    delivered_ids = []
+    for entry, expanded_link in zip(entries, expanded_links):
         
-        entry = rss_feed.entries[i]
         try:
 
-            if( 'link' not in entry ):
+            if( expanded_link is None ):
                 continue
 
             temp_dct = {}
-            temp_dct['link'] = expandUrl(entry.link)    
+            temp_dct['link'] = expanded_link
             temp_dct['rss-uri-m'] = id_rss_memento
             
             for field in rss_fields:
@@ -109,11 +209,24 @@ def get_lnks_frm_feeds(uri, link_count=1, archive_rss_flag=True, rss_fields=['ti
 
 
             links.append( temp_dct )
+            delivered_ids.append( get_entry_id(entry) )
         except:
             genericErrorInfo()
 
-        if( i+1 == link_count ):
-            break
+    #local files have no status
+    status = rss_feed.get('status', 200 if len(rss_feed.get('entries', [])) != 0 else 0)
+    if( state is not None and 200 <= status < 400 ):
+
+        #only delivered entries are marked as seen, if some were not, the feed is requested unconditionally on the next poll
+        all_delivered = len(delivered_ids) == len(entries)
+        feed_state.stage(
+            uri,
+            etag=rss_feed.get('etag') if live_feed and all_delivered else state['etag'],
+            modified=rss_feed.get('modified') if live_feed and all_delivered else state['modified'],
+            entry_ids=delivered_ids + state['entry_ids']
+        )
+        if( kwargs.get('commit_feed_state', True) is True ):
+            feed_state.commit(uri)
 
     return links, rss_feed
 
@@ -129,6 +242,13 @@ def get_news_articles_frm_rss(rss_links, max_lnks_per_src=1, archive_rss_flag=Fa
         return {}, {}
 
     '''
+        Feeds are fetched and parsed by thread_count (default 5) threads, entry links are expanded by expand_thread_count (default 5) threads shared by all feeds
+        with archive_rss_flag, Internet Archive saves are limited to archive_rate (default 1) per second
+        feed_state (sgsuite.cache.FeedStateStore) or feed_state_dir: poll feeds with conditional GET and return only new entries, see get_lnks_frm_feeds()
+        the feed state is persisted after all feeds are merged, with commit_feed_state=False (and feed_state) call feed_state.commit() after processing the links
+        url_cache (sgsuite.cache.URLCache) or url_cache_dir (+ url_cache_ttl seconds): reuse expanded links across polls
+        feeds are merged in rss_links order, so keys and dedup do not depend on which feed finishes first
+
         news_articles format:
         {
             domain_x: {link: link, ...},
@@ -142,16 +262,30 @@ def get_news_articles_frm_rss(rss_links, max_lnks_per_src=1, archive_rss_flag=Fa
     news_article_counts = {}
     articles_to_rename = {}
     domain_rss_feeds = {}
-    throttle = 0
+    archive_bucket = TokenBucket( rate=kwargs.get('archive_rate', 1) ) if archive_rss_flag is True else None
+    
+    feed_state = kwargs.get('feed_state')
+    if( feed_state is None and kwargs.get('feed_state_dir', '') != '' ):
+        from sgsuite.cache import FeedStateStore
+        feed_state = FeedStateStore( kwargs['feed_state_dir'] )
 
-    for rss_dets in rss_links:
+    url_cache = kwargs.get('url_cache')
+    if( url_cache is None and kwargs.get('url_cache_dir', '') != '' ):
+        from sgsuite.cache import URLCache
+        url_cache = URLCache( kwargs['url_cache_dir'], ttl=kwargs.get('url_cache_ttl') )
 
-        if( throttle > 0 and archive_rss_flag is True ):
-            logger.info('\n\tget_news_articles_frm_rss(): throttle IA, sleep: ' + str(throttle))
-            sleep(throttle)
+    def get_feed_links(rss_dets):
+        try:
+            return get_lnks_frm_feeds( rss_dets['rss'].strip(), max_lnks_per_src, archive_rss_flag=archive_rss_flag, rss_fields=rss_fields, expand_url=expand_url, archive_bucket=archive_bucket, expand_executor=expand_executor, feed_state=feed_state, url_cache=url_cache, commit_feed_state=False )
+        except:
+            genericErrorInfo('\n\tget_news_articles_frm_rss(), error rss: ' + str(rss_dets.get('rss')))
+            return [], {}
 
-        prev_now = datetime.now()        
-        links, rss_feed = get_lnks_frm_feeds( rss_dets['rss'].strip(), max_lnks_per_src, archive_rss_flag=archive_rss_flag, rss_fields=rss_fields, expand_url=expand_url )
+    with ThreadPoolExecutor( max_workers=max(1, kwargs.get('thread_count', 5)) ) as feed_executor, ThreadPoolExecutor( max_workers=max(1, kwargs.get('expand_thread_count', 5)) ) as expand_executor:
+        #map() returns feeds in rss_links order
+        feeds = list( feed_executor.map(get_feed_links, rss_links) )
+
+    for rss_dets, (links, rss_feed) in zip(rss_links, feeds):
         
         for uri_dets in links:
             
@@ -196,15 +330,16 @@ def get_news_articles_frm_rss(rss_links, max_lnks_per_src=1, archive_rss_flag=Fa
 
             news_articles[ domain_or_domain_count_key ] = temp_dct
             #news_articles[ domain_or_domain_count_key ] = {'link': uri, 'title': uri_dets['title'], 'published': uri_dets['published'], 'label': rss_dets['label']}
-        
-        delta = datetime.now() - prev_now
-        if( delta.seconds < 1 ):
-            throttle = 1
 
+    if( url_cache is not None ):
+        logger.info('\tget_news_articles_frm_rss(), url cache: ' + str(url_cache.stats()))
 
     #rename first instance of source with multiple instance as source-0 - start
     for domain in articles_to_rename:
         news_articles[domain + '-0'] = news_articles.pop(domain)
     #rename first instance of source with multiple instance as source-0 - end
 
+    if( feed_state is not None and kwargs.get('commit_feed_state', True) is True ):
+        feed_state.commit()
+
     return news_articles, domain_rss_feeds
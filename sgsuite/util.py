@@ -1,40 +1,33 @@
+import gzip
 import os
 import json
 import logging
-import requests
 import re
-import spacy
 import string
 import sys
+import threading
 import warnings
 
-from dateparser import parse as parseDateStr
 from datetime import datetime
+from functools import lru_cache
+from html import unescape as html_unescape
+from html.parser import HTMLParser
+from calendar import monthrange
+from collections import Counter
+from collections import deque
+from collections import OrderedDict
+from collections import namedtuple
 from multiprocessing import Pool
-from subprocess import check_output
+from queue import Empty
+from queue import Queue
 from time import sleep
 from urllib.parse import urlparse
+from urllib.parse import urlsplit
 
-from boilerpy3 import extractors
-from bs4 import BeautifulSoup
-from NwalaTextUtils.textutils import parallelTask
 #from NwalaTextUtils.textutils import parallelGetTxtFrmURIs
-from tldextract import extract as extract_tld
 
 logger = logging.getLogger('sgsuite.sgsuite')
 
-try:
-    spacy.load('en_core_web_sm')
-    '''
-    This hack was used since adding 
-        'en_core_web_sm @ https://github.com/explosion/spacy-models/releases/download/en_core_web_sm-3.1.0/en_core_web_sm-3.1.0.tar.gz#egg=en_core_web_sm' 
-    to setup.py's install_requires made the package not uploadable to pypi: "HTTPError: 400 Client Error: Invalid value for requires_dist. Error: Can't have direct dependency: 'en-core-web-sm @ https://github.com/explosion/spacy-models/releases/download/en_core_web_sm-3.1.0/en_core_web_sm-3.1.0.tar.gz#egg=en_core_web_sm' for url: https://upload.pypi.org/legacy/"
-    '''
-except OSError:
-    print('Downloading en_core_web_sm language model for the spaCy NER tagger (This would be done just once)\n')
-    from spacy.cli import download
-    download('en_core_web_sm')
-
 def getISO8601Timestamp():
     return datetime.utcnow().isoformat() + 'Z'
 
@@ -154,6 +147,8 @@ def archiveNowProxy(uri, params=None):
         headers = getCustomHeaderDict()
         
         # push into the archive
+        import requests
+
         r = requests.get(uri, timeout=params['timeout'], headers=headers, allow_redirects=True)
         r.raise_for_status()
         # extract the link to the archived copy 
@@ -207,130 +202,140 @@ def getDedupKeyForURI(uri):
 
     return ''
 
-def expandUrl(url, secondTryFlag=True, timeoutInSeconds='10'):
+url_expander = None
+url_expander_lock = threading.Lock()
+
+def get_url_expander():
+
+    '''
+        URLExpander shared by expandUrl() callers (threads), created on first use
+    '''
+    global url_expander
+
+    with url_expander_lock:
+        if( url_expander is None ):
+            from sgsuite.URLExpander import URLExpander
+            url_expander = URLExpander()
+
+    return url_expander
+
+def expandUrl(url, secondTryFlag=True, timeoutInSeconds='10', urlCache=None):
 
     #http://tmblr.co/ZPYSkm1jl_mGt, http://bit.ly/1OLMlIF
-    timeoutInSeconds = str(timeoutInSeconds)
     '''
-    Part A: Attempts to unshorten the uri until the last response returns a 200 or 
-    Part B: returns the lasts good url if the last response is not a 200.
+    Follows url's redirects (see URLExpander.expand()) until a response is not a redirect, 
+    returns the last url reached if a response fails (secondTryFlag is kept for compatibility, the last good url is always returned)
+    urlCache: sgsuite.cache.URLCache of previous expansions
     '''
     url = url.strip()
     if( len(url) == 0 ):
         return ''
-    
-    try:
-        #Part A: Attempts to unshorten the uri until the last response returns a 200 or 
-        output = check_output(['curl', '-s', '-I', '-L', '-m', '10', '-c', 'cookie.txt', url])
-        output = output.decode('utf-8')
-        output = output.splitlines()
-        
-        longUrl = ''
-        path = ''
-        locations = []
 
-        for line in output:
-            line = line.strip()
-            if( len(line) == 0 ):
-                continue
+    try:
+        return get_url_expander().expand( url, timeout=float(timeoutInSeconds), url_cache=urlCache )
+    except:
+        genericErrorInfo('\n\texpandUrl(), error url: ' + url)
 
-            indexOfLocation = line.lower().find('location:')
-            if( indexOfLocation != -1 ):
-                #location: is 9
-                locations.append(line[indexOfLocation + 9:].strip())
+    return url
 
-        if( len(locations) != 0 ):
-            #traverse location in reverse: account for redirects to path
-            #locations example: ['http://www.arsenal.com']
-            #locations example: ['http://www.arsenal.com', '/home#splash']
-            for url in locations[::-1]:
-                
-                if( url.strip().lower().find('/') == 0 and len(path) == 0 ):
-                    #find path
-                    path = url
+def expandUrls(urls, timeoutInSeconds='10', urlCache=None):
 
-                if( url.strip().lower().find('http') == 0 and len(longUrl) == 0 ):
-                    #find url
-                    
-                    #ensure url doesn't end with / - start
-                    #if( url[-1] == '/' ):
-                    #   url = url[:-1]
-                    #ensure url doesn't end with / - end
-
-                    #ensure path begins with / - start
-                    if( len(path) != 0 ):
-                        if( path[0] != '/' ):
-                            path = '/' + path
-                    #ensure path begins with / - end
+    '''
+        expandUrl() of each url (concurrently), in urls order
+    '''
+    return get_url_expander().expand_urls( urls, timeout=float(timeoutInSeconds), url_cache=urlCache )
 
-                    longUrl = url + path
+def expandUrlSecondTry(url, curIter=0, maxIter=100):
 
-                    #break since we are looking for the last long unshortened uri with/without a path redirect
-                    break
-        else:
-            longUrl = url
+    '''
+    Attempt to get first good location. For defunct urls with previous past
+    '''
+    from sgsuite.URLExpander import URLExpander
+    
+    expander = URLExpander( max_hops=max(0, maxIter - curIter), max_concurrency=1 )
+    try:
+        return expander.expand(url)
+    finally:
+        expander.close()
 
+tld_extractor = None
+tld_extractor_lock = threading.Lock()
 
+def get_tld_extractor():
 
+    '''
+        tldextract.TLDExtract shared by getDomain() callers, created on first use
+        it uses the public suffix list snapshot bundled with tldextract (pinned by the installed tldextract version),
+        so the list is never fetched over the network or cached on disk
+    '''
+    global tld_extractor
 
-        return longUrl
-    except Exception as e:
-        #Part B: returns the lasts good url if the last response is not a 200.
-        #genericErrorInfo()
+    with tld_extractor_lock:
+        if( tld_extractor is None ):
+            from tldextract import TLDExtract
+            tld_extractor = TLDExtract(cache_dir=None, suffix_list_urls=(), fallback_to_snapshot=True)
 
-        if( secondTryFlag ):
-            logger.info('\texpandUrl(): second try: ' + url)
-            return expandUrlSecondTry(url)
-        else:
-            return url
+    return tld_extractor
 
-def expandUrlSecondTry(url, curIter=0, maxIter=100):
+def get_url_host(url):
 
     '''
-    Attempt to get first good location. For defunct urls with previous past
+        host of url as written (no scheme, userinfo, port, path or trailing dot, IPv6 literals keep their brackets), the getDomain() cache key
+        urls without scheme (e.g., example.com/path) are parsed as network locations
     '''
-
     url = url.strip()
-    if( len(url) == 0 ):
-        return ''
-
-    if( maxIter % 10 == 0 ):
-        logger.info('\t' + str(maxIter) + ' expandUrlSecondTry(): url - ' + url)
+    if( re.match(r'^([a-z][a-z0-9+.\-]*:)?//', url, re.IGNORECASE) is None ):
+        url = '//' + url
 
-    if( curIter>maxIter ):
-        return url
+    try:
+        netloc = urlsplit(url).netloc
+    except ValueError:
+        #e.g., unbalanced IPv6 brackets
+        netloc = url.split('//', 1)[1].split('/', 1)[0]
 
+    host = netloc.rpartition('@')[2]
+    if( host.startswith('[') ):
+        return host.split(']', 1)[0] + ']'
 
-    try:
+    return host.split(':', 1)[0].rstrip('.')
 
-        # when using find, use outputLowercase
-        # when indexing, use output
-        
-        output = check_output(['curl', '-s', '-I', '-m', '10', url])
-        output = output.decode('utf-8')
-        
-        outputLowercase = output.lower()
-        indexOfLocation = outputLowercase.rfind('\nlocation:')
+@lru_cache(maxsize=100000)
+def get_host_domain(host, includeSubdomain=False, excludeWWW=True):
 
-        if( indexOfLocation != -1 ):
-            # indexOfLocation + 1: skip initial newline preceding location:
-            indexOfNewLineAfterLocation = outputLowercase.find('\n', indexOfLocation + 1)
-            redirectUrl = output[indexOfLocation:indexOfNewLineAfterLocation]
-            redirectUrl = redirectUrl.split(' ')[1]
+    ext = get_tld_extractor()(host)
+    
+    domain = ext.domain.strip()
+    subdomain = ext.subdomain.strip()
+    suffix = ext.suffix.strip()
 
-            return expandUrlSecondTry(redirectUrl, curIter+1, maxIter)
-        else:
-            return url
+    if( len(suffix) != 0 ):
+        suffix = '.' + suffix 
 
-    except:
-        logger.error('\terror url: ' + url)
-        genericErrorInfo()
+    if( len(domain) != 0 ):
+        domain = domain + suffix
     
+    if( excludeWWW ):
+        if( subdomain.find('www') == 0 ):
+            if( len(subdomain) > 3 ):
+                subdomain = subdomain[4:]
+            else:
+                subdomain = subdomain[3:]
 
-    return url
+
+    if( len(subdomain) != 0 ):
+        subdomain = subdomain + '.'
+
+    if( includeSubdomain ):
+        domain = subdomain + domain
+
+    return domain
 
 def getDomain(url, includeSubdomain=False, excludeWWW=True):
 
+    '''
+        domain (e.g., bbc.co.uk) of url, with its subdomain (e.g., news.bbc.co.uk) if includeSubdomain, "www" is dropped from the subdomain if excludeWWW
+        results are memoized per hostname (get_host_domain.cache_info() for stats), see get_tld_extractor() for the public suffix list
+    '''
     url = url.strip()
     if( len(url) == 0 ):
         return ''
@@ -338,39 +343,18 @@ def getDomain(url, includeSubdomain=False, excludeWWW=True):
     if( url.find('http') == -1  ):
         url = 'http://' + url
 
-    domain = ''
-    
     try:
-        ext = extract_tld(url)
-        
-        domain = ext.domain.strip()
-        subdomain = ext.subdomain.strip()
-        suffix = ext.suffix.strip()
-
-        if( len(suffix) != 0 ):
-            suffix = '.' + suffix 
-
-        if( len(domain) != 0 ):
-            domain = domain + suffix
-        
-        if( excludeWWW ):
-            if( subdomain.find('www') == 0 ):
-                if( len(subdomain) > 3 ):
-                    subdomain = subdomain[4:]
-                else:
-                    subdomain = subdomain[3:]
-
-
-        if( len(subdomain) != 0 ):
-            subdomain = subdomain + '.'
-
-        if( includeSubdomain ):
-            domain = subdomain + domain
+        return get_host_domain( get_url_host(url), includeSubdomain=includeSubdomain, excludeWWW=excludeWWW )
     except:
         genericErrorInfo()
         return ''
 
-    return domain
+def getDomains(urls, includeSubdomain=False, excludeWWW=True):
+
+    '''
+        getDomain() of each url in urls order, e.g., the links of storygraph nodes
+    '''
+    return [ getDomain(url, includeSubdomain=includeSubdomain, excludeWWW=excludeWWW) for url in urls ]
 
 def isSizeLimitExceed(responseHeaders, sizeRestrict):
 
@@ -391,6 +375,101 @@ def downloadSave(response, outfile):
     except:
         genericErrorInfo()
 
+def readBoundedBody(response, sizeRestrict=-1, chunkSize=65536):
+
+    '''
+        Reads the body of a stream=True response, stops as soon as more than sizeRestrict bytes (-1: no limit) are received
+        returns (body bytes, status), status: 'ok', 'oversized' (Content-Length > sizeRestrict, body not read) or 'truncated' (body exceeded sizeRestrict, b'' returned)
+    '''
+    if( sizeRestrict != -1 and isSizeLimitExceed(response.headers, sizeRestrict) ):
+        return b'', 'oversized'
+
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size=chunkSize):
+        body += chunk
+        if( sizeRestrict != -1 and len(body) > sizeRestrict ):
+            return b'', 'truncated'
+
+    return bytes(body), 'ok'
+
+def decodeHTMLBytes(body, contentType=''):
+
+    '''
+        Decodes body once with the first charset found in: Content-Type header, <meta> charset, utf-8 (strict), charset detection
+    '''
+    if( len(body) == 0 ):
+        return ''
+
+    encodings = []
+    charset = re.search(r'charset=["\']?([\w.:-]+)', contentType or '', re.IGNORECASE)
+    if( charset is not None ):
+        encodings.append( charset.group(1) )
+
+    charset = re.search(rb'<meta[^>]+charset=["\']?([\w.:-]+)', body[:4096], re.IGNORECASE)
+    if( charset is not None ):
+        encodings.append( charset.group(1).decode('ascii') )
+
+    for encoding in encodings:
+        try:
+            return body.decode(encoding, errors='replace')
+        except LookupError:
+            logger.info('\tdecodeHTMLBytes(), unknown encoding: ' + encoding)
+
+    try:
+        return body.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        from charset_normalizer import from_bytes
+        best_guess = from_bytes(body).best()
+        if( best_guess is not None ):
+            return str(best_guess)
+    except ImportError:
+        pass
+
+    return body.decode('utf-8', errors='replace')
+
+def fetchURI(uri, timeout=10, sizeRestrict=-1, headers=None, session=None):
+
+    '''
+        GET uri, streaming the body so sizeRestrict (bytes, -1: no limit) is enforced while downloading
+        fetch result format:
+        {
+            'uri': uri,
+            'text': decoded body ('' unless status is 'ok'),
+            'status': 'ok', 'oversized', 'truncated' (see readBoundedBody()) or 'error',
+            'status_code': HTTP status code (-1 on error),
+            'response_header': response headers ({} on error)
+        }
+    '''
+    uri = uri.strip()
+    fetch_res = {'uri': uri, 'text': '', 'status': 'error', 'status_code': -1, 'response_header': {}}
+    if( uri == '' ):
+        return fetch_res
+
+    if( headers is None or headers == {} ):
+        headers = getCustomHeaderDict()
+
+    try:
+        import requests
+
+        getter = requests.get if session is None else session.get
+        with getter(uri, headers=headers, timeout=timeout, stream=True) as response:
+            
+            fetch_res['status_code'] = response.status_code
+            fetch_res['response_header'] = response.headers
+            
+            body, fetch_res['status'] = readBoundedBody(response, sizeRestrict=sizeRestrict)
+            if( fetch_res['status'] == 'ok' ):
+                fetch_res['text'] = decodeHTMLBytes( body, contentType=response.headers.get('Content-Type', '') )
+            else:
+                logger.info('\tfetchURI(), ' + fetch_res['status'] + ', size restriction: ' + str(sizeRestrict) + ', uri: ' + uri)
+    except:
+        genericErrorInfo('\n\tfetchURI(), error uri: ' + uri)
+    
+    return fetch_res
+
 def mimicBrowser(uri, getRequestFlag=True, timeout=10, sizeRestrict=-1, addResponseHeader=False, saveFilePath=None, headers={}):
     
     uri = uri.strip()
@@ -400,27 +479,26 @@ def mimicBrowser(uri, getRequestFlag=True, timeout=10, sizeRestrict=-1, addRespo
     if headers == {}:
         headers = getCustomHeaderDict()
 
+    import requests
+
     try:
         response = ''
         reponseText = ''
         if( getRequestFlag is True ):
 
             if( saveFilePath is None ):
-                response = requests.get(uri, headers=headers, timeout=timeout)
-            else:
-                response = requests.get(uri, headers=headers, timeout=timeout, stream=True)
-                
+                fetch_res = fetchURI(uri, timeout=timeout, sizeRestrict=sizeRestrict, headers=headers)
+                if( addResponseHeader is True ):
+                    return {'response_header': fetch_res['response_header'], 'text': fetch_res['text'], 'status': fetch_res['status']}
+
+                return fetch_res['text']
             
+            response = requests.get(uri, headers=headers, timeout=timeout, stream=True)
             if( sizeRestrict != -1 ):
                 if( isSizeLimitExceed(response.headers, sizeRestrict) ):
-                    return 'Error: Exceeded size restriction: ' + sizeRestrict
+                    return 'Error: Exceeded size restriction: ' + str(sizeRestrict)
 
-            
-            if( saveFilePath is None ):
-                reponseText = response.text
-            else:
-                downloadSave(response, saveFilePath)
-                
+            downloadSave(response, saveFilePath)
 
             if( addResponseHeader is True ):
                 return  {'response_header': response.headers, 'text': reponseText}
@@ -442,25 +520,43 @@ def mimicBrowser(uri, getRequestFlag=True, timeout=10, sizeRestrict=-1, addRespo
     Note size limit set to 4MB
 '''
 def derefURI(uri, sleepSec=0, timeout=10, sizeRestrict=4000000, headers={}, extraParams=None):
-    
+    return derefURIDetails(uri, sleepSec=sleepSec, timeout=timeout, sizeRestrict=sizeRestrict, headers=headers, extraParams=extraParams)['text']
+
+def derefURIDetails(uri, sleepSec=0, timeout=10, sizeRestrict=4000000, headers={}, extraParams=None):
+
+    '''
+        derefURI() that also returns the fetch status, format:
+        {
+            'text': html,
+            'status': see fetchURI(), 'cached' for html_cache_file/html_cache hits
+        }
+        extraParams['html_cache']: sgsuite.cache.HTMLCache consulted before, and updated after, dereferencing
+    '''
     uri = uri.strip()
     if( uri == '' ):
-        return ''
+        return {'text': '', 'status': 'error'}
 
     if( extraParams is None ):
         extraParams = {}
 
-    htmlPage = ''
+    deref_res = {'text': '', 'status': 'error'}
     extraParams.setdefault('html_cache_file', '')
+    extraParams.setdefault('html_cache', None)
 
     try:
 
+        if( extraParams['html_cache'] is not None ):
+            htmlPage = extraParams['html_cache'].get(uri)
+            
+            if( htmlPage is not None ):
+                return {'text': htmlPage, 'status': 'cached'}
+
         if( extraParams['html_cache_file'] != '' ):
             htmlPage = getTextFromGZ( extraParams['html_cache_file'] )
 
             if( htmlPage != '' ):
                 logger.info( '\tderefURI(), cache hit' )
-                return htmlPage
+                return {'text': htmlPage, 'status': 'cached'}
 
 
         if( sleepSec > 0 ):
@@ -468,19 +564,25 @@ def derefURI(uri, sleepSec=0, timeout=10, sizeRestrict=4000000, headers={}, extr
             sleep(sleepSec)
     
         
-        htmlPage = mimicBrowser(uri, sizeRestrict=sizeRestrict, headers=headers, timeout=timeout)
+        fetch_res = fetchURI(uri, sizeRestrict=sizeRestrict, headers=headers, timeout=timeout)
+        deref_res = {'text': fetch_res['text'], 'status': fetch_res['status']}
 
         if( extraParams['html_cache_file'] != '' ):
-            gzipTextFile( extraParams['html_cache_file'], htmlPage )
+            gzipTextFile( extraParams['html_cache_file'], deref_res['text'] )
+
+        if( extraParams['html_cache'] is not None and deref_res['status'] == 'ok' ):
+            extraParams['html_cache'].put( uri, deref_res['text'] )
     except:
         genericErrorInfo()
     
-    return htmlPage
+    return deref_res
 
 def extractPageTitleFromHTML(html):
 
     title = ''
     try:
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, 'html.parser')
         title = soup.find('title')
 
@@ -493,47 +595,207 @@ def extractPageTitleFromHTML(html):
 
     return title
 
-def parallelGetTxtFrmURIs(urisLst, threadCount=5, updateRate=10):
+def parallelGetTxtFrmURIs(urisLst, threadCount=5, updateRate=10, fetcher=None, htmlCache=None, cleanProcessCount=0, cleanChunkSize=8, cleanMethod='python-boilerpipe'):
 
+    '''
+        cleanProcessCount: worker processes for boilerplate removal (0: in this process), cleanChunkSize pages are sent to a worker at a time
+    '''
     size = len(urisLst)
     if( size == 0 ):
         return []
 
-    docsLst = []
-    jobsLst = []
-    for i in range(size):
+    if( fetcher is not None ):
+        #fetcher: sgsuite.AsyncFetcher.AsyncFetcher
+        fetchedLst = [ (res['text'], urisLst[i], res['status']) for i, res in enumerate(fetcher.fetch_uris(urisLst)) ]
+    else:
+        jobsLst = []
+        for i in range(size):
 
-        printMsg = ''
+            printMsg = ''
 
-        if( i % updateRate == 0 ):
-            printMsg = 'dereferencing uri ' + str(i) + ' of ' + str(size)
+            if( i % updateRate == 0 ):
+                printMsg = 'dereferencing uri ' + str(i) + ' of ' + str(size)
 
-        keywords = {
-            'uri': urisLst[i],
-            'sleepSec': 0
-        }
+            keywords = {
+                'uri': urisLst[i],
+                'sleepSec': 0,
+                'extraParams': {'html_cache': htmlCache}
+            }
+
+            jobsLst.append( {
+                'func': derefURIDetails, 
+                'args': keywords, 
+                'misc': False, 
+                'print': printMsg
+            })
+
+        from NwalaTextUtils.textutils import parallelTask
 
-        jobsLst.append( {
-            'func': derefURI, 
-            'args': keywords, 
-            'misc': False, 
-            'print': printMsg
-        })
+        resLst = parallelTask(jobsLst, threadCount=threadCount)
+        fetchedLst = [ (res['output']['text'], res['input']['args']['uri'], res['output']['status']) for res in resLst ]
 
+    if( cleanProcessCount > 0 ):
+        return list( get_txt_frm_html_in_processes(fetchedLst, process_count=cleanProcessCount, chunk_size=cleanChunkSize, clean_method=cleanMethod) )
 
-    resLst = parallelTask(jobsLst, threadCount=threadCount)
-    for res in resLst:
+    return [ getTxtFrmHTML(html, uri, derefStatus=status, cleanMethod=cleanMethod) for html, uri, status in fetchedLst ]
+
+def getTxtFrmHTML(html, uri, derefStatus='ok', derivedCache=None, cleanMethod='python-boilerpipe'):
+
+    '''
+        derivedCache: sgsuite.cache.DerivedCache of text, title & favicon keyed by the html content (and uri's scheme & host for favicon)
+    '''
+    extracted = None
+    if( derivedCache is not None and html != '' ):
+        scheme, netloc, path, params, query, fragment = urlparse( uri.strip() )
+        key = derivedCache.get_key( 'extract', [scheme, netloc, cleanMethod, html] )
+        extracted = derivedCache.get(key)
+
+    if( extracted is None ):
+        extracted = extractFromHTML( html, sourceURL=uri, cleanMethod=cleanMethod )
         
-        text = cleanHtml( res['output'] )
+        if( derivedCache is not None and html != '' ):
+            derivedCache.put(key, extracted)
+
+    return {
+        'text': extracted['text'],
+        'title': extracted['title'],
+        'favicon': extracted['favicon'],
+        'deref-status': derefStatus,
+        'uri': uri
+    }
+
+worker_derived_cache = None
+def init_worker_derived_cache(derived_cache_dir, ttl=None, pipeline_version=None):
+
+    '''
+        process pool initializer: the worker's sgsuite.cache.DerivedCache (None if derived_cache_dir is empty), 
+        with the ttl and pipeline version of the parent's cache, so entries expire and are keyed as in the parent
+    '''
+    global worker_derived_cache
+    
+    worker_derived_cache = None
+    if( derived_cache_dir == '' ):
+        return
+
+    from sgsuite.cache import DerivedCache
+    if( pipeline_version is not None ):
+        DerivedCache.pipeline_version = pipeline_version
+
+    worker_derived_cache = DerivedCache(derived_cache_dir, ttl=ttl)
+
+def get_worker_derived_cache():
+    return worker_derived_cache
+
+def get_worker_derived_cache_args(derived_cache_dir, ttl):
+
+    if( derived_cache_dir == '' ):
+        return ('', None, None)
+
+    from sgsuite.cache import DerivedCache
+    return (derived_cache_dir, ttl, DerivedCache.pipeline_version)
+
+def imap_bounded(pool, func, tasks, max_pending):
+
+    '''
+        pool.imap(func, tasks) that takes at most max_pending tasks ahead of the results consumed (pool.imap takes tasks as fast as it can)
+        yields (task, result, error) in tasks order, error is the exception func(task) raised (result is then None), else None
+    '''
+    def get_result(task, async_res):
+        try:
+            return task, async_res.get(), None
+        except Exception as e:
+            return task, None, e
+
+    pending = deque()
+    for task in tasks:
         
-        docsLst.append({
-            'text': text,
-            'title': extractPageTitleFromHTML( res['output'] ),
-            'favicon': extractFavIconFromHTML( res['output'], sourceURL=res['input']['args']['uri'] ),
-            'uri': res['input']['args']['uri']
-        })
+        pending.append( (task, pool.apply_async(func, (task,))) )
+        if( len(pending) >= max_pending ):
+            yield get_result( *pending.popleft() )
+
+    while( len(pending) != 0 ):
+        yield get_result( *pending.popleft() )
+
+def clean_worker_task(task):
+    
+    derived_cache = get_worker_derived_cache()
+    docs = []
+    
+    for html, uri, deref_status in task['pages']:
+        try:
+            docs.append( getTxtFrmHTML(html, uri, derefStatus=deref_status, derivedCache=derived_cache, cleanMethod=task['clean_method']) )
+        except:
+            genericErrorInfo()
+            docs.append( {'text': '', 'title': '', 'favicon': '', 'deref-status': 'error', 'uri': uri} )
+
+    return docs
+
+def get_txt_frm_html_in_processes(pages, process_count=2, chunk_size=8, clean_method='python-boilerpipe', derived_cache_dir='', derived_cache_ttl=None):
+
+    '''
+        Boilerplate removal (getTxtFrmHTML) in a pool of process_count worker processes
+        pages: iterable of (html, uri, deref status), workers receive chunk_size pages at a time
+        derived_cache_dir: directory of the sgsuite.cache.DerivedCache workers use as derivedCache, with derived_cache_ttl
+        yields getTxtFrmHTML() output for each page, in pages order
+    '''
+    def gen_tasks():
+        
+        chunk = []
+        for page in pages:
+            
+            chunk.append(page)
+            if( len(chunk) == chunk_size ):
+                yield chunk
+                chunk = []
+
+        if( len(chunk) != 0 ):
+            yield chunk
+
+    tasks = ( {'pages': chunk, 'clean_method': clean_method} for chunk in gen_tasks() )
+    with Pool(processes=process_count, initializer=init_worker_derived_cache, initargs=get_worker_derived_cache_args(derived_cache_dir, derived_cache_ttl)) as pool:
+        for task, docs, error in imap_bounded(pool, clean_worker_task, tasks, max_pending=2*process_count):
+            
+            if( error is not None ):
+                #e.g., a worker process died, the chunk's pages yield empty records
+                logger.error('\tget_txt_frm_html_in_processes(), chunk error: ' + repr(error))
+                docs = [ {'text': '', 'title': '', 'favicon': '', 'deref-status': 'error', 'uri': uri} for html, uri, deref_status in task['pages'] ]
+
+            for doc in docs:
+                yield doc
+
+htmlMarkupRegex = re.compile(r'<(?:(script|style)\b[^>]*>.*?</\1\s*|!--.*?--|[^>]*)>', re.IGNORECASE | re.DOTALL)
+
+#same character references as html.unescape()
+htmlEntityRegex = re.compile(r'&(?:#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?)')
+
+def unescapeHTMLEntities(text):
+
+    '''
+        Same output as html.unescape(), but each distinct entity is decoded once and replaced with str.replace() instead of a call per occurrence
+        longest entities are replaced first (so a prefix, e.g., &amp, never splits a longer one, e.g., &amp;) 
+        and decoded ampersands are held as NUL until the end, so they never form new entities
+    '''
+    if( '\x00' in text ):
+        return html_unescape(text)
 
-    return docsLst
+    for entity in sorted( set(htmlEntityRegex.findall(text)), key=len, reverse=True ):
+        text = text.replace( entity, html_unescape(entity).replace('&', '\x00') )
+
+    return text.replace('\x00', '&')
+
+def cleanHtmlNLTK(html):
+
+    '''
+        Lightweight alternative to boilerpy3 adapted from NLTK's clean_html():
+        a single scan of a precompiled regex replaces script/style blocks, comments and tags with a space, 
+        entities are decoded, then runs of whitespace collapse to one space per line and blank lines are dropped
+    '''
+    cleaned = htmlMarkupRegex.sub(' ', html)
+    if( '&' in cleaned ):
+        cleaned = unescapeHTMLEntities(cleaned)
+
+    lines = [ ' '.join(line.split()) for line in cleaned.split('\n') ]
+    return '\n'.join( [ l for l in lines if l != '' ] )
 
 def cleanHtml(html, method='python-boilerpipe'):
     
@@ -549,45 +811,122 @@ def cleanHtml(html, method='python-boilerpipe'):
             return str(extractor.getText())
             '''
 
+            from boilerpy3 import extractors
+
             extractor = extractors.ArticleExtractor()
             return extractor.get_content(html)
         except:
             genericErrorInfo()
     elif( method == 'nltk' ):
-        """
-        Copied from NLTK package.
-        Remove HTML markup from the given string.
-
-        :param html: the HTML string to be cleaned
-        :type html: str
-        :rtype: str
-        """
-
-        # First we remove inline JavaScript/CSS:
-        cleaned = re.sub(r"(?is)<(script|style).*?>.*?(</\1>)", "", html.strip())
-        # Then we remove html comments. This has to be done before removing regular
-        # tags since comments can contain '>' characters.
-        cleaned = re.sub(r"(?s)<!--(.*?)-->[\n]?", "", cleaned)
-        # Next we can remove the remaining tags:
-        cleaned = re.sub(r"(?s)<.*?>", " ", cleaned)
-        # Finally, we deal with whitespace
-        cleaned = re.sub(r"&nbsp;", " ", cleaned)
-        cleaned = re.sub(r"  ", " ", cleaned)
-        cleaned = re.sub(r"  ", " ", cleaned)
-
-        #my addition to remove blank lines
-        cleaned = re.sub("\n\s*\n*", "\n", cleaned)
-
-        return cleaned.strip()
-
+        return cleanHtmlNLTK(html)
+    
     return ''
 
+class TitleFavIconParser(HTMLParser):
+
+    '''
+        Tokenizer that finds the first <title> text and the first <link rel="...icon..."> href as 
+        extractPageTitleFromHTML() and extractFavIconFromHTML() do, without building a tree
+        title/favicon are None until found
+    '''
+    def __init__(self):
+        
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.title_parts = None
+        self.favicon = None
+
+    def is_done(self):
+        return self.title is not None and self.favicon is not None
+
+    def handle_starttag(self, tag, attrs):
+
+        if( tag == 'title' and self.title is None and self.title_parts is None ):
+            self.title_parts = []
+        
+        elif( tag == 'link' and self.favicon is None ):
+            attrs = dict(attrs)
+            for rel in (attrs.get('rel') or '').split():
+                
+                rel = rel.lower()
+                if( rel.find('icon') != -1 or rel.find('shortcut') != -1 ):
+                    #as in extractFavIconFromHTML(), an icon link without href means no favicon
+                    self.favicon = (attrs.get('href') or '').strip()
+                    break
+
+    def handle_endtag(self, tag):
+
+        if( tag == 'title' and self.title_parts is not None and self.title is None ):
+            self.title = ''.join(self.title_parts).strip()
+
+    def handle_data(self, data):
+
+        if( self.title_parts is not None and self.title is None ):
+            self.title_parts.append(data)
+
+    def close(self):
+        
+        super().close()
+        if( self.title is None and self.title_parts is not None ):
+            self.title = ''.join(self.title_parts).strip()
+
+def extractTitleFavIconFromHTML(html, sourceURL, chunkSize=8192):
+
+    '''
+        Single streaming pass for title and favicon, stops as soon as both are found (usually within <head>)
+    '''
+    title = ''
+    favicon = ''
+
+    try:
+        parser = TitleFavIconParser()
+        for i in range(0, len(html), chunkSize):
+            parser.feed( html[i:i + chunkSize] )
+            if( parser.is_done() ):
+                break
+
+        if( parser.is_done() is False ):
+            parser.close()
+
+        title = '' if parser.title is None else parser.title
+        favicon = resolveFavIcon( '' if parser.favicon is None else parser.favicon, sourceURL )
+    except:
+        genericErrorInfo()
+
+    return title, favicon
+
+def extractFromHTML(html, sourceURL, cleanMethod='python-boilerpipe'):
+
+    '''
+        title, favicon (single streaming pass) and boilerplate-removed text of html
+    '''
+    title, favicon = extractTitleFavIconFromHTML(html, sourceURL)
+    return {
+        'text': cleanHtml( html, method=cleanMethod ),
+        'title': title,
+        'favicon': favicon
+    }
+
+def resolveFavIcon(favicon, sourceURL):
+
+    sourceURL = sourceURL.strip()
+    if( len(favicon) != 0 and len(sourceURL) != 0 ):
+        if( favicon.find('//') == 0 ):
+            favicon = 'http:' + favicon
+        elif( favicon[0] == '/' ):
+            scheme, netloc, path, params, query, fragment = urlparse( sourceURL )
+            favicon = scheme + '://' + netloc + favicon
+
+    return favicon
+
 def extractFavIconFromHTML(html, sourceURL):
     
     sourceURL = sourceURL.strip()
     favicon = ''
     
     try:
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, 'html.parser')
         links = soup.findAll('link')
         breakFlag = False
@@ -605,12 +944,7 @@ def extractFavIconFromHTML(html, sourceURL):
             if( breakFlag ):
                 break
 
-        if( len(favicon) != 0 and len(sourceURL) != 0 ):
-            if( favicon.find('//') == 0 ):
-                favicon = 'http:' + favicon
-            elif( favicon[0] == '/' ):
-                scheme, netloc, path, params, query, fragment = urlparse( sourceURL )
-                favicon = scheme + '://' + netloc + favicon
+        favicon = resolveFavIcon(favicon, sourceURL)
     except:
         genericErrorInfo()
 
@@ -618,319 +952,49 @@ def extractFavIconFromHTML(html, sourceURL):
 #html/url - end
 
 #text - start
-def isExclusivePunct(text):
-
-    text = text.strip()
-    for char in text:
-        if char not in string.punctuation:
-            return False
+stopwordsSet = frozenset([
+    "a", "about", "above", "across", "after", "afterwards", "again", "against", "all", "almost",
+    "alone", "along", "already", "also", "although", "always", "am", "among", "amongst",
+    "amoungst", "amount", "an", "and", "another", "any", "anyhow", "anyone", "anything", "anyway",
+    "anywhere", "are", "around", "as", "at", "back", "be", "became", "because", "become",
+    "becomes", "becoming", "been", "before", "beforehand", "behind", "being", "below", "beside",
+    "besides", "between", "beyond", "both", "but", "by", "can", "can't", "cannot", "cant", "co",
+    "could not", "could", "couldn't", "couldnt", "de", "describe", "detail", "did", "do", "does",
+    "doing", "done", "due", "during", "e.g", "e.g.", "e.g.,", "each", "eg", "either", "else",
+    "elsewhere", "enough", "etc", "etc.", "even though", "ever", "every", "everyone", "everything",
+    "everywhere", "except", "for", "former", "formerly", "from", "further", "get", "go", "had",
+    "has not", "has", "hasn't", "hasnt", "have", "having", "he", "hence", "her", "here",
+    "hereafter", "hereby", "herein", "hereupon", "hers", "herself", "him", "himself", "his", "how",
+    "however", "i", "ie", "i.e", "i.e.", "if", "in", "inc", "inc.", "indeed", "into", "is", "it",
+    "its", "it's", "itself", "just", "keep", "latter", "latterly", "less", "made", "make", "may",
+    "me", "meanwhile", "might", "mine", "more", "moreover", "most", "mostly", "move", "must", "my",
+    "myself", "namely", "neither", "never", "nevertheless", "next", "no", "nobody", "none",
+    "noone", "nor", "not", "nothing", "now", "nowhere", "of", "off", "often", "on", "once", "one",
+    "only", "onto", "or", "other", "others", "otherwise", "our", "ours", "ourselves", "out",
+    "over", "own", "part", "per", "perhaps", "please", "put", "rather", "re", "same", "see",
+    "seem", "seemed", "seeming", "seems", "several", "she", "should", "show", "side", "since",
+    "sincere", "so", "some", "somehow", "someone", "something", "sometime", "sometimes",
+    "somewhere", "still", "such", "take", "than", "that", "the", "their", "theirs", "them",
+    "themselves", "then", "thence", "there", "thereafter", "thereby", "therefore", "therein",
+    "thereupon", "these", "they", "this", "those", "though", "through", "throughout", "thru",
+    "thus", "to", "together", "too", "toward", "towards", "un", "until", "upon", "us", "very",
+    "via", "was", "we", "well", "were", "what", "whatever", "when", "whence", "whenever", "where",
+    "whereafter", "whereas", "whereby", "wherein", "whereupon", "wherever", "whether", "which",
+    "while", "whither", "who", "whoever", "whole", "whom", "whose", "why", "will", "with",
+    "within", "without", "would", "yet", "you", "your", "yours", "yourself", "yourselves"
+])
+
+#words & numbers
+tokenLabelRegex = re.compile(r'(?u)\b[a-zA-Z\'\’-]+[a-zA-Z]+\b|\d+[.,]?\d*')
 
-    return True
+def isExclusivePunct(text):
+    return text.strip().strip(string.punctuation) == ''
 
 def isStopword(term):
-
-    stopWordsDict = getStopwordsDict()
-    if( term.strip().lower() in stopWordsDict ):
-        return True
-    else:
-        return False
+    return term.strip().lower() in stopwordsSet
 
 def getStopwordsDict():
-
-    stopwordsDict = {
-        "a": True,
-        "about": True,
-        "above": True,
-        "across": True,
-        "after": True,
-        "afterwards": True,
-        "again": True,
-        "against": True,
-        "all": True,
-        "almost": True,
-        "alone": True,
-        "along": True,
-        "already": True,
-        "also": True,
-        "although": True,
-        "always": True,
-        "am": True,
-        "among": True,
-        "amongst": True,
-        "amoungst": True,
-        "amount": True,
-        "an": True,
-        "and": True,
-        "another": True,
-        "any": True,
-        "anyhow": True,
-        "anyone": True,
-        "anything": True,
-        "anyway": True,
-        "anywhere": True,
-        "are": True,
-        "around": True,
-        "as": True,
-        "at": True,
-        "back": True,
-        "be": True,
-        "became": True,
-        "because": True,
-        "become": True,
-        "becomes": True,
-        "becoming": True,
-        "been": True,
-        "before": True,
-        "beforehand": True,
-        "behind": True,
-        "being": True,
-        "below": True,
-        "beside": True,
-        "besides": True,
-        "between": True,
-        "beyond": True,
-        "both": True,
-        "but": True,
-        "by": True,
-        "can": True,
-        "can\'t": True,
-        "cannot": True,
-        "cant": True,
-        "co": True,
-        "could not": True,
-        "could": True,
-        "couldn\'t": True,
-        "couldnt": True,
-        "de": True,
-        "describe": True,
-        "detail": True,
-        "did": True,
-        "do": True,
-        "does": True,
-        "doing": True,
-        "done": True,
-        "due": True,
-        "during": True,
-        "e.g": True,
-        "e.g.": True,
-        "e.g.,": True,
-        "each": True,
-        "eg": True,
-        "either": True,
-        "else": True,
-        "elsewhere": True,
-        "enough": True,
-        "etc": True,
-        "etc.": True,
-        "even though": True,
-        "ever": True,
-        "every": True,
-        "everyone": True,
-        "everything": True,
-        "everywhere": True,
-        "except": True,
-        "for": True,
-        "former": True,
-        "formerly": True,
-        "from": True,
-        "further": True,
-        "get": True,
-        "go": True,
-        "had": True,
-        "has not": True,
-        "has": True,
-        "hasn\'t": True,
-        "hasnt": True,
-        "have": True,
-        "having": True,
-        "he": True,
-        "hence": True,
-        "her": True,
-        "here": True,
-        "hereafter": True,
-        "hereby": True,
-        "herein": True,
-        "hereupon": True,
-        "hers": True,
-        "herself": True,
-        "him": True,
-        "himself": True,
-        "his": True,
-        "how": True,
-        "however": True,
-        "i": True,
-        "ie": True,
-        "i.e": True,
-        "i.e.": True,
-        "if": True,
-        "in": True,
-        "inc": True,
-        "inc.": True,
-        "indeed": True,
-        "into": True,
-        "is": True,
-        "it": True,
-        "its": True,
-        "it's": True,
-        "itself": True,
-        "just": True,
-        "keep": True,
-        "latter": True,
-        "latterly": True,
-        "less": True,
-        "made": True,
-        "make": True,
-        "may": True,
-        "me": True,
-        "meanwhile": True,
-        "might": True,
-        "mine": True,
-        "more": True,
-        "moreover": True,
-        "most": True,
-        "mostly": True,
-        "move": True,
-        "must": True,
-        "my": True,
-        "myself": True,
-        "namely": True,
-        "neither": True,
-        "never": True,
-        "nevertheless": True,
-        "next": True,
-        "no": True,
-        "nobody": True,
-        "none": True,
-        "noone": True,
-        "nor": True,
-        "not": True,
-        "nothing": True,
-        "now": True,
-        "nowhere": True,
-        "of": True,
-        "off": True,
-        "often": True,
-        "on": True,
-        "once": True,
-        "one": True,
-        "only": True,
-        "onto": True,
-        "or": True,
-        "other": True,
-        "others": True,
-        "otherwise": True,
-        "our": True,
-        "ours": True,
-        "ourselves": True,
-        "out": True,
-        "over": True,
-        "own": True,
-        "part": True,
-        "per": True,
-        "perhaps": True,
-        "please": True,
-        "put": True,
-        "rather": True,
-        "re": True,
-        "same": True,
-        "see": True,
-        "seem": True,
-        "seemed": True,
-        "seeming": True,
-        "seems": True,
-        "several": True,
-        "she": True,
-        "should": True,
-        "show": True,
-        "side": True,
-        "since": True,
-        "sincere": True,
-        "so": True,
-        "some": True,
-        "somehow": True,
-        "someone": True,
-        "something": True,
-        "sometime": True,
-        "sometimes": True,
-        "somewhere": True,
-        "still": True,
-        "such": True,
-        "take": True,
-        "than": True,
-        "that": True,
-        "the": True,
-        "their": True,
-        "theirs": True,
-        "them": True,
-        "themselves": True,
-        "then": True,
-        "thence": True,
-        "there": True,
-        "thereafter": True,
-        "thereby": True,
-        "therefore": True,
-        "therein": True,
-        "thereupon": True,
-        "these": True,
-        "they": True,
-        "this": True,
-        "those": True,
-        "though": True,
-        "through": True,
-        "throughout": True,
-        "thru": True,
-        "thus": True,
-        "to": True,
-        "together": True,
-        "too": True,
-        "toward": True,
-        "towards": True,
-        "un": True,
-        "until": True,
-        "upon": True,
-        "us": True,
-        "very": True,
-        "via": True,
-        "was": True,
-        "we": True,
-        "well": True,
-        "were": True,
-        "what": True,
-        "whatever": True,
-        "when": True,
-        "whence": True,
-        "whenever": True,
-        "where": True,
-        "whereafter": True,
-        "whereas": True,
-        "whereby": True,
-        "wherein": True,
-        "whereupon": True,
-        "wherever": True,
-        "whether": True,
-        "which": True,
-        "while": True,
-        "whither": True,
-        "who": True,
-        "whoever": True,
-        "whole": True,
-        "whom": True,
-        "whose": True,
-        "why": True,
-        "will": True,
-        "with": True,
-        "within": True,
-        "without": True,
-        "would": True,
-        "yet": True,
-        "you": True,
-        "your": True,
-        "yours": True,
-        "yourself": True,
-        "yourselves": True
-    }
-    
-    return stopwordsDict
+    return dict.fromkeys(stopwordsSet, True)
 
 def getTokenLabelsForText(text, label):
 
@@ -938,7 +1002,7 @@ def getTokenLabelsForText(text, label):
         return []
 
     labeledTokens = []
-    text = re.findall(r'(?u)\b[a-zA-Z\'\’-]+[a-zA-Z]+\b|\d+[.,]?\d*', text)
+    text = tokenLabelRegex.findall(text)
 
     for tok in text:
         tok = tok.strip()
@@ -952,36 +1016,20 @@ def getTokenLabelsForText(text, label):
 
 def getTopKTermsListFromText(textOrTokens, k, minusStopwords=True):
 
+    '''
+        [(term, frequency)] of the k most frequent (lowercased) terms, terms with the same frequency are in order of first occurrence
+    '''
     if( len(textOrTokens) == 0 or k < 1 ):
         return []
 
-    stopWordsDict = {}
-    if( minusStopwords ):
-        stopWordsDict = getStopwordsDict()
-
-    topKTermDict = {}
-    topKTermsList = []
+    stopwords = stopwordsSet if minusStopwords else frozenset()
     textOrTokens = textOrTokens.split(' ') if isinstance(textOrTokens, str) else textOrTokens
+    
+    terms = ( term.strip().lower() for term in textOrTokens )
+    termFreqs = Counter( term for term in terms if term not in stopwords and term.strip(string.punctuation) != '' )
 
-    for term in textOrTokens:
-        term = term.strip().lower()
-        
-        if( len(term) == 0 or term in stopWordsDict or isExclusivePunct(term) == True ):
-            continue
-
-        topKTermDict.setdefault(term, 0)
-        topKTermDict[term] += 1
-
-    sortedKeys = sorted( topKTermDict, key=lambda freq:topKTermDict[freq], reverse=True )
-
-    if( k > len(sortedKeys) ):
-        k = len(sortedKeys)
-
-    for i in range(k):
-        key = sortedKeys[i]
-        topKTermsList.append((key, topKTermDict[key]))
-
-    return topKTermsList
+    #most_common() uses heapq.nlargest(), which, as the stable sort it replaces, keeps ties in insertion order
+    return termFreqs.most_common(k)
 
 def get_top_k_terms(text_or_tokens, k, class_name=''):    
     top_k_terms = getTopKTermsListFromText( text_or_tokens, k )
@@ -990,14 +1038,119 @@ def get_top_k_terms(text_or_tokens, k, class_name=''):
     else:
         return [{'entity': e[0], 'class': class_name} for e in top_k_terms]
 
-def get_spacy_entities(spacy_ents, top_k_terms=[], base_ref_date=datetime.now(), labels_lst=[], **kwargs):
+class DateNormalizer(object):
+
+    ref_granularities = ['second', 'minute', 'hour', 'day']
+    isoDateRegex = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[Tt](\d{2}):(\d{2}):(\d{2}))?')
+    yearRegex = re.compile(r'\d{4}')
+
+    def __init__(self, maxsize=10000, granularity='second'):
+
+        '''
+            Memoized dateparser normalization of DATE entities to '%Y-%m-%dT%H:%M:%S'
+            LRU cache of maxsize entries keyed by (date string as given, reference time)
+            granularity: 'second' (exact reference time, same output as calling dateparser), 'minute', 'hour' or 'day': relative dates (e.g., "last week") 
+            are resolved against the reference time truncated to granularity, so reference times within the same day (e.g.) share entries
+            ISO dates/datetimes and bare years are resolved without calling dateparser
+        '''
+        if( granularity not in DateNormalizer.ref_granularities ):
+            raise ValueError('granularity must be one of ' + str(DateNormalizer.ref_granularities))
+
+        self.maxsize = maxsize
+        self.granularity = granularity
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefiltered = 0
+
+    def get_ref_key(self, base_ref_date):
+
+        if( self.granularity == 'minute' ):
+            return base_ref_date.replace(second=0, microsecond=0)
+        elif( self.granularity == 'hour' ):
+            return base_ref_date.replace(minute=0, second=0, microsecond=0)
+        elif( self.granularity == 'day' ):
+            return base_ref_date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        return base_ref_date
+
+    @staticmethod
+    def prefilter(date_str, base_ref_date):
+
+        '''
+            datetime for the forms resolved as dateparser does, None otherwise:
+            ISO dates (2019-03-24 -> 2019-03-24T00:00:00), ISO datetimes, 
+            and years (2019 -> 2019 on the reference month and day, clamped to the month's last day, at 00:00:00)
+        '''
+        try:
+            iso_date = DateNormalizer.isoDateRegex.fullmatch(date_str)
+            if( iso_date is not None ):
+                return datetime( *[int(d) for d in iso_date.groups() if d is not None] )
+
+            if( DateNormalizer.yearRegex.fullmatch(date_str) is not None ):
+                year = int(date_str)
+                return datetime( year, base_ref_date.month, min(base_ref_date.day, monthrange(year, base_ref_date.month)[1]) )
+        except ValueError:
+            pass
+
+        return None
+
+    def normalize(self, date_str, base_ref_date):
+
+        '''
+            returns '%Y-%m-%dT%H:%M:%S' or None if date_str could not be parsed
+        '''
+        base_ref_date = self.get_ref_key(base_ref_date)
+        key = (date_str, base_ref_date)
+
+        with self.lock:
+            if( key in self.cache ):
+                self.hits += 1
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+            self.misses += 1
+
+        parsed_date = DateNormalizer.prefilter(date_str, base_ref_date)
+        if( parsed_date is None ):
+            from dateparser import parse as parseDateStr
+            parsed_date = parseDateStr( date_str, settings={'RELATIVE_BASE': base_ref_date} )
+        else:
+            with self.lock:
+                self.prefiltered += 1
+
+        parsed_date = None if parsed_date is None else parsed_date.strftime('%Y-%m-%dT%H:%M:%S')
+        with self.lock:
+            self.cache[key] = parsed_date
+            if( len(self.cache) > self.maxsize ):
+                self.cache.popitem(last=False)
+
+        return parsed_date
+
+    def stats(self):
+
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'prefiltered': self.prefiltered,
+                'entries': len(self.cache)
+            }
+
+date_normalizer = DateNormalizer()
+
+def get_spacy_entities(spacy_ents, top_k_terms=[], base_ref_date=None, labels_lst=[], **kwargs):
     
     kwargs.setdefault('output_2d_lst', False)
+    base_ref_date = datetime.now() if base_ref_date is None else base_ref_date
     '''
         #spacy entities: 
             nlp = spacy.load('en_core_web_sm')
             nlp.get_pipe("ner").labels
             ('ORG', 'EVENT', 'NORP', 'ORDINAL', 'LOC', 'FAC', 'DATE', 'WORK_OF_ART', 'TIME', 'GPE', 'LANGUAGE', 'LAW', 'QUANTITY', 'PRODUCT', 'PERCENT', 'CARDINAL', 'PERSON', 'MONEY')
+        base_ref_date: reference time for relative DATE entities (e.g., "yesterday"), default: now
+        date_normalizer: DateNormalizer for DATE entities (default: the module's date_normalizer)
     '''
 
     ents_dedup = set()
@@ -1013,10 +1166,9 @@ def get_spacy_entities(spacy_ents, top_k_terms=[], base_ref_date=datetime.now(),
         if( e.label_ == 'DATE' ):
             
             try:
-                parsed_date = parseDateStr( ent_str, settings={'RELATIVE_BASE': base_ref_date} )
+                parsed_date = kwargs.get('date_normalizer', date_normalizer).normalize( ent_str, base_ref_date )
                 if( parsed_date is None ):
                     continue
-                parsed_date = parsed_date.strftime('%Y-%m-%dT%H:%M:%S')
                 ent_str = parsed_date
             except:
                 genericErrorInfo(f'\n\tProblematic date during normalization: {ent_str}')
@@ -1050,25 +1202,254 @@ def get_spacy_entities(spacy_ents, top_k_terms=[], base_ref_date=datetime.now(),
 
     return final_ents
 
-def parallel_ner(link, add_top_k_terms=10, min_doc_word_count=100, include_title_for_ner=True):
+def load_spacy_model(model_name='en_core_web_sm', disable=[], download=True):
+
+    '''
+        Imports spaCy and loads model_name, downloading it (just once) if it is not installed and download is True
+        The model is not in setup.py's install_requires since adding 
+            'en_core_web_sm @ https://github.com/explosion/spacy-models/releases/download/en_core_web_sm-3.1.0/en_core_web_sm-3.1.0.tar.gz#egg=en_core_web_sm' 
+        made the package not uploadable to pypi: "HTTPError: 400 Client Error: Invalid value for requires_dist. Error: Can't have direct dependency: 'en-core-web-sm @ https://github.com/explosion/spacy-models/releases/download/en_core_web_sm-3.1.0/en_core_web_sm-3.1.0.tar.gz#egg=en_core_web_sm' for url: https://upload.pypi.org/legacy/"
+    '''
+    import spacy
+    
+    try:
+        return spacy.load(model_name, disable=disable)
+    except OSError:
+        if( download is False ):
+            raise
+
+    logger.info('Downloading ' + model_name + ' language model for the spaCy NER tagger (This would be done just once)\n')
+    from spacy.cli import download as download_model
+    download_model(model_name)
+    
+    return spacy.load(model_name, disable=disable)
+
+def preflight_ner_model(model_name='en_core_web_sm', download=True):
+
+    '''
+        Loads (and if needed, downloads) model_name ahead of a run and reports what was loaded
+        instead of sgsuite doing so as a side effect of the first NER call
+    '''
+    report = {'model': model_name, 'status': 'error', 'spacy_version': '', 'model_version': '', 'pipeline': [], 'ner_labels': []}
+    try:
+        import spacy
+        report['spacy_version'] = spacy.__version__
+
+        nlp = load_spacy_model(model_name, download=download)
+        report['model_version'] = nlp.meta.get('version', '')
+        report['pipeline'] = list(nlp.pipe_names)
+        report['ner_labels'] = list( nlp.get_pipe('ner').labels ) if 'ner' in nlp.pipe_names else []
+        report['status'] = 'ok'
+    except:
+        genericErrorInfo('\n\tpreflight_ner_model(), model: ' + model_name)
+
+    return report
+
+class SpacyNER(object):
+
+    def __init__(self, model_name='en_core_web_sm', disable=None):
+        
+        '''
+            Loads the spaCy model once (on first use) and streams documents through nlp.pipe()
+            Pipes not needed for NER (parser, lemmatizer) are disabled by default
+        '''
+        self.model_name = model_name
+        self.disable = ['parser', 'lemmatizer'] if disable is None else disable
+        self.nlp = None
+        self.labels_lst = []
+        self.load_lock = threading.Lock()
+
+    def load(self):
+
+        with self.load_lock:
+            if( self.nlp is None ):
+                self.nlp = load_spacy_model(self.model_name, disable=self.disable)
+                self.labels_lst = list( self.nlp.get_pipe('ner').labels )
+
+        return self.nlp
+
+    @staticmethod
+    def get_ner_text(link, include_title_for_ner=True):
+        return link.get('title', '').strip() + '.\n' + link['text'] if include_title_for_ner is True else link['text']
+
+    def get_raw_ner(self, link, spacy_doc, add_top_k_terms=10):
+
+        '''
+            the part of NER that does not depend on base_ref_date (cacheable), format:
+            {
+                'ents': [[entity text before date normalization, label]],
+                'top_k_terms': [entity_dict]
+            }
+        '''
+        top_k_terms = get_top_k_terms( [t.text for t in spacy_doc], add_top_k_terms )
+        if( 'title' in link ):
+            top_k_terms += getTokenLabelsForText( link['title'], 'TITLE' )
+
+        return {
+            'ents': [ [e.text, e.label_] for e in spacy_doc.ents ],
+            'top_k_terms': top_k_terms
+        }
+
+    @staticmethod
+    def get_ner_payload_frm_raw(raw_ner, min_doc_word_count=100, output_2d_lst=False, base_ref_date=None):
 
-    nlp = spacy.load('en_core_web_sm')
-    spacy_doc = nlp( link.get('title', '').strip() + '.\n' + link['text'] ) if include_title_for_ner is True else nlp( link['text'] )
-    doc_len = len(spacy_doc)
-    ner_payload = {'entities': []}
+        ner_payload = {'entities': []}
+        if( min_doc_word_count < 100 ):
+            return ner_payload
+
+        #raw_ner['ents'] labels are the model's NER labels, so no labels_lst filter is needed
+        ner_payload = { 
+            'entities': get_spacy_entities([ SpacyEnt(e[0], e[1]) for e in raw_ner['ents'] ], top_k_terms=raw_ner['top_k_terms'], base_ref_date=base_ref_date, output_2d_lst=output_2d_lst)
+        }
 
-    if( min_doc_word_count < 100 ):
         return ner_payload
 
-    top_k_terms = get_top_k_terms( [t.text for t in spacy_doc], add_top_k_terms )
-    if( 'title' in link ):
-        top_k_terms += getTokenLabelsForText( link['title'], 'TITLE' )
+    def get_ner_payload(self, link, spacy_doc, add_top_k_terms=10, min_doc_word_count=100, output_2d_lst=False, base_ref_date=None):
+        return SpacyNER.get_ner_payload_frm_raw( self.get_raw_ner(link, spacy_doc, add_top_k_terms=add_top_k_terms), min_doc_word_count=min_doc_word_count, output_2d_lst=output_2d_lst, base_ref_date=base_ref_date )
 
-    ner_payload = { 
-        'entities': get_spacy_entities(spacy_doc.ents, top_k_terms=top_k_terms, base_ref_date=datetime.now(), labels_lst=list(nlp.get_pipe('ner').labels), output_2d_lst=False)
-    }
+    def get_entities(self, links, batch_size=32, add_top_k_terms=10, min_doc_word_count=100, include_title_for_ner=True, output_2d_lst=False, ner_cache=None, base_ref_date=None):
 
-    return ner_payload
+        '''
+            links: iterable of {'text': ..., 'title': ...}
+            yields ner_payload ({'entities': [entity_dict]}) for each link, in links order
+            output_2d_lst: entities as [entity, class] lists instead of entity_dict
+            ner_cache: sgsuite.cache.DerivedCache, links whose raw NER (see get_raw_ner()) is cached skip nlp.pipe()
+            base_ref_date: reference time for relative DATE entities of all links, default: time of the call
+        '''
+        nlp = self.load()
+        base_ref_date = datetime.now() if base_ref_date is None else base_ref_date
+        pending = deque()
+
+        def gen_docs():
+            for link in links:
+                
+                entry = {'link': link, 'raw_ner': None, 'key': ''}
+                pending.append(entry)
+                try:
+                    ner_text = SpacyNER.get_ner_text(link, include_title_for_ner=include_title_for_ner)
+                    if( ner_cache is not None ):
+                        entry['key'] = ner_cache.get_key( 'ner', [self.model_name, self.disable, add_top_k_terms, include_title_for_ner, link.get('title'), link['text']] )
+                        entry['raw_ner'] = ner_cache.get( entry['key'] )
+                except:
+                    genericErrorInfo()
+                    entry['raw_ner'] = {'ents': [], 'top_k_terms': []}
+
+                if( entry['raw_ner'] is None ):
+                    yield ner_text, entry
+
+        def pop_ready():
+            while( len(pending) != 0 and pending[0]['raw_ner'] is not None ):
+                
+                try:
+                    ner_payload = SpacyNER.get_ner_payload_frm_raw( pending.popleft()['raw_ner'], min_doc_word_count=min_doc_word_count, output_2d_lst=output_2d_lst, base_ref_date=base_ref_date )
+                except:
+                    genericErrorInfo()
+                    ner_payload = {'entities': []}
+                
+                yield ner_payload
+
+        def set_raw_ner(entry, spacy_doc):
+
+            try:
+                if( spacy_doc is None ):
+                    spacy_doc = nlp( SpacyNER.get_ner_text(entry['link'], include_title_for_ner=include_title_for_ner) )
+                entry['raw_ner'] = self.get_raw_ner(entry['link'], spacy_doc, add_top_k_terms=add_top_k_terms)
+            except:
+                genericErrorInfo()
+                #not cached, so it is retried in the next run
+                entry['raw_ner'] = {'ents': [], 'top_k_terms': []}
+                return
+
+            if( ner_cache is not None ):
+                ner_cache.put( entry['key'], entry['raw_ner'] )
+
+        docs = gen_docs()
+        while( True ):
+
+            try:
+                for spacy_doc, entry in nlp.pipe(docs, as_tuples=True, batch_size=batch_size):
+                    set_raw_ner(entry, spacy_doc)
+                    yield from pop_ready()
+                break
+            except GeneratorExit:
+                raise
+            except:
+                genericErrorInfo()
+
+            #a document broke nlp.pipe(): the documents of its batch are processed one at a time, then nlp.pipe() resumes with the next documents
+            failed = [ entry for entry in pending if entry['raw_ner'] is None ]
+            if( len(failed) == 0 ):
+                #nlp.pipe() failed before taking a document, the remaining documents are processed one at a time
+                failed = ( entry for ner_text, entry in docs )
+
+            for entry in failed:
+                set_raw_ner(entry, None)
+                yield from pop_ready()
+
+        yield from pop_ready()
+
+SpacyEnt = namedtuple('SpacyEnt', ['text', 'label_'])
+ner_engines = {}
+def get_ner_engine(model_name='en_core_web_sm'):
+    
+    if( model_name not in ner_engines ):
+        ner_engines[model_name] = SpacyNER(model_name=model_name)
+
+    return ner_engines[model_name]
+
+def init_ner_worker(model_name, derived_cache_dir='', derived_cache_ttl=None, pipeline_version=None):
+    
+    init_worker_derived_cache(derived_cache_dir, ttl=derived_cache_ttl, pipeline_version=pipeline_version)
+    get_ner_engine(model_name).load()
+
+def ner_worker_task(task):
+
+    ner_cache = get_worker_derived_cache()
+
+    ner_engine = get_ner_engine( task['model_name'] )
+    ner_payloads = ner_engine.get_entities( task['links'], batch_size=task['batch_size'], add_top_k_terms=task['add_top_k_terms'], min_doc_word_count=task['min_doc_word_count'], include_title_for_ner=task['include_title_for_ner'], output_2d_lst=True, ner_cache=ner_cache, base_ref_date=task['base_ref_date'] )
+    
+    return [ p['entities'] for p in ner_payloads ]
+
+def get_entities_in_processes(links, process_count=2, chunk_size=16, model_name='en_core_web_sm', batch_size=32, add_top_k_terms=10, min_doc_word_count=100, include_title_for_ner=True, derived_cache_dir='', derived_cache_ttl=None, base_ref_date=None):
+
+    '''
+        NER in a pool of process_count worker processes, each loads model_name once at initialization
+        workers receive chunk_size links (title & text only) at a time and return [entity, class] lists
+        derived_cache_dir: directory of the sgsuite.cache.DerivedCache workers use as ner_cache, with derived_cache_ttl
+        base_ref_date: reference time for relative DATE entities of all links, default: time of the call
+        yields ner_payload ({'entities': [entity_dict]}) for each link, in links order
+    '''
+    def gen_tasks():
+        
+        chunk = []
+        for link in links:
+            
+            chunk.append({ k: link[k] for k in ['title', 'text'] if k in link })
+            if( len(chunk) == chunk_size ):
+                yield chunk
+                chunk = []
+
+        if( len(chunk) != 0 ):
+            yield chunk
+
+    base_ref_date = datetime.now() if base_ref_date is None else base_ref_date
+    tasks = ( {'links': chunk, 'base_ref_date': base_ref_date, 'model_name': model_name, 'batch_size': batch_size, 'add_top_k_terms': add_top_k_terms, 'min_doc_word_count': min_doc_word_count, 'include_title_for_ner': include_title_for_ner} for chunk in gen_tasks() )
+    with Pool(processes=process_count, initializer=init_ner_worker, initargs=(model_name,) + get_worker_derived_cache_args(derived_cache_dir, derived_cache_ttl)) as pool:
+        for task, chunk_entities, error in imap_bounded(pool, ner_worker_task, tasks, max_pending=2*process_count):
+            
+            if( error is not None ):
+                logger.error('\tget_entities_in_processes(), chunk error: ' + repr(error))
+                chunk_entities = [ [] for link in task['links'] ]
+
+            for entities in chunk_entities:
+                yield {'entities': [ {'entity': e[0], 'class': e[1]} for e in entities ]}
+
+def parallel_ner(link, add_top_k_terms=10, min_doc_word_count=100, include_title_for_ner=True, base_ref_date=None):
+
+    ner_engine = get_ner_engine()
+    for ner_payload in ner_engine.get_entities([link], batch_size=1, add_top_k_terms=add_top_k_terms, min_doc_word_count=min_doc_word_count, include_title_for_ner=include_title_for_ner, base_ref_date=base_ref_date):
+        return ner_payload
 
 def parse_inpt_for_links(usr_input):
 
@@ -1104,41 +1485,303 @@ def parse_inpt_for_links(usr_input):
 
     return all_link_details
 
-def get_entities_frm_links(links, update_rate=10, **kwargs):
-    
+def stream_entities_frm_links(links, update_rate=10, **kwargs):
+
+    '''
+        Dereference (derefURI) -> boilerplate removal (cleanHtml, title, favicon) -> NER pipeline
+        The stages run concurrently and are connected by queues of pipeline_queue_size, 
+        so a slow stage blocks (backpressure) the stages before it instead of buffering everything
+        
+        per-stage concurrency:
+            thread_count: dereferencing threads
+            async_fetch: dereference with an AsyncFetcher (pooled connections), thread_count requests in flight, at most domain_thread_count per domain
+            fetcher: AsyncFetcher instance to use instead (not closed)
+        
+        html_cache (sgsuite.cache.HTMLCache) or cache_dir (+ cache_ttl seconds): skip dereferencing pages already in the HTML cache
+        derived_cache (sgsuite.cache.DerivedCache) or cache_dir: skip boilerplate removal and NER for unchanged content
+            clean_thread_count: boilerplate removal threads
+            clean_process_count: boilerplate removal worker processes (replaces the threads if > 0), clean_chunk_size pages at a time
+            clean_method: cleanHtml() method
+            ner_process_count: NER worker processes (0: NER runs in the calling thread, batches of ner_batch_size)
+
+        base_ref_date: reference time for relative DATE entities (e.g., "yesterday") of all links, default: time of the call
+
+        yields (index of link in links, link record) as each link finishes NER, not in links order
+    '''
     warnings.filterwarnings("ignore",message="The localize method is no longer necessary, as this time zone supports the fold attribute")
-    add_top_k_terms = kwargs.get('add_top_k_terms', 10)
-    min_doc_word_count = kwargs.get('min_doc_word_count', 100)
-    #rename for parallelGetTxtFrmURIs
-    kwargs.setdefault('threadCount', kwargs.pop('thread_count', 5))
-    
-    jobs_lst = []
-    links = parallelGetTxtFrmURIs(links, updateRate=update_rate, **kwargs)
+    size = len(links)
+    if( size == 0 ):
+        return
+
+    fetch_thread_count = max( 1, kwargs.get('threadCount', kwargs.get('thread_count', 5)) )
+    clean_process_count = kwargs.get('clean_process_count', 0)
+    clean_thread_count = 1 if clean_process_count > 0 else max( 1, kwargs.get('clean_thread_count', 1) )
+    clean_method = kwargs.get('clean_method', 'python-boilerpipe')
+    queue_size = max( 1, kwargs.get('pipeline_queue_size', 32) )
     
-    for i in range(len(links)):
-        
-        keywords = {
-            'link': links[i],
-            'add_top_k_terms': add_top_k_terms,
-            'min_doc_word_count': min_doc_word_count,
-            'include_title_for_ner': kwargs.get('include_title_for_ner', True)
-        }
+    uri_q = Queue()
+    html_q = Queue(maxsize=queue_size)
+    txt_q = Queue(maxsize=queue_size)
+    stage_done = {'fetch': 0, 'clean': 0}
+    stage_lock = threading.Lock()
+    #set once the caller stops iterating (or the NER stage fails), the stage threads then exit
+    stop_event = threading.Event()
+    threads = []
+
+    for i in range(size):
+        uri_q.put( (i, links[i]) )
+
+    html_cache = kwargs.get('html_cache')
+    if( html_cache is None and kwargs.get('cache_dir', '') != '' ):
+        from sgsuite.cache import HTMLCache
+        html_cache = HTMLCache( os.path.join(kwargs['cache_dir'], 'html'), ttl=kwargs.get('cache_ttl') )
+
+    derived_cache = kwargs.get('derived_cache')
+    if( derived_cache is None and kwargs.get('cache_dir', '') != '' ):
+        from sgsuite.cache import DerivedCache
+        derived_cache = DerivedCache( os.path.join(kwargs['cache_dir'], 'derived'), ttl=kwargs.get('cache_ttl') )
+
+    def get_html_item():
+        #None once stopped, the sentinel may have been drained by then
+        while( stop_event.is_set() is False ):
+            try:
+                return html_q.get(timeout=0.1)
+            except Empty:
+                pass
+
+        return None
+
+    def is_last_worker(stage):
+        with stage_lock:
+            stage_done[stage] += 1
+            return stage_done[stage] == (fetch_thread_count if stage == 'fetch' else clean_thread_count)
+
+    def fetch_worker():
+
+        try:
+            while( stop_event.is_set() is False ):
+                
+                try:
+                    i, uri = uri_q.get_nowait()
+                except Empty:
+                    break
+                
+                if( i % update_rate == 0 ):
+                    logger.info('dereferencing uri ' + str(i) + ' of ' + str(size))
+
+                deref_res = {'text': '', 'status': 'error'}
+                try:
+                    deref_res = derefURIDetails(uri, sleepSec=0, extraParams={'html_cache': html_cache})
+                except:
+                    genericErrorInfo()
+
+                html_q.put( (i, uri, deref_res) )
+        finally:
+            if( is_last_worker('fetch') ):
+                for _ in range(clean_thread_count):
+                    html_q.put(None)
+
+    def clean_worker():
+
+        try:
+            while( True ):
+                
+                item = get_html_item()
+                if( item is None ):
+                    break
+
+                i, uri, deref_res = item
+                try:
+                    link = getTxtFrmHTML(deref_res['text'], uri, derefStatus=deref_res['status'], derivedCache=derived_cache, cleanMethod=clean_method)
+                except:
+                    genericErrorInfo()
+                    link = {'text': '', 'title': '', 'favicon': '', 'deref-status': 'error', 'uri': uri}
+
+                link['link'] = link.pop('uri')
+                txt_q.put( (i, link) )
+        finally:
+            if( is_last_worker('clean') ):
+                txt_q.put(None)
+
+    def clean_pool_worker():
+
+        clean_order = deque()
+        input_state = {'done': False}
+        def gen_pages():
+            while( True ):
+
+                item = get_html_item()
+                if( item is None ):
+                    break
 
-        jobs_lst.append({
-            'func': parallel_ner,
-            'args': keywords,
-            'misc': None,
-            'print': ''
-        })
+                i, uri, deref_res = item
+                clean_order.append( (i, uri) )
+                yield deref_res['text'], uri, deref_res['status']
+
+            input_state['done'] = True
+
+        docs = get_txt_frm_html_in_processes(gen_pages(), process_count=clean_process_count, chunk_size=kwargs.get('clean_chunk_size', 8), clean_method=clean_method, derived_cache_dir='' if derived_cache is None else derived_cache.cache_dir, derived_cache_ttl=None if derived_cache is None else derived_cache.ttl)
+        try:
+            for link in docs:
+                
+                if( stop_event.is_set() ):
+                    break
+                
+                link['link'] = link.pop('uri')
+                txt_q.put( (clean_order.popleft()[0], link) )
+        except:
+            genericErrorInfo()
+        finally:
+            docs.close()
+
+        #pages taken but not cleaned and pages not taken (the pool failed) yield empty records, the sentinel is sent once the input is exhausted
+        while( stop_event.is_set() is False ):
+            
+            if( len(clean_order) != 0 ):
+                i, uri = clean_order.popleft()
+            elif( input_state['done'] is False ):
+                
+                item = get_html_item()
+                if( item is None ):
+                    break
+                
+                i, uri, deref_res = item
+            else:
+                break
+
+            txt_q.put( (i, {'text': '', 'title': '', 'favicon': '', 'deref-status': 'error', 'link': uri}) )
+
+        txt_q.put(None)
+
+    def async_fetch_worker(fetcher):
+
+        def on_fetched(i, res):
+            if( stop_event.is_set() ):
+                #ends fetch_uris(), so the fetches not started are cancelled
+                raise RuntimeError('stream_entities_frm_links() stopped')
+            html_q.put( (i, links[i], res) )
+
+        try:
+            fetcher.fetch_uris( links, on_fetched=on_fetched )
+        except:
+            if( stop_event.is_set() is False ):
+                genericErrorInfo()
+        finally:
+            for _ in range(clean_thread_count):
+                html_q.put(None)
+
+    fetcher = kwargs.get('fetcher')
+    own_fetcher = None
+    if( fetcher is None and kwargs.get('async_fetch', False) is True ):
+        from sgsuite.AsyncFetcher import AsyncFetcher
+        fetcher = own_fetcher = AsyncFetcher(max_concurrency=fetch_thread_count, max_domain_concurrency=kwargs.get('domain_thread_count', 2), html_cache=html_cache)
+
+    if( fetcher is None ):
+        threads += [ threading.Thread(target=fetch_worker, daemon=True) for _ in range(fetch_thread_count) ]
+    else:
+        threads.append( threading.Thread(target=async_fetch_worker, args=(fetcher,), daemon=True) )
     
-    res_lst = parallelTask(jobs_lst, threadCount=kwargs['threadCount'])
-    if( len(res_lst) == len(links) ):
-        for i in range(len(links)):
+    if( clean_process_count > 0 ):
+        threads.append( threading.Thread(target=clean_pool_worker, daemon=True) )
+    else:
+        threads += [ threading.Thread(target=clean_worker, daemon=True) for _ in range(clean_thread_count) ]
+
+    for thread in threads:
+        thread.start()
+
+    #NER stage - start
+    ner_order = deque()
+    txt_state = {'done': False}
+    def gen_txt_links():
+        while( True ):
+            
+            item = txt_q.get()
+            if( item is None ):
+                txt_state['done'] = True
+                return
             
-            links[i]['link'] = links[i].pop('uri')
-            links[i]['entities'] = res_lst[i]['output']['entities']
+            ner_order.append( item )
+            yield item[1]
+
+    ner_params = {
+        'batch_size': kwargs.get('ner_batch_size', 32),
+        'add_top_k_terms': kwargs.get('add_top_k_terms', 10),
+        'min_doc_word_count': kwargs.get('min_doc_word_count', 100),
+        'include_title_for_ner': kwargs.get('include_title_for_ner', True),
+        'base_ref_date': datetime.now() if kwargs.get('base_ref_date') is None else kwargs['base_ref_date']
+    }
+    if( kwargs.get('ner_process_count', 0) > 0 ):
+        ner_payloads = get_entities_in_processes(gen_txt_links(), process_count=kwargs['ner_process_count'], chunk_size=kwargs.get('ner_chunk_size', 16), model_name=kwargs.get('ner_model', 'en_core_web_sm'), derived_cache_dir='' if derived_cache is None else derived_cache.cache_dir, derived_cache_ttl=None if derived_cache is None else derived_cache.ttl, **ner_params)
+    else:
+        ner_payloads = get_ner_engine( kwargs.get('ner_model', 'en_core_web_sm') ).get_entities(gen_txt_links(), ner_cache=derived_cache, **ner_params)
+
+    try:
+        ner_error = False
+        while( True ):
+
+            try:
+                ner_payload = next(ner_payloads)
+            except StopIteration:
+                break
+            except:
+                #e.g., the NER model could not be loaded, the remaining links yield records without entities
+                genericErrorInfo()
+                ner_error = True
+                break
+
+            i, link = ner_order.popleft()
+            link['entities'] = ner_payload['entities']
+            yield i, link
+
+        if( ner_error ):
+            while( len(ner_order) != 0 or txt_state['done'] is False ):
+                
+                if( len(ner_order) == 0 ):
+                    item = txt_q.get()
+                    if( item is None ):
+                        break
+                    ner_order.append(item)
+
+                i, link = ner_order.popleft()
+                link['entities'] = []
+                yield i, link
+    finally:
+        #the caller may stop iterating early: the stage threads blocked on full queues are unblocked and joined
+        stop_event.set()
+        ner_payloads.close()
+        for thread in threads:
+            while( thread.is_alive() ):
+                
+                for q in [html_q, txt_q]:
+                    try:
+                        while( True ):
+                            q.get_nowait()
+                    except Empty:
+                        pass
+
+                thread.join(0.05)
+
+        #a caller's fetcher is left open
+        if( own_fetcher is not None ):
+            own_fetcher.close()
+    #NER stage - end
+
+    if( html_cache is not None ):
+        logger.info('\tstream_entities_frm_links(), html cache: ' + str(html_cache.stats()))
+    if( derived_cache is not None ):
+        logger.info('\tstream_entities_frm_links(), derived cache: ' + str(derived_cache.stats()))
+    logger.info('\tstream_entities_frm_links(), date normalization (this process): ' + str(date_normalizer.stats()))
+
+def get_entities_frm_links(links, update_rate=10, **kwargs):
+    
+    '''
+        list-returning wrapper of stream_entities_frm_links(), records are in links order
+    '''
+    ordered_links = [None] * len(links)
+    for i, link in stream_entities_frm_links(links, update_rate=update_rate, **kwargs):
+        ordered_links[i] = link
 
-    return links
+    return ordered_links
 
 def sanitizeText(text):
 
@@ -0,0 +1,88 @@
+'''
+    Throughput of cleanHtml(method='nltk') vs. the previous regex chain and boilerpy3 (cleanHtml(method='python-boilerpipe'))
+    
+    Usage: python tests/benchmarks/bench_clean.py [directory of saved .html pages]
+    Without a directory, a synthetic corpus of indented news-like pages with inline scripts and styles is used
+'''
+import argparse
+import logging
+import random
+import re
+import sys
+import time
+
+from bench_extraction import get_saved_corpus
+from sgsuite.util import cleanHtml
+
+def legacy_clean_nltk(html):
+
+    #cleanHtml(method='nltk') before the precompiled single-scan cleaner
+    cleaned = re.sub(r"(?is)<(script|style).*?>.*?(</\1>)", "", html.strip())
+    cleaned = re.sub(r"(?s)<!--(.*?)-->[\n]?", "", cleaned)
+    cleaned = re.sub(r"(?s)<.*?>", " ", cleaned)
+    cleaned = re.sub(r"&nbsp;", " ", cleaned)
+    cleaned = re.sub(r"  ", " ", cleaned)
+    cleaned = re.sub(r"  ", " ", cleaned)
+    cleaned = re.sub("\n\s*\n*", "\n", cleaned)
+
+    return cleaned.strip()
+
+def get_synthetic_corpus(count=50, seed=1):
+
+    rand = random.Random(seed)
+    words = ['The', 'Senate', 'voted', 'on', 'Monday,', 'officials', 'said', 'in', 'Norfolk', 'Virginia.', 'a', 'new', 'bill', 'to', 'fund', 'roads', 'and', 'bridges', 'across', 'the', 'state', '&#8220;We', 'R&amp;D']
+    corpus = []
+    
+    for i in range(count):
+        
+        parts = ['<!DOCTYPE html>\n<html lang="en">\n  <head>\n    <meta charset="utf-8">\n    <title>Story ' + str(i) + '</title>\n']
+        parts += [ '    <script type="text/javascript">\n' + f'      var x{j} = function(a, b) {{ return a < b ? "<div>" : b; }};\n' * 20 + '    </script>\n' for j in range(8) ]
+        parts += [ '    <style>\n' + f'      .c{j} > p {{ margin: 0 auto; }}\n' * 30 + '    </style>\n' for j in range(3) ]
+        parts.append('  </head>\n  <body>\n')
+        
+        for j in range(80):
+            parts.append(f'        <div class="row">\n          <a href="/section/{j}">Section</a>\n        </div>\n')
+            if( j % 2 == 0 ):
+                parts.append( '        <p>\n            ' + ' '.join([ rand.choice(words) for _ in range(60) ]) + '\n        </p>\n        <!-- ad slot -->\n' )
+        
+        parts.append('  </body>\n</html>')
+        corpus.append( ('https://www.example.com/news/' + str(i), ''.join(parts)) )
+
+    return corpus
+
+def throughput(func, corpus, repeat=3):
+
+    size = sum([ len(html) for uri, html in corpus ])
+    best = None
+    for _ in range(repeat):
+        
+        start = time.perf_counter()
+        for uri, html in corpus:
+            func(html)
+
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return len(corpus)/best, size/best/1000000
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark cleanHtml() methods')
+    parser.add_argument('html_dir', nargs='?', default='', help='Directory of saved .html pages')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    corpus = get_saved_corpus(args.html_dir) if args.html_dir != '' else get_synthetic_corpus()
+    if( len(corpus) == 0 ):
+        print('no .html files in', args.html_dir)
+        return 1
+
+    print(f'documents: {len(corpus)}')
+    for name, func in [('nltk (legacy regex chain)', legacy_clean_nltk), ('nltk', lambda html: cleanHtml(html, method='nltk')), ('python-boilerpipe', lambda html: cleanHtml(html, method='python-boilerpipe'))]:
+        docs_per_sec, mb_per_sec = throughput(func, corpus)
+        print(f'{name}: {docs_per_sec:.1f} docs/s, {mb_per_sec:.2f} MB/s')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit( main() )
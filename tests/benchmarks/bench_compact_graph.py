@@ -0,0 +1,79 @@
+'''
+    Memory of a storygraph held as CompactStoryGraph vs. node and link dicts (the storygraph JSON schema)
+
+    Usage: python tests/benchmarks/bench_compact_graph.py [--stories 20000] [--min-sim 0.3]
+    Synthetic stories with NER-like entities are used, entity dicts are created per story (as NER does), so equal strings are not shared
+'''
+import argparse
+import gc
+import logging
+import random
+import sys
+import time
+import tracemalloc
+
+from sgsuite.ClusterNews import ClusterNews
+from sgsuite.CompactStoryGraph import CompactStoryGraph
+
+def gen_nodes(count, seed=1):
+
+    rand = random.Random(seed)
+    names = [ f'Name{i} Surname{i % 97}' for i in range(2000) ]
+    places = [ f'City{i}' for i in range(300) ]
+    classes = ['PERSON', 'ORG', 'GPE', 'NORP', 'TOP_10_TERM']
+
+    nodes = []
+    for i in range(count):
+
+        entities = []
+        for _ in range( rand.randint(10, 40) ):
+            ent_class = rand.choice(classes)
+            ent = rand.choice(places if ent_class == 'GPE' else names)
+            #copies, as NER output does not share strings across documents
+            entities.append({ 'entity': ''.join(list(ent)), 'class': ''.join(list(ent_class)) })
+
+        nodes.append({ 'link': f'https://example{i % 40}.com/story/{i}', 'title': f'Title of story {i}', 'entities': entities })
+
+    return nodes
+
+def get_traced_size(func):
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    obj = func()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return obj, size, peak, elapsed
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark memory of CompactStoryGraph vs. storygraph dicts')
+    parser.add_argument('--stories', default=20000, type=int, help='Count of synthetic stories')
+    parser.add_argument('--min-sim', default=0.3, type=float, help='The minimum similarity threshold for linking a pair of nodes.')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    sgc = ClusterNews(min_sim=args.min_sim)
+
+    nodes, nodes_size, _, _ = get_traced_size( lambda: gen_nodes(args.stories) )
+    #nodes are regenerated, so vocabulary strings are counted; the graph keeps the node dicts, with their entity lists released (as gen_storygraph() does)
+    graph, graph_size, _, build_time = get_traced_size( lambda: CompactStoryGraph.from_nodes(gen_nodes(args.stories), release_entities=True) )
+
+    sgc.cluster_compact_graph(graph)
+    links, links_size, _, _ = get_traced_size( lambda: list(graph.iter_json_links()) )
+    arrays_size = sum([ arr.itemsize * len(arr) for arr in [graph.sources, graph.targets, graph.sims] ])
+
+    print(f'stories: {args.stories}, links: {len(links)}, generate and compact: {build_time:.2f} s')
+    print(f'nodes: dicts: {nodes_size/1e6:.1f} MB, compact: {graph_size/1e6:.1f} MB ({nodes_size/max(1, graph_size):.1f}x)')
+    print(f'links: dicts: {links_size/1e6:.1f} MB, compact: {arrays_size/1e6:.1f} MB ({links_size/max(1, arrays_size):.1f}x)')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,89 @@
+'''
+    Per-document title, favicon & text extraction time: 
+        three-parse path (extractPageTitleFromHTML, extractFavIconFromHTML, cleanHtml) vs extractFromHTML()
+    
+    Usage: python tests/benchmarks/bench_extraction.py [directory of saved .html pages]
+    Without a directory, a synthetic corpus of news-like pages is used
+'''
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+from sgsuite.util import cleanHtml
+from sgsuite.util import extractFavIconFromHTML
+from sgsuite.util import extractFromHTML
+from sgsuite.util import extractPageTitleFromHTML
+
+def get_synthetic_corpus(count=50):
+
+    corpus = []
+    for i in range(count):
+        
+        head = f'<head><meta charset="utf-8"><title>Story {i} &amp; more</title>' + '<meta name="x" content="y">' * 40 + '<link rel="shortcut icon" href="/favicon.ico"></head>'
+        body = '<nav>' + '<a href="/section">Section</a>' * 100 + '</nav>'
+        body += '<article>' + ''.join([ f'<p>Paragraph {j} of story {i}, in which officials said the Senate would debate the bill on Monday.</p>' for j in range(60) ]) + '</article>'
+        body += '<footer>' + '<a href="/about">About</a>' * 50 + '</footer>'
+        corpus.append( ('https://www.example.com/news/' + str(i), f'<html>{head}<body>{body}</body></html>') )
+
+    return corpus
+
+def get_saved_corpus(html_dir):
+
+    corpus = []
+    for path in sorted( glob.glob(os.path.join(html_dir, '*.html')) ):
+        with open(path, 'r', errors='replace') as infile:
+            corpus.append( ('https://www.example.com/' + os.path.basename(path), infile.read()) )
+
+    return corpus
+
+def three_parse(html, uri):
+    return {
+        'text': cleanHtml(html),
+        'title': extractPageTitleFromHTML(html),
+        'favicon': extractFavIconFromHTML(html, sourceURL=uri)
+    }
+
+def time_per_doc(func, corpus, repeat=3):
+    
+    best = None
+    for _ in range(repeat):
+        
+        start = time.perf_counter()
+        for uri, html in corpus:
+            func(html, uri)
+        
+        elapsed = (time.perf_counter() - start) / len(corpus)
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark single-parse HTML extraction')
+    parser.add_argument('html_dir', nargs='?', default='', help='Directory of saved .html pages')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    corpus = get_saved_corpus(args.html_dir) if args.html_dir != '' else get_synthetic_corpus()
+    if( len(corpus) == 0 ):
+        print('no .html files in', args.html_dir)
+        return 1
+
+    mismatches = sum( [ three_parse(html, uri) != extractFromHTML(html, uri) for uri, html in corpus ] )
+    
+    old = time_per_doc(three_parse, corpus)
+    new = time_per_doc(lambda html, uri: extractFromHTML(html, uri), corpus)
+    old_head = time_per_doc(lambda html, uri: (extractPageTitleFromHTML(html), extractFavIconFromHTML(html, uri)), corpus)
+    new_head = time_per_doc(lambda html, uri: extractFromHTML(html, uri, cleanMethod=''), corpus)
+
+    print(f'documents: {len(corpus)}, output mismatches: {mismatches}')
+    print(f'title+favicon+text, three-parse: {old*1000:.2f} ms/doc, extractFromHTML: {new*1000:.2f} ms/doc ({old/new:.2f}x)')
+    print(f'title+favicon only, two BeautifulSoup parses: {old_head*1000:.2f} ms/doc, streaming tokenizer: {new_head*1000:.3f} ms/doc ({old_head/new_head:.1f}x)')
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit( main() )
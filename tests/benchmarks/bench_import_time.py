@@ -0,0 +1,46 @@
+'''
+    Import time (python -X importtime) and heavy dependencies loaded by sgsuite entry points, and `sgs --version` wall time
+    
+    Usage: python tests/benchmarks/bench_import_time.py
+'''
+import os
+import subprocess
+import sys
+import time
+
+repo_dir = os.path.join( os.path.dirname(os.path.abspath(__file__)), '..', '..' )
+env = dict(os.environ, PYTHONPATH=os.pathsep.join([repo_dir, os.environ.get('PYTHONPATH', '')]))
+heavy_modules = ['spacy', 'dateparser', 'boilerpy3', 'bs4', 'tldextract', 'requests', 'networkx', 'NwalaTextUtils', 'numpy', 'scipy']
+
+def get_import_time(module):
+
+    '''
+        returns (cumulative import time of module in seconds, heavy modules it loaded)
+    '''
+    code = f'import {module}, sys; print(",".join([m for m in {heavy_modules!r} if m in sys.modules]))'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True, env=env)
+    
+    cumulative = 0
+    for line in proc.stderr.splitlines():
+        #import time: self [us] | cumulative | imported package
+        fields = [ f.strip() for f in line.split('|') ]
+        if( len(fields) == 3 and fields[2] == module ):
+            cumulative = int(fields[1])
+
+    loaded = proc.stdout.strip()
+    return cumulative/1000000, loaded.split(',') if loaded != '' else []
+
+def main():
+
+    for module in ['sgsuite.ClusterNews', 'sgsuite.util', 'sgsuite.cache', 'sgsuite.AsyncFetcher', 'sgsuite.rss_parser']:
+        seconds, loaded = get_import_time(module)
+        print(f'{module}: {seconds:.3f}s, heavy modules loaded: {loaded}')
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(repo_dir, 'bin', 'sgs'), '--version'], capture_output=True, check=True, env=env)
+    print(f'sgs --version: {time.perf_counter() - start:.3f}s (wall, including interpreter startup)')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,115 @@
+'''
+    Time of get_top_k_terms() & getTokenLabelsForText() vs. their previous (per-token stopword dict rebuild) implementations
+    
+    Usage: python tests/benchmarks/bench_top_k_terms.py [directory of saved .html pages or .txt article text]
+    Without a directory, synthetic article text is used
+'''
+import argparse
+import glob
+import logging
+import os
+import random
+import re
+import string
+import sys
+import time
+
+from sgsuite.util import cleanHtml
+from sgsuite.util import getStopwordsDict
+from sgsuite.util import getTokenLabelsForText
+from sgsuite.util import getTopKTermsListFromText
+
+def legacy_is_exclusive_punct(text):
+
+    text = text.strip()
+    for char in text:
+        if char not in string.punctuation:
+            return False
+
+    return True
+
+def legacy_get_top_k_terms_list_frm_text(tokens, k):
+
+    top_k_term_dict = {}
+    for term in tokens:
+        term = term.strip().lower()
+        
+        if( len(term) == 0 or term in getStopwordsDict() or legacy_is_exclusive_punct(term) == True ):
+            continue
+
+        top_k_term_dict.setdefault(term, 0)
+        top_k_term_dict[term] += 1
+
+    sorted_keys = sorted( top_k_term_dict, key=lambda freq:top_k_term_dict[freq], reverse=True )
+    return [ (key, top_k_term_dict[key]) for key in sorted_keys[:k] ]
+
+def legacy_get_token_labels_for_text(text, label):
+
+    labeled_tokens = []
+    for tok in re.findall(r'(?u)\b[a-zA-Z\'\’-]+[a-zA-Z]+\b|\d+[.,]?\d*', text):
+        tok = tok.strip()
+        if( tok == '' or legacy_is_exclusive_punct(tok) is True or tok.strip().lower() in getStopwordsDict() ):
+            continue
+
+        labeled_tokens.append({ 'entity': tok, 'class': label })
+
+    return labeled_tokens
+
+def get_articles(text_dir):
+
+    articles = []
+    for path in sorted( glob.glob(os.path.join(text_dir, '*.html')) + glob.glob(os.path.join(text_dir, '*.txt')) ):
+        with open(path, 'r', errors='replace') as infile:
+            text = infile.read()
+            articles.append( cleanHtml(text) if path.endswith('.html') else text )
+
+    return articles
+
+def get_synthetic_articles(count=50, seed=1):
+
+    rand = random.Random(seed)
+    words = ['The', 'Senate', 'voted', 'on', 'Monday', ',', 'officials', 'said', 'in', 'Norfolk', 'Virginia', '.', 'a', 'new', 'bill', 'to', 'fund', 'roads', 'and', 'bridges', 'across', 'the', 'state', '"', 'Biden', 'would', 'sign', 'it']
+    return [ ' '.join([ rand.choice(words) for _ in range(800) ]) for _ in range(count) ]
+
+def time_per_article(func, articles, repeat=3):
+
+    best = None
+    for _ in range(repeat):
+        
+        start = time.perf_counter()
+        for text in articles:
+            func(text)
+        
+        elapsed = (time.perf_counter() - start) / len(articles)
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark top-k terms and title token labels')
+    parser.add_argument('text_dir', nargs='?', default='', help='Directory of saved .html pages or .txt article text')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    articles = get_articles(args.text_dir) if args.text_dir != '' else get_synthetic_articles()
+    articles = [ a for a in articles if a.strip() != '' ]
+    if( len(articles) == 0 ):
+        print('no articles in', args.text_dir)
+        return 1
+
+    #NER passes spaCy tokens, approximated here by splitting on whitespace
+    token_lists = [ a.split() for a in articles ]
+    mismatches = sum([ legacy_get_top_k_terms_list_frm_text(t, 10) != getTopKTermsListFromText(t, 10) for t in token_lists ])
+    mismatches += sum([ legacy_get_token_labels_for_text(a, 'TITLE') != getTokenLabelsForText(a, 'TITLE') for a in articles ])
+    print(f'articles: {len(articles)}, output mismatches: {mismatches}')
+
+    for name, legacy, current, inputs in [('top-k terms', lambda t: legacy_get_top_k_terms_list_frm_text(t, 10), lambda t: getTopKTermsListFromText(t, 10), token_lists), ('token labels', lambda a: legacy_get_token_labels_for_text(a, 'TITLE'), lambda a: getTokenLabelsForText(a, 'TITLE'), articles)]:
+        old = time_per_article(legacy, inputs)
+        new = time_per_article(current, inputs)
+        print(f'{name}: previous: {old*1000:.3f} ms/article, current: {new*1000:.3f} ms/article ({old/new:.1f}x)')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,62 @@
+import threading
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+class QuietHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+def start_local_server(handler_class):
+
+    '''
+        serves handler_class on 127.0.0.1 (any free port) from a daemon thread
+        returns (server, base uri), call stop_local_server(server) when done
+    '''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, 'http://127.0.0.1:' + str(server.server_address[1])
+
+def stop_local_server(server):
+
+    server.shutdown()
+    server.server_close()
+
+def get_route_handler(routes):
+
+    '''
+        routes: {path: (status_code, {header: value}, body bytes)}, a None Content-Length value omits the header
+    '''
+    class RouteHandler(QuietHandler):
+
+        def do_HEAD(self):
+            self.send_route(send_body=False)
+
+        def do_GET(self):
+            self.send_route(send_body=True)
+
+        def send_route(self, send_body):
+
+            status_code, headers, body = routes.get( self.path, (404, {}, b'not found') )
+            self.send_response(status_code)
+            for k, v in headers.items():
+                if( v is not None ):
+                    self.send_header(k, v)
+
+            if( 'Content-Length' not in headers ):
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+
+            if( send_body ):
+                self.wfile.write(body)
+
+    return RouteHandler
+
+def start_route_server(routes):
+
+    '''
+        start_local_server() serving routes, see get_route_handler()
+    '''
+    return start_local_server( get_route_handler(routes) )
@@ -0,0 +1,173 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from sgsuite.cache import DerivedCache
+from sgsuite.cache import HTMLCache
+from sgsuite.cache import URLCache
+
+def put_urls(cache_dir, start):
+    url_cache = URLCache(cache_dir)
+    for i in range(start, start + 50):
+        url_cache.put(f'https://bit.ly/{i}', f'https://example.com/{i}')
+
+class TestCache(unittest.TestCase):
+
+    def test_html_cache(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+
+            html_cache = HTMLCache(cache_dir)
+            self.assertIsNone( html_cache.get('https://www.example.com/news/1') )
+
+            html_cache.put('https://www.example.com/news/1', '<html>café</html>')
+            #same HTMLCache.get_key() key
+            self.assertEqual( html_cache.get('http://WWW.example.com:80/news/1/?utm_source=rss#top'), '<html>café</html>' )
+            self.assertEqual( {k: v for k, v in html_cache.stats().items() if k in ['hits', 'misses', 'entries']}, {'hits': 1, 'misses': 1, 'entries': 1} )
+
+            #query strings select different pages
+            html_cache.put('https://www.example.com/article?id=1', '<html>1</html>')
+            html_cache.put('https://www.example.com/article?id=2&utm_medium=rss', '<html>2</html>')
+            self.assertEqual( html_cache.get('https://www.example.com/article?id=1'), '<html>1</html>' )
+            self.assertEqual( html_cache.get('https://www.example.com/article?id=2'), '<html>2</html>' )
+            self.assertIsNone( html_cache.get('https://www.example.com/article') )
+
+            #another instance (e.g., next run) sees the same entries
+            self.assertEqual( HTMLCache(cache_dir).get('https://www.example.com/news/1'), '<html>café</html>' )
+
+    def test_html_cache_ttl_and_lru_eviction(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+
+            html_cache = HTMLCache(cache_dir, ttl=0.2)
+            html_cache.put('https://example.com/old', '<html>old</html>')
+            time.sleep(0.3)
+            self.assertIsNone( html_cache.get('https://example.com/old') )
+
+            page = os.urandom(2000).hex()
+            html_cache = HTMLCache(cache_dir, max_size=5000)
+            for i in range(3):
+                html_cache.put(f'https://example.com/{i}', page)
+                #makes /0 the most recently used
+                html_cache.get('https://example.com/0')
+
+            self.assertIsNotNone( html_cache.get('https://example.com/0') )
+            self.assertIsNone( html_cache.get('https://example.com/1') )
+            self.assertIsNotNone( html_cache.get('https://example.com/2') )
+            self.assertLessEqual( html_cache.stats()['size'], 5000 )
+            self.assertEqual( html_cache.total_size, html_cache.stats()['size'] )
+
+    def test_html_cache_threads(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+
+            html_cache = HTMLCache(cache_dir, evict_interval=7)
+            def get_put(start):
+                for i in range(start, start + 50):
+                    html_cache.get(f'https://example.com/{i % 60}')
+                    html_cache.put(f'https://example.com/{i % 60}', f'<html>{i}</html>')
+
+            threads = [ threading.Thread(target=get_put, args=(i * 10,)) for i in range(4) ]
+            [ t.start() for t in threads ]
+            [ t.join() for t in threads ]
+
+            stats = html_cache.stats()
+            self.assertEqual( stats['hits'] + stats['misses'], 200 )
+            self.assertEqual( stats['entries'], 60 )
+            self.assertEqual( html_cache.total_size, stats['size'] )
+
+    def test_derived_cache(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+
+            derived_cache = DerivedCache(cache_dir, max_entries=2)
+            key = DerivedCache.get_key('ner', ['en_core_web_sm', 10, True, 'title', 'text'])
+            
+            self.assertNotEqual( key, DerivedCache.get_key('ner', ['en_core_web_sm', 5, True, 'title', 'text']) )
+            self.assertIsNone( derived_cache.get(key) )
+
+            derived_cache.put(key, {'ents': [['Norfolk', 'GPE']], 'top_k_terms': []})
+            self.assertEqual( DerivedCache(cache_dir).get(key), {'ents': [['Norfolk', 'GPE']], 'top_k_terms': []} )
+
+            for i in range(3):
+                derived_cache.put(f'extract:{i}', {'text': str(i)})
+            derived_cache.evict()
+            
+            self.assertEqual( derived_cache.stats()['entries'], 2 )
+            self.assertIsNone( derived_cache.get(key) )
+
+            #clean worker threads share the cache: no lost counts, one eviction per 1000 puts
+            derived_cache = DerivedCache(cache_dir)
+            def get_put(start):
+                for i in range(start, start + 500):
+                    derived_cache.get(f'extract:{i % 100}')
+                    derived_cache.put(f'extract:{i % 100}', {'text': str(i)})
+
+            with mock.patch.object(derived_cache, 'evict') as evict:
+                threads = [ threading.Thread(target=get_put, args=(i * 500,)) for i in range(4) ]
+                [ t.start() for t in threads ]
+                [ t.join() for t in threads ]
+
+            stats = derived_cache.stats()
+            self.assertEqual( (stats['hits'] + stats['misses'], derived_cache.puts, evict.call_count), (2000, 2000, 2) )
+
+    def test_url_cache(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+
+            url_cache = URLCache(cache_dir, negative_ttl=0.2, max_entries=3)
+            self.assertIsNone( url_cache.get('https://bit.ly/a') )
+
+            url_cache.put('https://bit.ly/a', 'https://example.com/a')
+            url_cache.put('https://bit.ly/down', 'https://bit.ly/down', ok=False)
+            self.assertEqual( URLCache(cache_dir).get('https://bit.ly/a'), 'https://example.com/a' )
+            self.assertEqual( url_cache.get('https://bit.ly/down'), 'https://bit.ly/down' )
+            
+            #failed expansions expire after negative_ttl
+            time.sleep(0.3)
+            self.assertIsNone( url_cache.get('https://bit.ly/down') )
+            self.assertEqual( url_cache.get('https://bit.ly/a'), 'https://example.com/a' )
+            self.assertEqual( url_cache.stats(), {'hits': 1, 'negative-hits': 1, 'misses': 2, 'hit-rate': 0.5, 'entries': 1} )
+
+            for i in range(4):
+                url_cache.put(f'https://bit.ly/{i}', f'https://example.com/{i}')
+            url_cache.evict()
+            self.assertEqual( url_cache.stats()['entries'], 3 )
+            self.assertIsNone( url_cache.get('https://bit.ly/a') )
+
+            #expansion threads share the cache: no lost counts, one eviction per 1000 puts
+            url_cache = URLCache(cache_dir)
+            def get_put(start):
+                for i in range(start, start + 500):
+                    url_cache.get(f'https://bit.ly/{i % 100}')
+                    url_cache.put(f'https://bit.ly/{i % 100}', f'https://example.com/{i}', ok=i % 2 == 0)
+
+            with mock.patch.object(url_cache, 'evict') as evict:
+                threads = [ threading.Thread(target=get_put, args=(i * 500,)) for i in range(4) ]
+                [ t.start() for t in threads ]
+                [ t.join() for t in threads ]
+
+            stats = url_cache.stats()
+            self.assertEqual( (stats['hits'] + stats['negative-hits'] + stats['misses'], url_cache.puts, evict.call_count), (2000, 2000, 2) )
+
+    def test_url_cache_is_shared_by_processes(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            
+            processes = [ multiprocessing.Process(target=put_urls, args=(cache_dir, start)) for start in [0, 50, 100] ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+            url_cache = URLCache(cache_dir)
+            self.assertEqual( url_cache.stats()['entries'], 150 )
+            self.assertEqual( url_cache.get('https://bit.ly/149'), 'https://example.com/149' )
+
+if __name__ == '__main__':
+    unittest.main()
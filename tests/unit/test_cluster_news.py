@@ -0,0 +1,195 @@
+import copy
+import importlib.util
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from sgsuite.ClusterNews import ClusterNews
+from sgsuite.CompactStoryGraph import CompactStoryGraph
+
+def gen_nodes(count, seed=1):
+
+    rand = random.Random(seed)
+    vocab = ['trump', 'biden', 'mueller report', 'barr', 'norfolk', 'virginia', 'senate', 'house', 'fbi', 'russia', 'ukraine', 'white house']
+    classes = ['PERSON', 'ORG', 'GPE', 'TOP_10_TERM']
+
+    nodes = []
+    for i in range(count):
+
+        if( i % 7 == 3 ):
+            nodes.append({'link': f'https://example{i % 3}.com/{i}'})
+            continue
+
+        entities = [{'entity': rand.choice(vocab).title(), 'class': rand.choice(classes)} for _ in range(rand.randint(0, 6))]
+        if( i % 5 == 0 ):
+            entities.append({'entity': '2019-03-24T00:00:00', 'class': 'DATE'})
+
+        nodes.append({'link': f'https://example{i % 3}.com/{i}', 'title': f'title {i}', 'entities': entities})
+
+    return nodes
+
+class TestClusterNews(unittest.TestCase):
+
+    def test_inverted_index_matches_brute_force(self):
+
+        nodes = gen_nodes(60)
+        for sim_metric in ['weighted-jaccard-overlap', 'jaccard', 'overlap']:
+            for min_sim in [0, 0.2, 0.5, 1]:
+
+                brute = ClusterNews(min_sim=min_sim, sim_metric=sim_metric, candidate_generation='brute-force').cluster_news(nodes)
+                index = ClusterNews(min_sim=min_sim, sim_metric=sim_metric, candidate_generation='inverted-index').cluster_news(nodes)
+                self.assertEqual( brute['links'], index['links'], f'{sim_metric}, min_sim: {min_sim}' )
+
+    @unittest.skipUnless(importlib.util.find_spec('scipy'), 'sim_backend="sparse" requires numpy and scipy')
+    def test_sparse_backend_matches_python(self):
+
+        nodes = gen_nodes(75)
+        for sim_metric in ['weighted-jaccard-overlap', 'jaccard', 'overlap']:
+            for block_size in [1, 16, 1000]:
+
+                python = ClusterNews(min_sim=0.2, sim_metric=sim_metric).cluster_news(nodes)
+                sparse = ClusterNews(min_sim=0.2, sim_metric=sim_metric, sim_backend='sparse', sparse_block_size=block_size).cluster_news(nodes)
+                
+                self.assertEqual( len(python['links']), len(sparse['links']) )
+                for python_lnk, sparse_lnk in zip(python['links'], sparse['links']):
+                    self.assertEqual( (python_lnk['source'], python_lnk['target'], python_lnk['rank']), (sparse_lnk['source'], sparse_lnk['target'], sparse_lnk['rank']) )
+                    self.assertAlmostEqual( python_lnk['sim'], sparse_lnk['sim'] )
+
+    def test_ent_set_cache(self):
+
+        nodes = gen_nodes(30)
+        sgc = ClusterNews(min_sim=0.3)
+        ent_set_cache = sgc.get_ent_set_cache(nodes)
+        id_to_tok = {tok_id: tok for tok, tok_id in ent_set_cache['vocab'].items()}
+
+        for i in range(len(nodes)):
+
+            if( 'entities' not in nodes[i] ):
+                self.assertIsNone( ent_set_cache['sets'][i] )
+                continue
+
+            ent_set = ClusterNews.get_set_frm_cluster(nodes[i]['entities'], 'entity')
+            self.assertEqual( {id_to_tok[tok_id] for tok_id in ent_set_cache['sets'][i]}, ent_set )
+            self.assertEqual( ent_set_cache['sizes'][i], len(ent_set) )
+
+            for j in range(i+1, len(nodes)):
+                self.assertEqual( sgc.calc_cached_ent_sim(ent_set_cache, i, j), sgc.calc_ent_sim(nodes, i, j) )
+
+    def test_compact_story_graph(self):
+
+        nodes = gen_nodes(90)
+        nodes[1]['entities'].append({'entity': 'Barr', 'class': 'PERSON', 'offset': 3})
+        nodes[2]['node-details'] = {'color': 'blue'}
+
+        #the caller's dicts are kept, not copied
+        graph = CompactStoryGraph.from_nodes(nodes)
+        self.assertTrue( all(node is json_node for node, json_node in zip(nodes, graph.iter_json_nodes())) )
+        self.assertIsNone( graph.nodes[0].ent_ids )
+
+        #released entity lists (of shallow copies, the caller's dicts are not changed) are restored on conversion
+        released_nodes = copy.deepcopy(nodes)
+        graph = CompactStoryGraph.from_nodes(released_nodes, release_entities=True)
+        self.assertEqual( json.dumps(released_nodes), json.dumps(nodes) )
+        self.assertIsNone( graph.nodes[0].node['entities'] )
+        self.assertIsNot( graph.nodes[1].node, released_nodes[1] )
+        self.assertIsNone( graph.nodes[1].ent_ids )
+        self.assertEqual( len(graph.ent_strs), len({e['entity'] for n in nodes if 'entities' in n for e in n['entities']}) )
+        self.assertEqual( json.dumps(list(graph.iter_json_nodes())), json.dumps(nodes) )
+        self.assertEqual( list(graph.nodes[0].node.keys()), list(nodes[0].keys()) )
+
+        sgc = ClusterNews(min_sim=0.3)
+        expected = ClusterNews.annotate( sgc.cluster_news(copy.deepcopy(nodes)), min_avg_deg=3, min_uniq_src_count=2 )
+        
+        graph = ClusterNews.annotate( sgc.cluster_compact_graph(graph), min_avg_deg=3, min_uniq_src_count=2 )
+        self.assertIsInstance( graph, CompactStoryGraph )
+        
+        result = sgc.get_graph_json(graph)
+        for key in ['links', 'nodes', 'connected-comps', 'custom']:
+            self.assertEqual( json.dumps(result[key]), json.dumps(expected[key]), key )
+
+        #cluster_news() returns (and annotate() updates) the caller's dicts
+        caller_nodes = copy.deepcopy(nodes)
+        result = ClusterNews.annotate( sgc.cluster_news(caller_nodes), min_avg_deg=3, min_uniq_src_count=2 )
+        self.assertTrue( all(node is result_node for node, result_node in zip(caller_nodes, result['nodes'])) )
+        self.assertEqual( json.dumps(caller_nodes), json.dumps(expected['nodes']) )
+
+    def test_write_storygraph(self):
+
+        nodes = gen_nodes(80)
+        for node in nodes:
+            node['text'] = 'article text of ' + node['link']
+
+        node_details = [ {'link': node['link'], 'feed': 'rss'} if i % 2 == 0 else {} for i, node in enumerate(nodes) ]
+        sgc = ClusterNews(min_sim=0.3, annotate_min_uniq_src_count=2)
+        
+        expected = ClusterNews.annotate( sgc.cluster_news(copy.deepcopy(nodes)), min_avg_deg=3, min_uniq_src_count=2 )
+        for i in range( len(nodes) ):
+            expected['nodes'][i].update( node_details[i] )
+
+        #nodes arrive out of order, as from stream_entities_frm_links()
+        node_stream = [ (i, copy.deepcopy(nodes[i])) for i in range(len(nodes)) ]
+        node_stream = node_stream[1::2] + node_stream[::2]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for indentFlag in [True, False]:
+                
+                outfilename = os.path.join(tmp_dir, 'graph.json')
+                sgc.write_storygraph(iter(node_stream), outfilename, node_details=node_details, indentFlag=indentFlag, json_backend='json')
+                
+                with open(outfilename, 'r', encoding='utf-8') as infile:
+                    result = infile.read()
+
+                expected['timestamp'] = json.loads(result)['timestamp']
+                self.assertEqual( result, json.dumps(expected, ensure_ascii=False, indent=4 if indentFlag else None) )
+
+            #nodes 3 and 79 never arrive: they are left out, and node_details (not aligned) are not merged
+            kept = [ i for i in range(len(nodes)) if i not in [3, 79] ]
+            expected = ClusterNews.annotate( sgc.cluster_news(copy.deepcopy([nodes[i] for i in kept])), min_avg_deg=3, min_uniq_src_count=2 )
+            
+            outfilename = os.path.join(tmp_dir, 'graph.json')
+            sgc.write_storygraph(iter([ (i, copy.deepcopy(nodes[i])) for i in kept ]), outfilename, node_details=node_details[:-1], node_count=len(nodes), json_backend='json')
+            with open(outfilename, 'r', encoding='utf-8') as infile:
+                result = json.load(infile)
+
+            expected['timestamp'] = result['timestamp']
+            self.assertEqual( result, expected )
+
+    def test_update_storygraph(self):
+
+        nodes = gen_nodes(120, seed=3)
+        nodes[4]['node-details'] = {'annotation': 'polarity', 'color': 'blue'}
+        prev_nodes = nodes[:90]
+        removed = [0, 4, 7, 30, 31, 32, 89]
+        added_nodes = nodes[90:]
+        
+        for kwargs in [{'sim_metric': 'weighted-jaccard-overlap', 'min_sim': 0.3}, {'sim_metric': 'jaccard', 'min_sim': 0.2}, {'sim_metric': 'overlap', 'min_sim': 0.5, 'candidate_generation': 'brute-force'}, {'sim_metric': 'weighted-jaccard-overlap', 'min_sim': 0}]:
+
+            sgc = ClusterNews(annotate_min_uniq_src_count=2, **kwargs)
+            annotate = lambda sg: ClusterNews.annotate(sg, min_avg_deg=3, min_uniq_src_count=2)
+            
+            prev_graph = annotate( sgc.cluster_news(copy.deepcopy(prev_nodes)) )
+            prev_json = json.dumps(prev_graph)
+            expected = annotate( sgc.cluster_news(copy.deepcopy( [prev_nodes[i] for i in range(len(prev_nodes)) if i not in removed] + added_nodes )) )
+            
+            result = sgc.update_storygraph( prev_graph, added_nodes=copy.deepcopy(added_nodes), removed=removed )
+            self.assertEqual( json.dumps(prev_graph), prev_json )
+            
+            #as from gen_storygraph(): the caller's added nodes are neither released nor annotated
+            compact_graph = annotate( sgc.cluster_compact_graph(sgc.get_compact_graph(copy.deepcopy(prev_nodes), release_entities=True)) )
+            caller_added_nodes = copy.deepcopy(added_nodes)
+            compact_graph = sgc.update_storygraph( compact_graph, added_nodes=caller_added_nodes, removed=removed )
+            self.assertIsInstance( compact_graph, CompactStoryGraph )
+            self.assertEqual( json.dumps(caller_added_nodes), json.dumps(added_nodes) )
+
+            if( kwargs['min_sim'] == 0 ):
+                #int sims (no shared entities) are output as int, as before the compact graph
+                self.assertIn( '"sim": 0,', json.dumps(expected['links']) )
+
+            for key in ['links', 'nodes', 'connected-comps']:
+                self.assertEqual( json.dumps(result[key]), json.dumps(expected[key]), f'{kwargs}, {key}' )
+                self.assertEqual( json.dumps(sgc.get_graph_json(compact_graph)[key]), json.dumps(expected[key]), f'{kwargs}, {key}' )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+import unittest
+
+heavy_modules = ['spacy', 'dateparser', 'boilerpy3', 'bs4', 'tldextract', 'requests', 'networkx', 'NwalaTextUtils', 'numpy', 'scipy']
+
+def get_loaded_heavy_modules(code):
+    
+    code += '\nimport json, sys\nprint(json.dumps([m for m in ' + repr(heavy_modules) + ' if m in sys.modules]))'
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return json.loads( output.decode('utf-8').strip().splitlines()[-1] )
+
+class TestImport(unittest.TestCase):
+
+    def test_clustering_imports_are_lightweight(self):
+
+        #modules the interpreter loads on its own (e.g., from sitecustomize)
+        baseline = get_loaded_heavy_modules('')
+        self.assertEqual( get_loaded_heavy_modules('import sgsuite.util, sgsuite.cache, sgsuite.ClusterNews'), baseline )
+        
+        clustering = '''
+from sgsuite.ClusterNews import ClusterNews
+nodes = [{'link': 'https://example.com/' + str(i), 'title': str(i), 'entities': [{'entity': 'Norfolk', 'class': 'GPE'}, {'entity': str(i % 3), 'class': 'CARDINAL'}]} for i in range(10)]
+assert len( ClusterNews(min_sim=0.3).cluster_news(nodes)['links'] ) > 0
+'''
+        self.assertEqual( get_loaded_heavy_modules(clustering), baseline )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from sgsuite.JsonStreamWriter import JsonSpool
+from sgsuite.JsonStreamWriter import JsonStreamWriter
+
+def write_doc(outfilename, doc, **kwargs):
+
+    with JsonStreamWriter(outfilename, **kwargs) as writer:
+        
+        writer.begin_object()
+        for key, val in doc.items():
+            
+            if( isinstance(val, list) ):
+                writer.begin_list(key)
+                for item in val:
+                    writer.write_item(item)
+                writer.end_list()
+            else:
+                writer.write_item(val, key=key)
+        
+        writer.end_object()
+
+class TestJsonStreamWriter(unittest.TestCase):
+
+    doc = {
+        'links': [{'source': 0, 'target': 1, 'sim': 0.5, 'rank': 1}],
+        'nodes': [{'title': 'Café “news”', 'entities': [{'entity': 'Norfolk', 'class': 'GPE'}], 'node-details': {}}, {'title': 'line\nbreak'}],
+        'connected-comps': [],
+        'empty': {},
+        'timestamp': '2019-03-24T00:00:00Z',
+        'custom': {'description': 'Graph description', 'name': 'Untitled graph'}
+    }
+
+    def test_stream_matches_json_dump(self):
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            
+            outfilename = os.path.join(tmp_dir, 'graph.json')
+            for indentFlag in [True, False]:
+                
+                write_doc(outfilename, self.doc, indentFlag=indentFlag, json_backend='json')
+                with open(outfilename, 'r', encoding='utf-8') as infile:
+                    self.assertEqual( infile.read(), json.dumps(self.doc, ensure_ascii=False, indent=4 if indentFlag else None) )
+
+            write_doc(outfilename + '.gz', self.doc, json_backend='auto')
+            with gzip.open(outfilename + '.gz', 'rt', encoding='utf-8') as infile:
+                self.assertEqual( json.load(infile), self.doc )
+
+    def test_unencodable_item_leaves_valid_json(self):
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+
+            outfilename = os.path.join(tmp_dir, 'graph.json')
+            for indentFlag in [True, False]:
+                with JsonStreamWriter(outfilename, indentFlag=indentFlag, json_backend='json') as writer:
+                    
+                    writer.begin_object()
+                    writer.begin_list('nodes')
+                    writer.write_item({'title': 'a'})
+                    #lone surrogate
+                    self.assertRaises( UnicodeEncodeError, writer.write_item, {'title': '\ud800'} )
+                    writer.write_item({'title': 'b'})
+                    writer.end_list()
+                    self.assertRaises( UnicodeEncodeError, writer.write_item, 'x', key='\ud800' )
+                    writer.end_object()
+
+                with open(outfilename, 'r', encoding='utf-8') as infile:
+                    self.assertEqual( json.load(infile), {'nodes': [{'title': 'a'}, {'title': 'b'}]} )
+
+    def test_jsonl_and_spool(self):
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            
+            outfilename = os.path.join(tmp_dir, 'links.jsonl')
+            with JsonStreamWriter(outfilename, compress=True) as writer:
+                for node in self.doc['nodes']:
+                    writer.write_line(node)
+
+            with gzip.open(outfilename, 'rt', encoding='utf-8') as infile:
+                self.assertEqual( [json.loads(line) for line in infile], self.doc['nodes'] )
+
+        for json_backend in ['auto', 'json']:
+            
+            spool = JsonSpool(json_backend=json_backend)
+            records = {2: self.doc['nodes'][1], 0: self.doc, 1: {'text': 'surrogate \ud83d'}}
+            for key, val in records.items():
+                spool.put(key, val)
+
+            for key in [0, 1, 2]:
+                self.assertEqual( spool.get(key), records[key] )
+            spool.close()
+
+if __name__ == '__main__':
+    unittest.main()
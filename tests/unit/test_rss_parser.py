@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from sgsuite.cache import FeedStateStore
+from sgsuite.rss_parser import TokenBucket
+from sgsuite.rss_parser import get_lnks_frm_feeds
+from sgsuite.rss_parser import get_news_articles_frm_rss
+
+from local_server import QuietHandler
+from local_server import start_local_server
+from local_server import stop_local_server
+
+def get_feed(links):
+
+    items = ''.join([ f'<item><title>title {i}</title><link>{link}</link><pubDate>Sun, 24 Mar 2019 0{i}:00:00 GMT</pubDate></item>' for i, link in enumerate(links) ])
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>feed</title><link>http://localhost:9/</link>{items}</channel></rss>'
+
+def write_feed(path, links):
+    with open(path, 'w') as outfile:
+        outfile.write( get_feed(links) )
+
+class FeedHandler(QuietHandler):
+
+    #links of the feed served, its version is the ETag
+    links = []
+    requests = []
+
+    def do_GET(self):
+        
+        etag = '"v' + str(len(FeedHandler.links)) + '"'
+        FeedHandler.requests.append( (self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')) )
+        
+        if( self.headers.get('If-None-Match') == etag ):
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = get_feed(FeedHandler.links).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Sun, 24 Mar 2019 12:00:00 GMT')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class TestRSSParser(unittest.TestCase):
+
+    def test_parallel_ingestion_is_deterministic(self):
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+
+            feeds = {
+                'a.xml': ['http://localhost:9/1', 'http://localhost:9/2', 'http://localhost:9/3', 'http://localhost:9/not-in-link-count'],
+                'b.xml': ['http://a.localhost:9/1', 'http://localhost:9/2/'],
+                'c.xml': ['http://localhost:9/4']
+            }
+            rss_links = []
+            for filename, links in feeds.items():
+                write_feed( os.path.join(tmp_dir, filename), links )
+                rss_links.append({ 'rss': os.path.join(tmp_dir, filename), 'custom': {'node-details': {'annotation': 'polarity', 'feed': filename}} })
+
+            expected = {
+                'localhost-0': 'http://localhost:9/1',
+                'localhost-1': 'http://localhost:9/2',
+                'localhost-2': 'http://localhost:9/3',
+                'a.localhost': 'http://a.localhost:9/1',
+                'localhost-3': 'http://localhost:9/4'
+            }
+            
+            serial, _ = get_news_articles_frm_rss(rss_links, max_lnks_per_src=3, thread_count=1, expand_thread_count=1)
+            self.assertEqual( {key: val['link'] for key, val in serial.items()}, expected )
+            self.assertEqual( serial['localhost-3']['node-details'], {'annotation': 'polarity', 'feed': 'c.xml'} )
+            self.assertEqual( serial['localhost-1']['title'], 'title 1' )
+
+            for _ in range(3):
+                parallel, domain_rss_feeds = get_news_articles_frm_rss(rss_links, max_lnks_per_src=3, thread_count=3, expand_thread_count=4)
+                self.assertEqual( list(parallel.items()), list(serial.items()) )
+                self.assertEqual( sorted(domain_rss_feeds.keys()), ['a.localhost', 'localhost'] )
+
+    def test_conditional_get_feed_state(self):
+
+        server, host = start_local_server(FeedHandler)
+        feed_uri = host + '/rss.xml'
+
+        try:
+            with tempfile.TemporaryDirectory() as state_dir:
+                
+                FeedHandler.links = ['http://localhost:9/1', 'http://localhost:9/2', 'http://localhost:9/3']
+                links, _ = get_lnks_frm_feeds(feed_uri, link_count=2, archive_rss_flag=False, feed_state=FeedStateStore(state_dir))
+                self.assertEqual( [l['link'] for l in links], ['http://localhost:9/1', 'http://localhost:9/2'] )
+                self.assertEqual( FeedHandler.requests[-1], (None, None) )
+
+                #unchanged feed: 304, state is persisted across stores
+                links, rss_feed = get_lnks_frm_feeds(feed_uri, link_count=2, archive_rss_flag=False, feed_state=FeedStateStore(state_dir))
+                self.assertEqual( (links, rss_feed.get('status')), ([], 304) )
+                self.assertEqual( FeedHandler.requests[-1], ('"v3"', 'Sun, 24 Mar 2019 12:00:00 GMT') )
+
+                #one new entry, not delivered (expansion fails): neither it nor the new ETag are persisted
+                FeedHandler.links = ['http://localhost:9/0'] + FeedHandler.links
+                with mock.patch('sgsuite.rss_parser.expand_entry_link', return_value=None):
+                    links, _ = get_lnks_frm_feeds(feed_uri, link_count=2, archive_rss_flag=False, feed_state=FeedStateStore(state_dir))
+                self.assertEqual( links, [] )
+                self.assertEqual( FeedStateStore(state_dir).get(feed_uri)['etag'], '"v3"' )
+
+                #staged state is persisted by commit()
+                feed_state = FeedStateStore(state_dir)
+                links, _ = get_lnks_frm_feeds(feed_uri, link_count=2, archive_rss_flag=False, feed_state=feed_state, commit_feed_state=False)
+                self.assertEqual( [l['link'] for l in links], ['http://localhost:9/0'] )
+                self.assertEqual( FeedStateStore(state_dir).get(feed_uri)['etag'], '"v3"' )
+                feed_state.commit()
+
+                state = FeedStateStore(state_dir).get(feed_uri)
+                self.assertEqual( state['etag'], '"v4"' )
+                self.assertEqual( state['entry_ids'], ['http://localhost:9/0', 'http://localhost:9/1', 'http://localhost:9/2'] )
+
+                #without state, the feed is requested unconditionally
+                links, _ = get_lnks_frm_feeds(feed_uri, link_count=2, archive_rss_flag=False)
+                self.assertEqual( len(links), 2 )
+                self.assertEqual( FeedHandler.requests[-1], (None, None) )
+        finally:
+            stop_local_server(server)
+
+    def test_token_bucket(self):
+
+        bucket = TokenBucket(rate=50, capacity=2)
+        start = time.monotonic()
+        
+        threads = [ threading.Thread(target=bucket.acquire) for _ in range(7) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        #2 tokens are available at once, the other 5 are added at 50/s
+        self.assertGreaterEqual( time.monotonic() - start, 5/50 - 0.01 )
+        self.assertEqual( TokenBucket(rate=0).acquire(), 0 )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,5 +21,42 @@ class TestSGSuite(unittest.TestCase):
         sg_nodes = sgc.gen_storygraph(uris_lst)
         self.assertGreater( len(sg_nodes['links']), 0, 'links.len == 0' )
 
+    def test_sgs_no_storygraph_output_order(self):
+
+        import argparse
+        import json
+        import os
+        import tempfile
+        from importlib.machinery import SourceFileLoader
+        from importlib.util import module_from_spec
+        from importlib.util import spec_from_loader
+        from unittest import mock
+
+        sgs_path = os.path.join( os.path.dirname(__file__), '..', '..', 'bin', 'sgs' )
+        loader = SourceFileLoader('sgs', sgs_path)
+        sgs = module_from_spec( spec_from_loader('sgs', loader) )
+        loader.exec_module(sgs)
+
+        links = [ f'https://example.com/{i}' for i in range(5) ]
+        def stream_entities_frm_links(links, **kwargs):
+            #out of order, index 1 is lost, index 2 cannot be encoded (lone surrogate)
+            for i in [3, 0, 4, 2]:
+                yield i, {'link': links[i], 'title': '\ud800' if i == 2 else '', 'entities': [{'entity': str(i), 'class': 'CARDINAL'}]}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            
+            args = argparse.Namespace( output=os.path.join(tmp_dir, 'links.jsonl'), gzip=False, json_backend='json', base_ref_date=None, thread_count=1, async_fetch=False, domain_thread_count=1, cache_dir='', cache_ttl=None, clean_thread_count=1, clean_process_count=0, clean_method='nltk', ner_batch_size=1, ner_process_count=0 )
+            with mock.patch.object(sgs, 'stream_entities_frm_links', stream_entities_frm_links):
+                sgs.run_get_entities_frm_links(links, args)
+
+            with open(args.output) as infile:
+                records = [ json.loads(l) for l in infile ]
+
+        self.assertEqual( [r['link'] for r in records], links )
+        self.assertEqual( records[1]['deref-status'], 'error' )
+        self.assertEqual( records[1]['entities'], [] )
+        self.assertEqual( (records[2]['deref-status'], records[2]['entities']), ('error', []) )
+        self.assertEqual( records[4]['entities'], [{'entity': '4', 'class': 'CARDINAL'}] )
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+import asyncio
+import tempfile
+import unittest
+
+from sgsuite.URLExpander import URLExpander
+from sgsuite.cache import URLCache
+from sgsuite.util import expandUrl
+from sgsuite.util import expandUrls
+
+from local_server import QuietHandler
+from local_server import start_local_server
+from local_server import stop_local_server
+
+class RedirectHandler(QuietHandler):
+
+    #path: (status, headers)
+    routes = {
+        '/short': (301, [('Location', '{host}/hop-1')]),
+        '/hop-1': (302, [('Location', '/dir/hop-2')]),
+        '/dir/hop-2': (303, [('Location', 'hop-3?q=1#top')]),
+        '/dir/hop-3?q=1': (200, []),
+        '/no-head': (302, [('Location', '/dir/hop-3?q=1')]),
+        '/set-cookie': (302, [('Set-Cookie', 'session=abc; Path=/'), ('Location', '/check-cookie')]),
+        '/loop': (302, [('Location', '/loop')]),
+        '/other-scheme': (302, [('Location', 'itms-apps://app/1')]),
+        '/refused': (302, [('Location', 'http://127.0.0.1:9/gone')])
+    }
+    methods = []
+
+    def respond(self, method):
+
+        RedirectHandler.methods.append( (method, self.path) )
+        host = f'http://{self.headers["Host"]}'
+
+        if( self.path == '/no-head' and method == 'HEAD' ):
+            status, headers = 405, []
+        elif( self.path == '/check-cookie' ):
+            status, headers = (302, [('Location', '/dir/hop-3?q=1')]) if self.headers.get('Cookie') == 'session=abc' else (200, [])
+        else:
+            status, headers = RedirectHandler.routes.get(self.path, (404, []))
+
+        self.send_response(status)
+        for key, val in headers:
+            self.send_header( key, val.format(host=host) )
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.respond('HEAD')
+
+    def do_GET(self):
+        self.respond('GET')
+
+class TestURLExpander(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.host = start_local_server(RedirectHandler)
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_local_server(cls.server)
+
+    def test_redirect_chain(self):
+
+        expander = URLExpander(max_hops=5)
+        final = self.host + '/dir/hop-3?q=1#top'
+
+        #absolute, path-relative and document-relative Location headers
+        self.assertEqual( expander.expand(self.host + '/short'), final )
+        self.assertEqual( expander.expand(self.host + '/dir/hop-3?q=1'), self.host + '/dir/hop-3?q=1' )
+        self.assertEqual( expander.expand('  '), '' )
+        
+        #HEAD rejected: GET
+        RedirectHandler.methods = []
+        self.assertEqual( expander.expand(self.host + '/no-head'), self.host + '/dir/hop-3?q=1' )
+        self.assertEqual( RedirectHandler.methods[:2], [('HEAD', '/no-head'), ('GET', '/no-head')] )
+
+        #max hops, non-http Location, and failing hops return the last url reached
+        self.assertEqual( expander.expand(self.host + '/loop'), self.host + '/loop' )
+        self.assertEqual( URLExpander(max_hops=1).expand(self.host + '/short'), self.host + '/hop-1' )
+        self.assertEqual( expander.expand(self.host + '/other-scheme'), self.host + '/other-scheme' )
+        self.assertEqual( expander.expand(self.host + '/refused'), 'http://127.0.0.1:9/gone' )
+        self.assertEqual( expandUrl('http://127.0.0.1:9/gone'), 'http://127.0.0.1:9/gone' )
+
+        #unfinished chains are not successes (negative_ttl in URLCache)
+        self.assertEqual( expander.resolve(self.host + '/short'), (final, True) )
+        self.assertEqual( expander.resolve(self.host + '/loop'), (self.host + '/loop', False) )
+        self.assertEqual( URLExpander(max_hops=1).resolve(self.host + '/short'), (self.host + '/hop-1', False) )
+        self.assertEqual( expander.resolve(self.host + '/other-scheme'), (self.host + '/other-scheme', False) )
+        expander.close()
+
+    def test_cookies_are_isolated_per_call(self):
+
+        expander = URLExpander()
+        self.assertEqual( expander.expand(self.host + '/set-cookie'), self.host + '/dir/hop-3?q=1' )
+        self.assertEqual( expander.expand(self.host + '/check-cookie'), self.host + '/check-cookie' )
+        self.assertEqual( len(expander.session.cookies), 0 )
+        expander.close()
+
+    def test_batch_and_async(self):
+
+        urls = [self.host + '/short', self.host + '/loop', self.host + '/set-cookie', self.host + '/check-cookie'] * 5
+        expected = [self.host + '/dir/hop-3?q=1#top', self.host + '/loop', self.host + '/dir/hop-3?q=1', self.host + '/check-cookie'] * 5
+
+        expander = URLExpander(max_concurrency=4)
+        self.assertEqual( expander.expand_urls(urls), expected )
+        self.assertEqual( asyncio.run(expander.expand_urls_async(urls)), expected )
+        self.assertEqual( expandUrls(urls), expected )
+        expander.close()
+
+    def test_url_cache(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+
+            expander = URLExpander( url_cache=URLCache(cache_dir) )
+            for _ in range(2):
+                RedirectHandler.methods = []
+                self.assertEqual( expander.expand(self.host + '/short'), self.host + '/dir/hop-3?q=1#top' )
+                self.assertEqual( expander.expand(self.host + '/refused'), 'http://127.0.0.1:9/gone' )
+            
+            #second round from cache
+            self.assertEqual( RedirectHandler.methods, [] )
+            self.assertEqual( expander.url_cache.stats()['negative-hits'], 1 )
+            
+            url_cache = URLCache(cache_dir)
+            self.assertEqual( expandUrl(self.host + '/short', urlCache=url_cache), self.host + '/dir/hop-3?q=1#top' )
+            self.assertEqual( url_cache.stats()['hits'], 1 )
+            expander.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,558 @@
+import threading
+import time
+import unittest
+
+from collections import namedtuple
+
+from local_server import start_route_server
+from local_server import stop_local_server
+
+SpacyEnt = namedtuple('SpacyEnt', ['text', 'label_'])
+
+def is_spacy_model_installed(model_name='en_core_web_sm'):
+
+    try:
+        import spacy
+        return spacy.util.is_package(model_name)
+    except ImportError:
+        return False
+
+def get_article_html(title, paragraph, count=15):
+    
+    body = ''.join([ f'<p>{paragraph}</p>' for _ in range(count) ])
+    return f'<html><head><title>{title}</title><link rel="icon" href="/favicon.ico"></head><body><div><h1>{title}</h1>{body}</div></body></html>'.encode('utf-8')
+
+class FakeDoc(object):
+
+    def __init__(self, text):
+        self.tokens = [ SpacyEnt(tok, '') for tok in text.split() ]
+        self.ents = [ SpacyEnt(tok.text.strip('.,'), 'PERSON') for tok in self.tokens if tok.text.istitle() ]
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+class FakeNLP(object):
+
+    '''
+        stand-in for a spaCy model: title case tokens are PERSON entities, documents containing "BREAK" raise
+    '''
+    def __call__(self, text):
+        
+        if( 'BREAK' in text ):
+            raise ValueError('broken document')
+        
+        return FakeDoc(text)
+
+    def pipe(self, texts, as_tuples=False, batch_size=32):
+
+        batch = []
+        for text, context in texts:
+            
+            batch.append( (text, context) )
+            if( len(batch) == batch_size ):
+                yield from [ (self(t), c) for t, c in batch ]
+                batch = []
+
+        yield from [ (self(t), c) for t, c in batch ]
+
+def get_fake_ner_engine():
+
+    from sgsuite.util import SpacyNER
+
+    ner_engine = SpacyNER()
+    ner_engine.nlp = FakeNLP()
+    return ner_engine
+
+def get_worker_cache_settings(task):
+
+    from sgsuite.cache import DerivedCache
+    from sgsuite.util import get_worker_derived_cache
+
+    derived_cache = get_worker_derived_cache()
+    return derived_cache.cache_dir, derived_cache.ttl, DerivedCache.pipeline_version
+
+def get_ner_links():
+
+    text = ' '.join(['Joe Biden and Kamala Harris visited Norfolk, Virginia, where the Senate debated the infrastructure bill.'] * 12)
+    return [
+        {'title': 'Biden visits Norfolk', 'text': text},
+        {'text': 'Boris Johnson spoke in London. ' * 40},
+        {'title': 'Empty', 'text': ''}
+    ]
+
+class TestUtil(unittest.TestCase):
+
+    @unittest.skipUnless(is_spacy_model_installed(), 'requires en_core_web_sm')
+    def test_ner_engine_batches_preserve_order(self):
+
+        from sgsuite.util import get_ner_engine
+
+        links = get_ner_links()
+        ner_engine = get_ner_engine()
+        batched = list( ner_engine.get_entities(links, batch_size=2) )
+        single = [ list(ner_engine.get_entities([l], batch_size=1))[0] for l in links ]
+
+        self.assertEqual( len(batched), len(links) )
+        self.assertEqual( batched, single )
+        self.assertIn( {'entity': 'Norfolk', 'class': 'GPE'}, batched[0]['entities'] )
+
+    @unittest.skipUnless(is_spacy_model_installed(), 'requires en_core_web_sm')
+    def test_ner_process_pool_preserves_order(self):
+
+        from sgsuite.util import get_entities_in_processes
+        from sgsuite.util import get_ner_engine
+
+        links = get_ner_links() * 3
+        in_process = list( get_ner_engine().get_entities(links) )
+        in_pool = list( get_entities_in_processes(links, process_count=2, chunk_size=2) )
+        
+        self.assertEqual( in_pool, in_process )
+
+    @unittest.skipUnless(is_spacy_model_installed(), 'requires en_core_web_sm')
+    def test_entities_frm_links_pipeline(self):
+
+        from sgsuite.util import get_entities_frm_links
+        from sgsuite.util import stream_entities_frm_links
+        
+        paragraph = 'Joe Biden and Kamala Harris visited Norfolk, Virginia, where the Senate debated the infrastructure bill for hours on Monday.'
+        routes = { f'/news/{i}': (200, {'Content-Type': 'text/html; charset=utf-8'}, get_article_html(f'Story {i}', paragraph)) for i in range(12) }
+        server, base_uri = start_route_server(routes)
+        
+        try:
+            uris = [ f'{base_uri}/news/{i}' for i in range(12) ] + [ f'{base_uri}/missing' ]
+            links = get_entities_frm_links(uris, thread_count=3, clean_thread_count=2, pipeline_queue_size=2)
+            streamed = dict( stream_entities_frm_links(uris, thread_count=4, pipeline_queue_size=1, async_fetch=True) )
+            pooled = get_entities_frm_links(uris, thread_count=3, clean_process_count=2, clean_chunk_size=3, pipeline_queue_size=2)
+        finally:
+            stop_local_server(server)
+
+        self.assertEqual( [l['link'] for l in links], uris )
+        self.assertEqual( [streamed[i] for i in range(len(uris))], links )
+        self.assertEqual( pooled, links )
+        
+        for i in range(12):
+            self.assertEqual( links[i]['title'], f'Story {i}' )
+            self.assertEqual( links[i]['favicon'], f'{base_uri}/favicon.ico' )
+            self.assertIn( {'entity': 'Norfolk', 'class': 'GPE'}, links[i]['entities'] )
+            self.assertEqual( links[i]['deref-status'], 'ok' )
+            self.assertEqual( list(links[i].keys()), ['text', 'title', 'favicon', 'deref-status', 'link', 'entities'] )
+
+    def test_ner_engine_isolates_document_errors(self):
+
+        ner_engine = get_fake_ner_engine()
+        links = [ {'title': f'Story {i}', 'text': f'Joe Biden spoke in Norfolk {i}'} for i in range(7) ]
+        links[2]['text'] = 'BREAK'
+        links[5] = {'title': 'no text'}
+        
+        payloads = list( ner_engine.get_entities(links, batch_size=3, min_doc_word_count=100, base_ref_date=None) )
+        single = [ list(ner_engine.get_entities([l], batch_size=1))[0] for l in links ]
+
+        self.assertEqual( len(payloads), len(links) )
+        self.assertEqual( payloads, single )
+        self.assertEqual( payloads[2], {'entities': []} )
+        self.assertEqual( payloads[5], {'entities': []} )
+        self.assertIn( {'entity': 'Biden', 'class': 'PERSON'}, payloads[3]['entities'] )
+
+    def test_fake_ner_preserves_order(self):
+
+        from unittest import mock
+        from sgsuite.util import get_entities_frm_links
+        from sgsuite.util import get_entities_in_processes
+        from sgsuite.util import stream_entities_frm_links
+
+        #the ordering checks of the en_core_web_sm tests above, with get_ner_engine() stubbed
+        links = [ {'title': f'Story {i}', 'text': f'Reporter{i} wrote from Town{i}. ' * (i * 10)} for i in range(9) ]
+        ner_engine = get_fake_ner_engine()
+        batched = list( ner_engine.get_entities(links, batch_size=2) )
+        single = [ list(ner_engine.get_entities([l], batch_size=1))[0] for l in links ]
+        self.assertEqual( batched, single )
+        self.assertIn( {'entity': 'Reporter4', 'class': 'PERSON'}, batched[4]['entities'] )
+
+        routes = { f'/news/{i}': (200, {'Content-Type': 'text/html; charset=utf-8'}, get_article_html(f'Story {i}', f'Reporter{i} wrote from Town{i} about the council budget vote.')) for i in range(10) }
+        server, base_uri = start_route_server(routes)
+        uris = [ f'{base_uri}/news/{i}' for i in range(10) ] + [ f'{base_uri}/missing' ]
+
+        try:
+            with mock.patch('sgsuite.util.get_ner_engine', return_value=get_fake_ner_engine()):
+                in_pool = list( get_entities_in_processes(links, process_count=2, chunk_size=2, batch_size=2) )
+                threaded = get_entities_frm_links(uris, thread_count=3, clean_thread_count=2, pipeline_queue_size=2, ner_batch_size=3)
+                streamed = dict( stream_entities_frm_links(uris, thread_count=4, pipeline_queue_size=1, async_fetch=True, ner_batch_size=2) )
+                pooled = get_entities_frm_links(uris, thread_count=3, clean_process_count=2, clean_chunk_size=3, pipeline_queue_size=2)
+        finally:
+            stop_local_server(server)
+
+        self.assertEqual( in_pool, batched )
+        self.assertEqual( [l['link'] for l in threaded], uris )
+        self.assertEqual( [streamed[i] for i in range(len(uris))], threaded )
+        self.assertEqual( pooled, threaded )
+
+        for i in range(10):
+            self.assertEqual( threaded[i]['title'], f'Story {i}' )
+            self.assertEqual( threaded[i]['favicon'], f'{base_uri}/favicon.ico' )
+            self.assertIn( {'entity': f'Town{i}', 'class': 'PERSON'}, threaded[i]['entities'] )
+        self.assertEqual( (threaded[10]['text'], threaded[10]['entities']), ('', []) )
+
+    def test_entities_frm_links_pipeline_errors(self):
+
+        from unittest import mock
+        from sgsuite.util import get_entities_frm_links
+
+        class FailingNER(object):
+            def get_entities(self, links, **kwargs):
+                for i, link in enumerate(links):
+                    if( i == 2 ):
+                        raise RuntimeError('NER failed')
+                    yield {'entities': [{'entity': link['title'], 'class': 'TITLE'}]}
+
+        routes = { f'/news/{i}': (200, {'Content-Type': 'text/html; charset=utf-8'}, get_article_html(f'Story {i}', 'Paragraph.')) for i in range(6) }
+        server, base_uri = start_route_server(routes)
+        uris = [ f'{base_uri}/news/{i}' for i in range(6) ]
+        
+        try:
+            with mock.patch('sgsuite.util.get_ner_engine', return_value=FailingNER()):
+                ner_failed = get_entities_frm_links(uris, thread_count=2, pipeline_queue_size=1)
+            
+            #every boilerplate removal chunk fails in the worker processes
+            with mock.patch('sgsuite.util.get_ner_engine', return_value=get_fake_ner_engine()), mock.patch('sgsuite.util.get_worker_derived_cache', side_effect=RuntimeError('worker failed')):
+                clean_failed = get_entities_frm_links(uris, thread_count=2, clean_process_count=2, clean_chunk_size=2, pipeline_queue_size=1)
+        finally:
+            stop_local_server(server)
+
+        self.assertEqual( [l['link'] for l in ner_failed], uris )
+        self.assertEqual( [l['entities'] for l in ner_failed], [[{'entity': 'Story 0', 'class': 'TITLE'}], [{'entity': 'Story 1', 'class': 'TITLE'}], [], [], [], []] )
+        
+        self.assertEqual( [l['link'] for l in clean_failed], uris )
+        self.assertEqual( [l['deref-status'] for l in clean_failed], ['error'] * len(uris) )
+
+    def test_entities_frm_links_early_stop(self):
+
+        from unittest import mock
+        from sgsuite.AsyncFetcher import AsyncFetcher
+        from sgsuite.util import stream_entities_frm_links
+
+        routes = { f'/news/{i}': (200, {'Content-Type': 'text/html; charset=utf-8'}, get_article_html(f'Story {i}', 'Paragraph.')) for i in range(20) }
+        server, base_uri = start_route_server(routes)
+        uris = [ f'{base_uri}/news/{i}' for i in range(20) ]
+        
+        try:
+            with mock.patch('sgsuite.util.get_ner_engine', return_value=get_fake_ner_engine()):
+                for params in [{}, {'async_fetch': True}, {'clean_process_count': 2}]:
+                    
+                    links = stream_entities_frm_links(uris, thread_count=2, pipeline_queue_size=1, ner_batch_size=1, **params)
+                    next(links)
+                    links.close()
+
+                    stage_threads = [ t.name for t in threading.enumerate() if 'worker' in t.name ]
+                    self.assertEqual( stage_threads, [], params )
+
+                with mock.patch('sgsuite.AsyncFetcher.AsyncFetcher.close', autospec=True) as close:
+                    list( stream_entities_frm_links(uris[:2], async_fetch=True) )
+                    self.assertEqual( close.call_count, 1 )
+
+                    fetcher = AsyncFetcher()
+                    list( stream_entities_frm_links(uris[:2], fetcher=fetcher) )
+                    self.assertEqual( close.call_count, 1 )
+                
+                fetcher.close()
+        finally:
+            stop_local_server(server)
+
+    def test_worker_derived_cache_settings(self):
+
+        import tempfile
+        from multiprocessing import Pool
+        from sgsuite.cache import DerivedCache
+        from sgsuite.util import get_worker_derived_cache_args
+        from sgsuite.util import init_worker_derived_cache
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with Pool(processes=1, initializer=init_worker_derived_cache, initargs=get_worker_derived_cache_args(cache_dir, 60)) as pool:
+                settings = pool.map(get_worker_cache_settings, [0])[0]
+
+        self.assertEqual( settings, (cache_dir, 60, DerivedCache.pipeline_version) )
+
+    def test_async_fetcher(self):
+
+        from sgsuite.AsyncFetcher import AsyncFetcher
+
+        routes = { f'/news/{i}': (200, {'Content-Type': 'text/html; charset=utf-8'}, get_article_html(f'Story {i}', 'paragraph')) for i in range(8) }
+        routes['/large'] = (200, {'Content-Type': 'text/html'}, b'x' * 5000)
+        server, base_uri = start_route_server(routes)
+
+        uris = [ f'{base_uri}/news/{i}' for i in range(8) ] + [ f'{base_uri}/large', f'{base_uri}/missing' ]
+        fetcher = AsyncFetcher(max_concurrency=4, max_domain_concurrency=2, sizeRestrict=1000)
+        try:
+            results = fetcher.fetch_uris(uris)
+            fetched = {}
+            self.assertEqual( fetcher.fetch_uris(uris, on_fetched=lambda i, res: fetched.setdefault(i, res['text'])), [None] * len(uris) )
+        finally:
+            fetcher.close()
+            stop_local_server(server)
+
+        self.assertEqual( [r['uri'] for r in results], uris )
+        for i in range(8):
+            self.assertEqual( results[i]['text'], routes[f'/news/{i}'][2].decode('utf-8') )
+            self.assertEqual( fetched[i], results[i]['text'] )
+
+        self.assertEqual( (results[8]['text'], results[8]['status']), ('', 'oversized') )
+        self.assertEqual( results[9]['status_code'], 404 )
+
+        #a blocked on_fetched pauses fetching: at most max_concurrency uris are taken
+        from unittest import mock
+
+        fetched = []
+        resume = threading.Event()
+        fetcher = AsyncFetcher(max_concurrency=2)
+        with mock.patch.object(fetcher, 'fetch_sync', side_effect=lambda uri: fetched.append(uri) or {'uri': uri}):
+
+            fetch_thread = threading.Thread( target=fetcher.fetch_uris, args=(uris,), kwargs={'on_fetched': lambda i, res: resume.wait()} )
+            fetch_thread.start()
+            time.sleep(0.3)
+            self.assertEqual( len(fetched), 2 )
+
+            resume.set()
+            fetch_thread.join()
+            self.assertEqual( sorted(fetched), sorted(uris) )
+
+        fetcher.close()
+
+    def test_fetch_uri_size_restriction_and_decoding(self):
+
+        from sgsuite.util import fetchURI
+
+        routes = {
+            '/small': (200, {'Content-Type': 'text/html'}, b'<html>ok</html>'),
+            '/declared-large': (200, {'Content-Type': 'text/html'}, b'x' * 5000),
+            '/undeclared-large': (200, {'Content-Type': 'text/html', 'Content-Length': None}, b'y' * 500000),
+            '/header-charset': (200, {'Content-Type': 'text/html; charset=windows-1252'}, 'caf\u00e9 \u201cquoted\u201d'.encode('windows-1252')),
+            '/meta-charset': (200, {'Content-Type': 'text/html'}, '<meta charset="iso-8859-1"><p>Se\u00f1or</p>'.encode('iso-8859-1')),
+            '/no-charset': (200, {'Content-Type': 'text/html'}, 'S\u00e3o Paulo'.encode('utf-8'))
+        }
+        server, base_uri = start_route_server(routes)
+        
+        try:
+            results = { path: fetchURI(base_uri + path, sizeRestrict=4000) for path in routes }
+        finally:
+            stop_local_server(server)
+
+        self.assertEqual( (results['/small']['status'], results['/small']['text']), ('ok', '<html>ok</html>') )
+        self.assertEqual( (results['/declared-large']['status'], results['/declared-large']['text']), ('oversized', '') )
+        self.assertEqual( (results['/undeclared-large']['status'], results['/undeclared-large']['text']), ('truncated', '') )
+        self.assertEqual( results['/header-charset']['text'], 'caf\u00e9 \u201cquoted\u201d' )
+        self.assertEqual( results['/meta-charset']['text'], '<meta charset="iso-8859-1"><p>Se\u00f1or</p>' )
+        self.assertEqual( results['/no-charset']['text'], 'S\u00e3o Paulo' )
+
+    def test_deref_uri_html_cache(self):
+
+        import tempfile
+        from sgsuite.cache import HTMLCache
+        from sgsuite.util import derefURIDetails
+
+        routes = {'/news/1': (200, {'Content-Type': 'text/html; charset=utf-8'}, get_article_html('Story 1', 'paragraph'))}
+        server, base_uri = start_route_server(routes)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            try:
+                first = derefURIDetails(base_uri + '/news/1', extraParams={'html_cache': HTMLCache(cache_dir)})
+            finally:
+                stop_local_server(server)
+            
+            html_cache = HTMLCache(cache_dir)
+            rerun = derefURIDetails(base_uri + '/news/1', extraParams={'html_cache': html_cache})
+
+        self.assertEqual( first['status'], 'ok' )
+        self.assertEqual( rerun, {'text': first['text'], 'status': 'cached'} )
+        self.assertEqual( html_cache.stats()['hits'], 1 )
+
+    def test_boilerplate_removal_process_pool_preserves_order(self):
+
+        from sgsuite.util import getTxtFrmHTML
+        from sgsuite.util import get_txt_frm_html_in_processes
+
+        pages = [ (get_article_html(f'Story {i}', f'Paragraph of story {i} about the Senate. ' * 3).decode('utf-8'), f'https://example.com/news/{i}', 'ok') for i in range(10) ]
+        pages.append( ('', 'https://example.com/missing', 'error') )
+
+        for clean_method in ['python-boilerpipe', 'nltk']:
+            in_process = [ getTxtFrmHTML(html, uri, derefStatus=status, cleanMethod=clean_method) for html, uri, status in pages ]
+            in_pool = list( get_txt_frm_html_in_processes(iter(pages), process_count=2, chunk_size=3, clean_method=clean_method) )
+            
+            self.assertEqual( in_pool, in_process )
+            self.assertEqual( [d['uri'] for d in in_pool], [p[1] for p in pages] )
+
+    def test_clean_html_nltk(self):
+
+        from html import unescape
+        from sgsuite.util import cleanHtml
+        from sgsuite.util import unescapeHTMLEntities
+
+        html = '''<html><head><style type="text/css">p > a {}</style><SCRIPT>if(a<b){x="</p>"}</SCRIPT></head>
+        <body><!-- comment > with markup <p> -->
+            <p>Hello   &amp;  <b>bold</b>&nbsp;&nbsp;world</p>
+            
+            <p>Line&#39;s\t  two</p><div>x&lt;y&gt; &#8220;quoted&#8221;</div><scripts>kept</scripts>
+        </body></html>'''
+
+        self.assertEqual( cleanHtml(html, method='nltk'), 'Hello & bold world\nLine\'s two x<y> \u201cquoted\u201d kept' )
+        self.assertEqual( cleanHtml('', method='nltk'), '' )
+        self.assertEqual( cleanHtml('a <  b', method='nltk'), 'a < b' )
+
+        for text in ['&amp;amp; &amp &copy2020 &#x26;lt; &#38;amp; &#3 x', 'a&b&c;&&; &#0; &NotAnEntity;', 'no entities', 'nul \x00 &amp;']:
+            self.assertEqual( unescapeHTMLEntities(text), unescape(text), text )
+
+    def test_top_k_terms(self):
+
+        from sgsuite.util import getTokenLabelsForText
+        from sgsuite.util import getTopKTermsListFromText
+        from sgsuite.util import get_top_k_terms
+
+        tokens = ['Senate', 'the', 'Biden', '.', ' senate ', 'Norfolk', '--', 'biden', '', 'Virginia', 'e.g.,', 'Norfolk', 'It', '!?']
+        self.assertEqual( getTopKTermsListFromText(tokens, 3), [('senate', 2), ('biden', 2), ('norfolk', 2)] )
+        self.assertEqual( getTopKTermsListFromText(tokens, 10)[3:], [('virginia', 1)] )
+        self.assertEqual( getTopKTermsListFromText(tokens, 4, minusStopwords=False)[3], ('the', 1) )
+        self.assertEqual( getTopKTermsListFromText('b a b  a c', 2), [('b', 2), ('c', 1)] )
+        self.assertEqual( get_top_k_terms(tokens, 1), [{'entity': 'senate', 'class': 'TOP_1_TERM'}] )
+        self.assertEqual( getTokenLabelsForText("Biden's trip to the Senate in 2019: 3.5 hours", 'TITLE'), [{'entity': "Biden's", 'class': 'TITLE'}, {'entity': 'trip', 'class': 'TITLE'}, {'entity': 'Senate', 'class': 'TITLE'}, {'entity': '2019', 'class': 'TITLE'}, {'entity': '3.5', 'class': 'TITLE'}, {'entity': 'hours', 'class': 'TITLE'}] )
+
+    @unittest.skipUnless(is_spacy_model_installed(), 'requires en_core_web_sm')
+    def test_ner_base_ref_date(self):
+
+        from datetime import datetime
+        from sgsuite.util import get_entities_in_processes
+        from sgsuite.util import get_ner_engine
+
+        links = [{'title': 'Senate vote', 'text': 'Joe Biden visited Norfolk yesterday, where the Senate debated the bill. ' * 20}] * 3
+        base_ref_date = datetime(2019, 3, 24, 12, 30)
+        
+        in_process = list( get_ner_engine().get_entities(links, base_ref_date=base_ref_date) )
+        in_pool = list( get_entities_in_processes(links, process_count=2, chunk_size=1, base_ref_date=base_ref_date) )
+
+        self.assertEqual( in_pool, in_process )
+        for ner_payload in in_process:
+            self.assertIn( {'entity': '2019-03-23T12:30:00', 'class': 'DATE'}, ner_payload['entities'] )
+
+    def test_date_normalizer(self):
+
+        from datetime import datetime
+        from dateparser import parse
+        from sgsuite.util import DateNormalizer
+
+        date_strs = ['2019', '0999', '2019-03-24', '2019-3-4', '2019-02-30', '2019-13-04', '2019-03-24T10:11:12', 'Monday', 'last  Week', 'yesterday', 'May', 'March 24, 2019', 'two weeks ago', 'summer']
+        base_ref_dates = [datetime(2020, 2, 29, 15, 30, 12, 500), datetime(2019, 1, 31), datetime(2021, 12, 31, 23, 59, 59)]
+        date_normalizer = DateNormalizer(maxsize=4)
+
+        for base_ref_date in base_ref_dates:
+            for date_str in date_strs:
+                
+                parsed_date = parse( date_str, settings={'RELATIVE_BASE': base_ref_date} )
+                parsed_date = None if parsed_date is None else parsed_date.strftime('%Y-%m-%dT%H:%M:%S')
+                self.assertEqual( date_normalizer.normalize(date_str, base_ref_date), parsed_date, date_str )
+                self.assertEqual( date_normalizer.normalize(date_str, base_ref_date), parsed_date, date_str )
+                #keyed on the string as given
+                self.assertEqual( date_normalizer.normalize(date_str.upper(), base_ref_date), parsed_date, date_str )
+
+        stats = date_normalizer.stats()
+        self.assertEqual( stats['hits'], len(base_ref_dates) * (len(date_strs) + len([ d for d in date_strs if d.upper() == d ])) )
+        self.assertEqual( stats['prefiltered'], 5 * len(base_ref_dates) )
+        self.assertEqual( stats['entries'], 4 )
+
+        #the exact reference time is part of the key
+        date_normalizer = DateNormalizer()
+        date_normalizer.normalize('yesterday', datetime(2020, 3, 2, 10, 0, 0, 500))
+        date_normalizer.normalize('yesterday', datetime(2020, 3, 2, 10, 0, 0, 600))
+        self.assertEqual( date_normalizer.stats()['misses'], 2 )
+
+        day_normalizer = DateNormalizer(granularity='day')
+        self.assertEqual( day_normalizer.normalize('yesterday', datetime(2020, 3, 2, 10)), '2020-03-01T00:00:00' )
+        self.assertEqual( day_normalizer.normalize('yesterday', datetime(2020, 3, 2, 18)), '2020-03-01T00:00:00' )
+        self.assertEqual( day_normalizer.stats()['hits'], 1 )
+        self.assertRaises( ValueError, DateNormalizer, granularity='week' )
+
+    def test_single_pass_title_favicon_extraction(self):
+
+        from sgsuite.util import extractFavIconFromHTML
+        from sgsuite.util import extractFromHTML
+        from sgsuite.util import extractPageTitleFromHTML
+        from sgsuite.util import extractTitleFavIconFromHTML
+
+        uri = 'https://www.example.com/news/story.html'
+        pages = [
+            '<html><head><title> Story &amp; more </title><link rel="shortcut icon" href="/favicon.ico"></head><body><p>text</p></body></html>',
+            '<html><head><link rel="icon" href="//cdn.example.com/i.png"><title>Icon first</title></head></html>',
+            '<html><head><link rel="apple-touch-icon" href="icons/touch.png"></head><body><title>Late title</title></body></html>',
+            '<html><head><title></title><link rel="stylesheet" href="s.css"></head></html>',
+            '<html><head><title>Unclosed title',
+            '<html><body><svg><title>svg title</title></svg></body></html>',
+            ''
+        ]
+
+        for html in pages:
+            title, favicon = extractTitleFavIconFromHTML(html, uri, chunkSize=16)
+            self.assertEqual( title, extractPageTitleFromHTML(html), html )
+            self.assertEqual( favicon, extractFavIconFromHTML(html, sourceURL=uri), html )
+            self.assertEqual( extractFromHTML(html, uri, cleanMethod='')['title'], title )
+
+    def test_get_domain(self):
+
+        from unittest import mock
+        from sgsuite.util import getDomain
+        from sgsuite.util import getDomains
+        from sgsuite.util import get_host_domain
+
+        #url: (getDomain(url), getDomain(url, includeSubdomain=True), getDomain(url, includeSubdomain=True, excludeWWW=False))
+        cases = {
+            'https://www.bbc.co.uk/news/world': ('bbc.co.uk', 'bbc.co.uk', 'www.bbc.co.uk'),
+            'http://www.news.example.com/a?b=c#d': ('example.com', 'news.example.com', 'www.news.example.com'),
+            'https://user:pw@edition.cnn.com:443/2020/': ('cnn.com', 'edition.cnn.com', 'edition.cnn.com'),
+            'www2.example.org/path': ('example.org', 'example.org', 'www2.example.org'),
+            '  example.com  ': ('example.com', 'example.com', 'example.com'),
+            'http://127.0.0.1:8080/x': ('127.0.0.1', '127.0.0.1', '127.0.0.1'),
+            'https://[::1]:8080/x': ('[::1]', '[::1]', '[::1]'),
+            'http://[2001:DB8::1]/x': ('[2001:DB8::1]', '[2001:DB8::1]', '[2001:DB8::1]'),
+            'http://localhost/x': ('localhost', 'localhost', 'localhost'),
+            'https://a.b.github.io/': ('github.io', 'a.b.github.io', 'a.b.github.io'),
+            'http://Www.News.Example.COM./x': ('Example.COM', 'Www.News.Example.COM', 'Www.News.Example.COM'),
+            'example.net:8080/a//b': ('example.net', 'example.net', 'example.net'),
+            '': ('', '', '')
+        }
+
+        #the public suffix list must not be fetched
+        with mock.patch('urllib.request.urlopen', side_effect=AssertionError('network access')), mock.patch('requests.Session.get', side_effect=AssertionError('network access')):
+            for url, expected in cases.items():
+                self.assertEqual( getDomain(url), expected[0], url )
+                self.assertEqual( getDomain(url, includeSubdomain=True), expected[1], url )
+                self.assertEqual( getDomain(url, includeSubdomain=True, excludeWWW=False), expected[2], url )
+
+        urls = [ f'https://www.example{i % 3}.com/story/{i}' for i in range(30) ]
+        domains = [ getDomain(url) for url in urls ]
+        hits = get_host_domain.cache_info().hits
+        self.assertEqual( getDomains(urls), domains )
+        #1 cache hit per url, once the 3 hostnames are cached
+        self.assertEqual( get_host_domain.cache_info().hits - hits, len(urls) )
+
+    @unittest.skipUnless(is_spacy_model_installed(), 'requires en_core_web_sm')
+    def test_entities_frm_links_derived_cache(self):
+
+        import tempfile
+        from sgsuite.cache import DerivedCache
+        from sgsuite.util import get_entities_frm_links
+
+        paragraph = 'Joe Biden and Kamala Harris visited Norfolk, Virginia, where the Senate debated the infrastructure bill for hours on Monday.'
+        routes = { f'/news/{i}': (200, {'Content-Type': 'text/html; charset=utf-8'}, get_article_html(f'Story {i}', paragraph)) for i in range(4) }
+        server, base_uri = start_route_server(routes)
+        uris = [ f'{base_uri}/news/{i}' for i in range(4) ]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            try:
+                first = get_entities_frm_links(uris, derived_cache=DerivedCache(cache_dir))
+                
+                derived_cache = DerivedCache(cache_dir)
+                rerun = get_entities_frm_links(uris, derived_cache=derived_cache)
+            finally:
+                stop_local_server(server)
+
+        self.assertEqual( rerun, first )
+        #1 boilerplate removal + 1 NER hit per link
+        self.assertEqual( derived_cache.stats()['hits'], 2 * len(uris) )
+
+if __name__ == '__main__':
+    unittest.main()